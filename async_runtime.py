@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+class AsyncRuntime:
+    """
+    Ein gemeinsamer asyncio Event Loop in einem Hintergrund-Thread.
+
+    Die Tray-App (und spätere Batch-/Server-Modi) reichen hier Coroutinen ein, statt pro
+    Request einen eigenen Thread zu starten. Viele Requests laufen so nebenläufig auf
+    einem Loop und können über das zurückgegebene Future echt abgebrochen werden.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self._started = threading.Event()
+
+    def start(self):
+        """Startet den Event Loop Thread (idempotent)."""
+        if self.thread and self.thread.is_alive():
+            return
+        self._started.clear()
+        self.thread = threading.Thread(target=self._run, name="async_runtime", daemon=True)
+        self.thread.start()
+        self._started.wait(timeout=5)
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            try:
+                pending = asyncio.all_tasks(self.loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            finally:
+                self.loop.close()
+
+    def submit(self, coro):
+        """
+        Reicht eine Coroutine beim Loop ein (thread-sicher).
+
+        Returns:
+            concurrent.futures.Future: future.cancel() bricht die Coroutine im Loop ab
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """Plant einen Callback im Loop-Thread ein (thread-sicher)."""
+        self.start()
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def in_loop_thread(self):
+        """True, wenn der Aufrufer im Loop-Thread läuft."""
+        return self.thread is not None and threading.current_thread() is self.thread
+
+    def stop(self, timeout=1.0):
+        """Stoppt den Event Loop und wartet kurz auf den Thread."""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread and self.thread.is_alive() and not self.in_loop_thread():
+            self.thread.join(timeout=timeout)
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Async Runtime gestoppt")
+
+
+# Globale Runtime (wird beim ersten Zugriff erstellt)
+async_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_async_runtime():
+    """Gibt die globale AsyncRuntime zurück und startet sie bei Bedarf."""
+    global async_runtime
+    with _runtime_lock:
+        if async_runtime is None:
+            async_runtime = AsyncRuntime()
+        async_runtime.start()
+        return async_runtime
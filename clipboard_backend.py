@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Zwischenablage im eigenen Prozess statt über pyperclip.
+
+pyperclip startet unter Linux für jedes copy()/paste() einen xclip/xsel-Prozess (fork/exec),
+und beim Kopieren muss dieser Prozess als Besitzer der Auswahl weiterlaufen. Die Tk-Variante
+nutzt das ohnehin laufende Tk-Root-Fenster: Tk bleibt Besitzer der Zwischenablage und liefert
+auch große Inhalte (INCR-Übertragung unter X11) aus seiner Hauptschleife aus.
+
+pyperclip bleibt als Rückfallebene: wenn Tk nicht antwortet oder einen Fehler meldet.
+
+Unter X11 kann die Tk-Variante außerdem die PRIMARY-Auswahl (den gerade markierten Text) samt
+Zeitstempel direkt lesen, ohne Ctrl+C und ohne die Zwischenablage zu verändern.
+
+Wie viel schneller die Tk-Variante ist, ist noch nicht gemessen; benchmark() bzw.
+"python clipboard_backend.py" vergleicht beide Varianten (benötigt ein Display, z.B. Xvfb).
+"""
+
+import sys
+import threading
+import time
+
+try:
+    import tkinter as tk
+    HAS_TKINTER = True
+except ImportError:
+    HAS_TKINTER = False
+
+try:
+    import pyperclip
+    HAS_PYPERCLIP = True
+except ImportError:
+    HAS_PYPERCLIP = False
+
+try:
+    from Xlib import X
+    from Xlib import display as xdisplay
+    HAS_XLIB = True  # Kommt unter Linux mit pynput mit
+except ImportError:
+    HAS_XLIB = False
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+TK_CALL_TIMEOUT = 2.0  # Max. Wartezeit auf die Tk-Hauptschleife bei Aufrufen aus anderen Threads
+
+_x11_display = None  # Eigene Xlib-Verbindung für Besitzer-Abfragen (nur aus dem Tk-Thread verwenden)
+
+
+class ClipboardError(Exception):
+    """Zwischenablage nicht erreichbar (z.B. Tk-Hauptschleife blockiert)."""
+
+
+class Clipboard:
+    """Basisklasse: copy(text) belegt die Zwischenablage, paste() liest sie."""
+
+    name = "base"
+    has_primary = False  # True, wenn read_selection() die X11-PRIMARY-Auswahl lesen kann
+    tracks_requests = False  # True, wenn copy() das Abholen per on_request meldet
+    settle_delay = 0.0  # Pause nach copy(), bis andere Anwendungen den neuen Inhalt sehen
+
+    def copy(self, text, on_request=None):
+        """
+        Belegt die Zwischenablage.
+
+        Args:
+            text (str): Der Text
+            on_request (callable): Optional, wird aufgerufen, sobald eine Anwendung den Inhalt
+                abholt (nur wenn das Backend das beobachten kann, siehe TkClipboard)
+        """
+        raise NotImplementedError
+
+    def paste(self):
+        raise NotImplementedError
+
+
+class PyperclipClipboard(Clipboard):
+    """Bisheriges Verfahren über pyperclip (unter Linux ein Prozess je Aufruf)."""
+
+    name = "pyperclip"
+    settle_delay = 0.05  # xclip/xsel übernimmt den Besitz erst im gestarteten Prozess
+
+    def copy(self, text, on_request=None):
+        pyperclip.copy(text)
+
+    def paste(self):
+        return pyperclip.paste() or ""
+
+
+class TkClipboard(Clipboard):
+    """
+    Zwischenablage über das Tk-Root-Fenster.
+
+    Tk-Aufrufe sind nur im Tk-Thread erlaubt; aus anderen Threads (Stream-Einfügen,
+    Segment-Worker) wird der Aufruf per root.after() in die Hauptschleife gegeben und auf das
+    Ergebnis gewartet. Schlägt Tk fehl, übernimmt der optionale Fallback.
+    """
+
+    name = "tk"
+
+    def __init__(self, root, fallback=None, timeout=TK_CALL_TIMEOUT):
+        """
+        Args:
+            root (tk.Tk): Das laufende Root-Fenster (im Tk-Thread erstellen)
+            fallback (Clipboard): Optional, z.B. PyperclipClipboard
+            timeout (float): Max. Wartezeit auf die Hauptschleife
+        """
+        self.root = root
+        self.fallback = fallback
+        self.timeout = timeout
+        self.fallbacks = 0
+        self._thread = threading.current_thread()
+        # X11 liefert mit dem Standardtyp STRING nur Latin-1; UTF8_STRING gibt es dort immer
+        self.has_primary = root.tk.call("tk", "windowingsystem") == "x11"
+        self._paste_type = "UTF8_STRING" if self.has_primary else None
+        self.tracks_requests = self.has_primary
+
+    def copy(self, text, on_request=None):
+        if on_request is not None and self.tracks_requests:
+            self._with_fallback("copy", self._copy_tracked, text, on_request)
+        else:
+            self._with_fallback("copy", self._copy, text)
+
+    def paste(self):
+        return self._with_fallback("paste", self._paste) or ""
+
+    def read_selection(self, selection="PRIMARY"):
+        """
+        Liest eine X11-Auswahl samt Zeitstempel (kein Fallback: pyperclip kennt keine Zeitstempel).
+
+        Returns:
+            tuple: (text, timestamp) - timestamp ist die X-Serverzeit, zu der der Besitzer die
+                   Auswahl übernommen hat (None, wenn er sie nicht liefert); (None, None), wenn
+                   niemand die Auswahl besitzt oder sie keinen Text enthält
+
+        Raises:
+            ClipboardError: Wenn die Tk-Hauptschleife nicht antwortet
+        """
+        return self._call(self._read_selection, selection)
+
+    def _read_selection(self, selection):
+        try:
+            text = self.root.selection_get(selection=selection, type="UTF8_STRING")
+        except tk.TclError:
+            try:
+                text = self.root.selection_get(selection=selection)
+            except tk.TclError:
+                return None, None
+        try:
+            # Tk liefert INTEGER-Ziele als Hex-Wort, z.B. "0x01a2b3c4"
+            timestamp = int(str(self.root.selection_get(selection=selection, type="TIMESTAMP")).split()[0], 0)
+        except (tk.TclError, ValueError, IndexError):
+            timestamp = None
+        return text, timestamp or None  # 0 = CurrentTime, also kein echter Zeitstempel
+
+    def _copy(self, text):
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+        # Tk übernimmt den Besitz erst im Idle-Handler; sofort erledigen, damit Ctrl+V den neuen Text sieht
+        self.root.update_idletasks()
+
+    def _copy_tracked(self, text, on_request):
+        """
+        X11: CLIPBOARD direkt mit eigenem Handler besitzen, statt über Tks Zwischenablage.
+
+        Tk ruft den Handler auf, wenn eine Anwendung den Inhalt anfordert (bei großen Inhalten
+        mehrmals mit wachsendem Offset); beim ersten Teil wird on_request gemeldet.
+        """
+        def handle(offset, max_chars):
+            offset, max_chars = int(offset), int(max_chars)
+            if offset == 0:
+                on_request()
+            return text[offset:offset + max_chars]
+
+        for target in ("UTF8_STRING", "STRING"):
+            self.root.selection_handle(handle, selection="CLIPBOARD", type=target)
+        self.root.selection_own(selection="CLIPBOARD")
+        self.root.update_idletasks()
+
+    def _paste(self):
+        try:
+            if self._paste_type:
+                try:
+                    return self.root.clipboard_get(type=self._paste_type)
+                except tk.TclError:
+                    pass
+            return self.root.clipboard_get()
+        except tk.TclError:
+            return ""  # Leer oder kein Text
+
+    def _with_fallback(self, operation, fn, *args):
+        try:
+            return self._call(fn, *args)
+        except (ClipboardError, tk.TclError, RuntimeError) as e:
+            if self.fallback is None:
+                raise
+            self.fallbacks += 1
+            debug = get_debug_logger() if get_debug_logger else None
+            if debug:
+                debug.log(f"Tk-Zwischenablage: {operation} fehlgeschlagen, verwende {self.fallback.name}",
+                          f"Fehler: {e}", level="WARNING")
+            # Nur der Text wird weitergegeben: pyperclip kann das Abholen (on_request) nicht melden
+            result = getattr(self.fallback, operation)(*args[:1])
+            if operation == "copy":
+                # Der Aufrufer wartet nur settle_delay von Tk (0), die Pause des Fallbacks fehlt sonst
+                time.sleep(self.fallback.settle_delay)
+            return result
+
+    def _call(self, fn, *args):
+        """Führt fn im Tk-Thread aus (direkt, falls schon dort) und gibt das Ergebnis zurück."""
+        if threading.current_thread() is self._thread:
+            return fn(*args)
+        result = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                result["value"] = fn(*args)
+            except Exception as e:
+                result["error"] = e
+            finally:
+                done.set()
+
+        self.root.after(0, run)
+        if not done.wait(self.timeout):
+            raise ClipboardError(f"Tk-Hauptschleife antwortet nicht innerhalb von {self.timeout:.1f}s")
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+
+def selection_owned_by_active_window(selection="PRIMARY"):
+    """
+    Prüft, ob die X11-Auswahl der Anwendung mit dem aktiven Fenster gehört.
+
+    Viele Anwendungen besitzen die Auswahl über ein unsichtbares Hilfsfenster, daher wird
+    nicht das Fenster, sondern die X-Client-Verbindung verglichen (gleicher Ressourcen-ID-
+    Bereich). Eine Markierung in einem anderen, nicht fokussierten Fenster zählt so nicht.
+
+    Returns:
+        bool: True nur, wenn das sicher feststeht (ohne python-xlib oder bei Fehlern False)
+    """
+    global _x11_display
+    if not HAS_XLIB:
+        return False
+    try:
+        if _x11_display is None:
+            _x11_display = xdisplay.Display()
+        display = _x11_display
+        owner = display.get_selection_owner(display.intern_atom(selection))
+        owner_id = getattr(owner, "id", owner) or 0
+        active = display.screen().root.get_full_property(display.intern_atom("_NET_ACTIVE_WINDOW"),
+                                                         X.AnyPropertyType)
+        if active and active.value and active.value[0]:
+            focus_id = active.value[0]
+        else:
+            focus = display.get_input_focus().focus
+            focus_id = getattr(focus, "id", 0)
+        if not owner_id or focus_id in (0, X.PointerRoot):
+            return False
+        client_mask = ~display.display.info.resource_id_mask
+        return (owner_id & client_mask) == (focus_id & client_mask)
+    except Exception as e:
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Besitzer der X11-Auswahl nicht ermittelbar", f"Fehler: {e}", level="WARNING")
+        return False
+
+
+def create_clipboard(root=None, mode="pyperclip"):
+    """
+    Wählt das Zwischenablage-Backend.
+
+    Args:
+        root (tk.Tk): Das Root-Fenster (für "tk")
+        mode (str): "pyperclip" (Standard) oder "tk" (im Prozess, pyperclip als Fallback)
+
+    Returns:
+        Clipboard: Das gewählte Backend
+    """
+    fallback = PyperclipClipboard() if HAS_PYPERCLIP else None
+    debug = get_debug_logger() if get_debug_logger else None
+    if mode == "tk" and root is not None and HAS_TKINTER:
+        try:
+            clipboard = TkClipboard(root, fallback=fallback)
+            if debug:
+                debug.log("Zwischenablage-Backend", f"Backend: {clipboard.name}"
+                          + (f", Fallback: {fallback.name}" if fallback else ""))
+            return clipboard
+        except tk.TclError as e:
+            if debug:
+                debug.log("Tk-Zwischenablage nicht verfügbar, verwende pyperclip", f"Fehler: {e}", level="WARNING")
+    if fallback is None:
+        raise ClipboardError("Keine Zwischenablage verfügbar (weder Tk noch pyperclip)")
+    return fallback
+
+
+def benchmark(rounds=10, sizes=(1024, 1024 * 1024)):
+    """
+    Misst die Round-Trip-Latenz (copy + paste) für Tk und pyperclip bei 1 KB und 1 MB.
+
+    Kopiert wird aus einem Hilfsthread (wie beim Stream-Einfügen), während die Tk-Hauptschleife
+    läuft. Benötigt ein Display (z.B. Xvfb) und für pyperclip xclip/xsel.
+
+    Returns:
+        dict: Backend-Name -> {Größe in Bytes: {"latency_ms": Mittelwert, "errors": Anzahl}}
+    """
+    root = tk.Tk()
+    root.withdraw()
+    backends = [TkClipboard(root)]
+    if HAS_PYPERCLIP:
+        backends.append(PyperclipClipboard())
+    results = {}
+
+    def measure():
+        try:
+            for clipboard in backends:
+                per_size = results.setdefault(clipboard.name, {})
+                for size in sizes:
+                    latencies = []
+                    errors = 0
+                    for index in range(rounds):
+                        text = (f"{index}-" + "x" * size)[:size]
+                        start = time.perf_counter()
+                        try:
+                            clipboard.copy(text)
+                            ok = clipboard.paste() == text
+                        except Exception:
+                            ok = False
+                        if ok:
+                            latencies.append(time.perf_counter() - start)
+                        else:
+                            errors += 1
+                    per_size[size] = {
+                        "latency_ms": sum(latencies) / len(latencies) * 1000 if latencies else None,
+                        "errors": errors,
+                    }
+        finally:
+            root.after(0, root.quit)
+
+    threading.Thread(target=measure, daemon=True).start()
+    root.mainloop()
+    root.destroy()
+    return results
+
+
+if __name__ == "__main__":
+    if not HAS_TKINTER:
+        sys.exit("tkinter fehlt")
+    for name, per_size in benchmark().items():
+        for size, stats in per_size.items():
+            latency = f"{stats['latency_ms']:.1f} ms" if stats["latency_ms"] is not None else "-"
+            print(f"{name:>10} {size // 1024:>5} KB: Round-Trip {latency}, Fehler: {stats['errors']}")
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Erkennt, wann die Zwischenablage nach dem simulierten Ctrl+C neu belegt ist.
+
+Statt pyperclip.paste() alle 30 ms aufzurufen (unter Linux jedes Mal ein xclip/xsel-Prozess),
+wartet ein Watcher auf die Änderung und liest danach genau einmal:
+
+- X11: XFixes-Ereignis "Selection-Owner geändert" für CLIPBOARD (select() auf den X-Socket)
+- Windows: Sequenznummer der Zwischenablage (GetClipboardSequenceNumber, ohne Prozessstart)
+- sonst: bisherige Abfrageschleife (PollingClipboardWatcher)
+
+Ablauf: arm() vor dem Ctrl+C, danach capture(timeout). Gelesen wird über das übergebene
+Zwischenablage-Backend (siehe clipboard_backend), ohne Backend über pyperclip.
+
+Latenz und CPU-Zeit gegenüber der Abfrageschleife sind noch nicht gemessen; dafür gibt es
+benchmark() bzw. "python clipboard_watcher.py" (benötigt ein Display, z.B. Xvfb).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+try:
+    import pyperclip
+    HAS_PYPERCLIP = True
+except ImportError:
+    HAS_PYPERCLIP = False
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+CAPTURE_TIMEOUT = 1.1         # Max. Wartezeit auf die neue Auswahl (bisher 0.8s + 0.3s Nachfrist)
+POLL_INTERVAL = 0.03          # Abfrageintervall der Polling-Variante
+SEQUENCE_POLL_INTERVAL = 0.005  # Sequenznummer-Abfrage ist ein einfacher Systemaufruf
+
+XFIXES_SET_SELECTION_OWNER_NOTIFY_MASK = 1 << 0
+XFIXES_SELECTION_NOTIFY = 0   # Ereignis-Offset relativ zur event_base der Erweiterung
+
+
+class ClipboardWatcher:
+    """Basisklasse: arm() merkt sich den Zustand, capture() wartet auf die Änderung und liest einmal."""
+
+    name = "base"
+    clipboard = None  # Zwischenablage-Backend (clipboard_backend.Clipboard), None = pyperclip
+
+    def arm(self):
+        """Vor dem Ctrl+C aufrufen."""
+
+    def wait_for_change(self, timeout):
+        """Blockiert bis zur Änderung (True) oder bis zum Timeout (False)."""
+        raise NotImplementedError
+
+    def read(self):
+        """Liest den Text der Zwischenablage."""
+        if self.clipboard is not None:
+            return self.clipboard.paste()
+        return pyperclip.paste() if HAS_PYPERCLIP else ""
+
+    def capture(self, timeout=CAPTURE_TIMEOUT):
+        """
+        Wartet auf die neue Auswahl und gibt ihren Text zurück.
+
+        Nach der Änderung wird gelesen, bis Text da ist: Unter Windows zählt schon EmptyClipboard()
+        der Quellanwendung als Änderung, der Text folgt erst mit SetClipboardData/CloseClipboard.
+
+        Returns:
+            str: Der kopierte Text oder "" (kein Text innerhalb des Timeouts)
+        """
+        deadline = time.monotonic() + timeout
+        if not self.wait_for_change(timeout):
+            return ""
+        while True:
+            text = self.read() or ""
+            if text or time.monotonic() >= deadline:
+                return text
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        """Gibt Ressourcen frei."""
+
+
+class PollingClipboardWatcher(ClipboardWatcher):
+    """Bisheriges Verfahren: Zwischenablage leeren und paste() abfragen, bis sie nicht mehr leer ist."""
+
+    name = "polling"
+
+    def __init__(self, interval=POLL_INTERVAL, clipboard=None):
+        self.interval = interval
+        self.clipboard = clipboard
+        self._text = ""
+
+    def arm(self):
+        self._text = ""
+        if self.clipboard is not None:
+            self.clipboard.copy("")
+            time.sleep(0.02)  # Minimale Pause damit Clipboard geleert wird
+        elif HAS_PYPERCLIP:
+            pyperclip.copy("")
+            time.sleep(0.02)  # Minimale Pause damit Clipboard geleert wird
+
+    def wait_for_change(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            self._text = self.read()
+            if self._text:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval)
+
+    def capture(self, timeout=CAPTURE_TIMEOUT):
+        return self._text if self.wait_for_change(timeout) else ""
+
+
+class WindowsClipboardWatcher(ClipboardWatcher):
+    """Windows: wartet, bis sich die Sequenznummer der Zwischenablage ändert."""
+
+    name = "win32-sequence"
+
+    def __init__(self, interval=SEQUENCE_POLL_INTERVAL, clipboard=None):
+        self.interval = interval
+        self.clipboard = clipboard
+        self._user32 = ctypes.WinDLL("user32")
+        self._user32.GetClipboardSequenceNumber.restype = ctypes.c_uint32
+        self._sequence = self._user32.GetClipboardSequenceNumber()
+
+    def arm(self):
+        self._sequence = self._user32.GetClipboardSequenceNumber()
+
+    def wait_for_change(self, timeout):
+        deadline = time.monotonic() + timeout
+        while self._user32.GetClipboardSequenceNumber() == self._sequence:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.interval)
+        return True
+
+
+class X11ClipboardWatcher(ClipboardWatcher):
+    """
+    X11: abonniert per XFixes Änderungen des CLIPBOARD-Besitzers und wartet mit select() auf
+    den X-Socket. Nutzt eine eigene Display-Verbindung (nur aus einem Thread verwenden).
+
+    Raises:
+        OSError: Wenn libX11/libXfixes fehlen, kein Display erreichbar ist oder XFixes fehlt
+    """
+
+    name = "x11-xfixes"
+
+    def __init__(self, selection=b"CLIPBOARD", clipboard=None):
+        self.clipboard = clipboard
+        x11_path = ctypes.util.find_library("X11")
+        xfixes_path = ctypes.util.find_library("Xfixes")
+        if not x11_path or not xfixes_path:
+            raise OSError("libX11/libXfixes nicht gefunden")
+        self._x11 = x11 = ctypes.CDLL(x11_path)
+        self._xfixes = xfixes = ctypes.CDLL(xfixes_path)
+
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        x11.XDefaultRootWindow.restype = ctypes.c_ulong
+        x11.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        x11.XInternAtom.restype = ctypes.c_ulong
+        x11.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        x11.XFlush.argtypes = [ctypes.c_void_p]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xfixes.XFixesQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                ctypes.POINTER(ctypes.c_int)]
+        xfixes.XFixesSelectSelectionInput.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong,
+                                                      ctypes.c_ulong]
+
+        self._display = x11.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("X-Display nicht erreichbar")
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not xfixes.XFixesQueryExtension(self._display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            self.close()
+            raise OSError("XFixes-Erweiterung nicht verfügbar")
+        self._notify_type = event_base.value + XFIXES_SELECTION_NOTIFY
+        root = x11.XDefaultRootWindow(self._display)
+        atom = x11.XInternAtom(self._display, selection, 0)
+        xfixes.XFixesSelectSelectionInput(self._display, root, atom, XFIXES_SET_SELECTION_OWNER_NOTIFY_MASK)
+        x11.XFlush(self._display)
+        self._fd = x11.XConnectionNumber(self._display)
+        self._event = (ctypes.c_long * 24)()  # XEvent-Union (192 Bytes auf 64 Bit)
+
+    def _drain(self):
+        """Verarbeitet alle anstehenden Ereignisse; True, wenn ein Besitzerwechsel dabei war."""
+        changed = False
+        while self._x11.XPending(self._display):
+            self._x11.XNextEvent(self._display, self._event)
+            if ctypes.cast(self._event, ctypes.POINTER(ctypes.c_int))[0] == self._notify_type:
+                changed = True
+        return changed
+
+    def arm(self):
+        # Ältere Ereignisse (z.B. eigenes Einfügen per Zwischenablage) verwerfen
+        self._drain()
+
+    def wait_for_change(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._drain():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            select.select([self._fd], [], [], remaining)
+
+    def close(self):
+        if self._display:
+            self._x11.XCloseDisplay(self._display)
+            self._display = None
+
+
+def create_clipboard_watcher(mode="auto", clipboard=None):
+    """
+    Wählt den Watcher für diese Plattform.
+
+    Args:
+        mode (str): "auto" (Ereignis bzw. Sequenznummer, sonst Polling) oder "polling"
+        clipboard (Clipboard): Zwischenablage-Backend zum Lesen (None = pyperclip)
+
+    Returns:
+        ClipboardWatcher: Der gewählte Watcher
+    """
+    debug = get_debug_logger() if get_debug_logger else None
+    if mode != "polling":
+        try:
+            if sys.platform == "win32":
+                watcher = WindowsClipboardWatcher(clipboard=clipboard)
+            elif os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+                watcher = X11ClipboardWatcher(clipboard=clipboard)
+            else:
+                watcher = None
+            if watcher is not None:
+                if debug:
+                    debug.log("Zwischenablage-Watcher", f"Backend: {watcher.name}")
+                return watcher
+        except (OSError, AttributeError) as e:
+            if debug:
+                debug.log("Zwischenablage-Watcher nicht verfügbar, verwende Polling", f"Fehler: {e}", level="WARNING")
+    return PollingClipboardWatcher(clipboard=clipboard)
+
+
+def benchmark(rounds=20, delays=(0.05, 0.15)):
+    """
+    Vergleicht Erfassungs-Latenz und CPU-Kosten von Polling und Ereignis-Watcher.
+
+    Ein Hilfsthread belegt die Zwischenablage nach einer zufälligen Verzögerung (wie eine
+    Anwendung nach Ctrl+C); gemessen wird die Zeit vom Kopieren bis zum gelesenen Text sowie die
+    CPU-Zeit inkl. Kindprozessen (xclip/xsel). Benötigt ein Display (z.B. Xvfb) und pyperclip.
+
+    Returns:
+        dict: Backend-Name -> {"latency_ms": Mittelwert, "cpu_ms": CPU pro Erfassung, "misses": Anzahl}
+    """
+    import random
+    import threading
+
+    results = {}
+    for watcher in (PollingClipboardWatcher(), create_clipboard_watcher("auto")):
+        if watcher.name in results:
+            continue
+        latencies = []
+        misses = 0
+        cpu_start = os.times()
+        for index in range(rounds):
+            text = f"Benchmark {index} {random.random()}"
+            copied_at = []
+
+            def copy_later(text=text, copied_at=copied_at):
+                time.sleep(random.uniform(*delays))
+                copied_at.append(time.monotonic())
+                pyperclip.copy(text)
+
+            watcher.arm()
+            thread = threading.Thread(target=copy_later, daemon=True)
+            thread.start()
+            captured = watcher.capture()
+            done_at = time.monotonic()
+            thread.join()
+            if captured == text and copied_at:
+                latencies.append(done_at - copied_at[0])
+            else:
+                misses += 1
+        cpu_end = os.times()
+        cpu = sum(cpu_end[i] - cpu_start[i] for i in range(4))
+        results[watcher.name] = {
+            "latency_ms": sum(latencies) / len(latencies) * 1000 if latencies else None,
+            "cpu_ms": cpu / rounds * 1000,
+            "misses": misses,
+        }
+        watcher.close()
+    return results
+
+
+if __name__ == "__main__":
+    for name, stats in benchmark().items():
+        latency = f"{stats['latency_ms']:.1f} ms" if stats["latency_ms"] is not None else "-"
+        print(f"{name:>16}: Latenz {latency}, CPU {stats['cpu_ms']:.1f} ms pro Erfassung, "
+              f"Fehltreffer: {stats['misses']}")
@@ -4,6 +4,12 @@ import json
 import os
 import sys
 
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
 # --- AppData Path Function ---
 def get_appdata_path(filename="text_improver_settings.json"):
     """Gets the path for the settings file in AppData (Win) or .config (Linux/Mac)."""
@@ -35,6 +41,22 @@ def get_appdata_path(filename="text_improver_settings.json"):
         return filename
     return os.path.join(dir_path, filename)
 
+# --- Verfügbare Modelle (Auswahl im Einstellungsfenster, Kandidaten für den Modell-Router) ---
+AVAILABLE_MODELS = (
+    "gemini-3-pro-preview",
+    "gemini-2.5-flash",
+    "gemini-2.5-flash-lite",
+    "gemini-2.5-pro",
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-lite",
+)
+
+# --- Verfügbare Backends (siehe providers.py) ---
+AVAILABLE_PROVIDERS = (
+    "gemini",
+    "openai_compatible",
+)
+
 # --- Standardeinstellungen ---
 DEFAULT_SETTINGS = {
     "gemini_api_key": "",  # Must be set by user in settings
@@ -45,6 +67,46 @@ DEFAULT_SETTINGS = {
     "auto_insert_text": True,  # True = automatisch einfügen, False = nur in Zwischenablage
     "debug_enabled": False,
     "debug_log_to_file": False,
+    "connection_prewarm": True,  # Verbindung zum Gemini-Endpoint beim Hotkey vorab aufbauen
+    "prewarm_idle_interval": 0,  # Sekunden; >0 hält die Verbindung im Leerlauf warm, 0 = aus
+    "response_cache_enabled": True,  # Gleiche Anfragen aus dem Cache beantworten (ohne API-Aufruf)
+    "response_cache_memory_entries": 200,
+    "response_cache_max_mb": 20,
+    "response_cache_ttl_hours": 168,
+    "paragraph_memo_enabled": True,  # Verbesserte Absätze merken und bei erneutem Aufruf nur geänderte senden
+    "paragraph_memo_max_entries": 2000,
+    "long_text_mode": True,  # Lange Texte in Segmenten parallel verbessern
+    "long_text_threshold_tokens": 2000,  # Ab dieser (geschätzten) Länge wird segmentiert
+    "long_text_chunk_tokens": 1200,  # Token-Budget pro Segment
+    "long_text_max_concurrency": 4,  # Maximale Anzahl paralleler Requests
+    "request_timeout_min": 15,  # Sekunden; untere Grenze der adaptiven Frist pro Request
+    "request_timeout_max": 300,  # Sekunden; obere Grenze der adaptiven Frist pro Request
+    "hedge_enabled": False,  # Bei spätem ersten Chunk parallel ein Fallback-Modell anfragen
+    "hedge_fallback_model": "gemini-2.5-flash-lite",
+    "hedge_threshold": 0,  # Sekunden bis zum Hedge; 0 = gelerntes p90 der Zeit bis zum ersten Chunk
+    "retry_max_attempts": 3,  # Versuche bei 429/503/Netzwerkfehlern (1 = kein Retry)
+    "circuit_breaker_threshold": 5,  # Fehler in Folge, bis ein Modell vorübergehend gesperrt wird
+    "circuit_breaker_cooldown": 30,  # Sekunden bis zum nächsten Probe-Request
+    "router_enabled": False,  # Modell pro Request automatisch wählen (statt immer gemini_model)
+    "router_latency_slo": 8.0,  # Sekunden; Ziel-Latenz, die das gewählte Modell einhalten soll
+    "router_short_tokens": 150,  # Bis zu dieser Länge wird ein Lite-Modell bevorzugt
+    "router_long_tokens": 1500,  # Ab dieser Länge wird ein Pro-Modell bevorzugt
+    "router_candidates": [],  # Leer = alle AVAILABLE_MODELS
+    "provider": "gemini",  # Backend: "gemini" oder "openai_compatible" (llama.cpp, vLLM, ...)
+    "openai_base_url": "http://localhost:8080",  # Basis-URL des OpenAI-kompatiblen Servers
+    "openai_model": "local",  # Modellname, den der Server erwartet
+    "openai_api_key": "",  # Optional, wird als Bearer-Token gesendet
+    "gemini_base_url": "",  # Leer = offizieller Endpoint; z.B. http://127.0.0.1:8765 für fake_gemini_server.py
+    "record_streams": False,  # Streams mit Chunk-Timing als Fixtures aufzeichnen (AppData/stream_recordings)
+    "replay_path": "",  # Fixture-Datei oder -Verzeichnis für provider "replay"
+    "replay_speed": 1.0,  # Wiedergabe-Geschwindigkeit (2.0 = doppelt so schnell)
+    "edit_mode": False,  # Nur eine Änderungsliste anfordern und lokal anwenden (weniger Ausgabe-Tokens)
+    "context_cache_enabled": True,  # Langen System Prompt serverseitig cachen (Gemini, falls vom Modell unterstützt)
+    "clipboard_watcher": "auto",  # auto = auf Änderung der Zwischenablage warten (X11/Windows), polling = paste() abfragen
+    "clipboard_backend": "pyperclip",  # pyperclip = bisheriges Verfahren, tk = Zwischenablage über das eigene Tk-Fenster (kein Prozess pro Aufruf)
+    "capture_strategy": "keystroke",  # keystroke = immer Ctrl+C, primary = markierten Text unter X11 direkt lesen (nur aus dem aktiven Fenster, sonst Ctrl+C)
+    "stream_insert_enabled": False,  # Text schon während des Streams einfügen (nicht erst am Ende)
+    "masking_enabled": False,  # URLs, Code, E-Mail-Adressen und Zahlen vor dem Senden durch Platzhalter ersetzen
 }
 
 SETTINGS_FILE = get_appdata_path()
@@ -56,6 +118,7 @@ class ConfigManager:
         self.filename = filename
         self.defaults = defaults
         self.settings = self.load_settings()
+        self._change_listeners = []  # Callbacks (key, old_value, new_value)
 
     def load_settings(self):
         """Loads settings from the JSON file or returns defaults."""
@@ -71,7 +134,10 @@ class ConfigManager:
                 pass
 
             # Ensure correct types after loading/updating
-            for key in ['auto_insert_text', 'debug_enabled', 'debug_log_to_file']:
+            for key in ['auto_insert_text', 'debug_enabled', 'debug_log_to_file', 'connection_prewarm',
+                        'response_cache_enabled', 'long_text_mode', 'hedge_enabled', 'record_streams',
+                        'router_enabled', 'edit_mode', 'context_cache_enabled',
+                        'stream_insert_enabled', 'masking_enabled', 'paragraph_memo_enabled']:
                 if key in settings:
                     settings[key] = bool(settings[key])
 
@@ -135,6 +201,26 @@ class ConfigManager:
         return self.settings.get(key, self.defaults.get(key))
 
     def set(self, key, value):
-        """Sets a specific setting value."""
+        """Sets a specific setting value and notifies listeners if it changed."""
+        old_value = self.settings.get(key, self.defaults.get(key))
         self.settings[key] = value
+        if old_value != value:
+            for listener in list(self._change_listeners):
+                try:
+                    listener(key, old_value, value)
+                except Exception as e:
+                    # Ein fehlerhafter Listener darf das Speichern nicht verhindern
+                    debug = get_debug_logger() if get_debug_logger else None
+                    if debug:
+                        debug.log_exception(f"Fehler im Einstellungs-Listener für '{key}'", e)
+
+    def add_change_listener(self, callback):
+        """Registers a callback(key, old_value, new_value) that is called when a setting changes."""
+        if callback not in self._change_listeners:
+            self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        """Removes a previously registered change listener."""
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
 
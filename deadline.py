@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import threading
+import time
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+class DeadlineExceeded(Exception):
+    """Wird ausgelöst, wenn die Frist eines Requests abgelaufen ist."""
+
+
+_request_ids = itertools.count(1)
+
+
+class Deadline:
+    """
+    Absolute Frist für einen Request.
+
+    Wird pro Hotkey-Druck erstellt und bis in gemini_api.py durchgereicht. Dort wird die
+    Restzeit als Socket-/Request-Timeout und als Stream-Timeout zwischen Chunks verwendet.
+    """
+
+    def __init__(self, timeout, request_id=None):
+        self.timeout = float(timeout)
+        self.request_id = request_id if request_id is not None else next(_request_ids)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.timeout
+        self._cancelled = threading.Event()
+
+    def remaining(self):
+        """Verbleibende Zeit in Sekunden (nie negativ)."""
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        """Seit Erstellung vergangene Zeit in Sekunden."""
+        return time.monotonic() - self.started_at
+
+    def expired(self):
+        """True, wenn die Frist abgelaufen ist oder der Request abgebrochen wurde."""
+        return self.remaining() <= 0.0
+
+    def cancel(self):
+        """Bricht den Request ab (Frist gilt sofort als abgelaufen)."""
+        self._cancelled.set()
+
+    def check(self):
+        """Löst DeadlineExceeded aus, wenn die Frist abgelaufen ist."""
+        if self.expired():
+            raise DeadlineExceeded(f"Frist von {self.timeout:.1f}s für Request {self.request_id} abgelaufen")
+
+    def timeout_for(self, cap=None):
+        """Restzeit als Timeout, optional nach oben begrenzt (z.B. für einzelne Wartezeiten)."""
+        remaining = self.remaining()
+        return min(remaining, cap) if cap is not None else remaining
+
+    def __repr__(self):
+        return f"Deadline(request_id={self.request_id}, timeout={self.timeout:.1f}s, remaining={self.remaining():.1f}s)"
+
+
+class AdaptiveTimeout:
+    """
+    Berechnet die Frist pro Request aus Eingabelänge und beobachtetem Durchsatz.
+
+    Pro Modell werden Zeit bis zum ersten Chunk (TTFB) und Ausgabe-Durchsatz (Zeichen/s)
+    als gleitender Mittelwert gelernt. Frist = Sicherheitsfaktor * (TTFB + erwartete
+    Ausgabe / Durchsatz), begrenzt auf [min_timeout, max_timeout].
+    """
+
+    DEFAULT_TTFB = 5.0           # Sekunden, bevor Messwerte vorliegen
+    DEFAULT_THROUGHPUT = 100.0   # Zeichen/s, bewusst vorsichtig
+    SMOOTHING = 0.3              # Gewicht neuer Messwerte
+
+    def __init__(self, min_timeout=15.0, max_timeout=300.0, safety_factor=3.0):
+        self.min_timeout = float(min_timeout)
+        self.max_timeout = float(max_timeout)
+        self.safety_factor = float(safety_factor)
+        self._stats = {}  # model -> {"ttfb": float, "throughput": float, "samples": int}
+        self._lock = threading.Lock()
+
+    def record(self, model, ttfb, output_chars, duration):
+        """Nimmt die Messwerte eines erfolgreichen Requests auf."""
+        if ttfb is None or duration is None or duration <= 0:
+            return
+        streaming_time = max(duration - ttfb, 0.05)
+        throughput = max(output_chars / streaming_time, 1.0)
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                self._stats[model] = {"ttfb": ttfb, "throughput": throughput, "samples": 1}
+            else:
+                alpha = self.SMOOTHING
+                stats["ttfb"] = (1 - alpha) * stats["ttfb"] + alpha * ttfb
+                stats["throughput"] = (1 - alpha) * stats["throughput"] + alpha * throughput
+                stats["samples"] += 1
+
+    def estimate(self, model, input_chars, output_chars=None):
+        """
+        Erwartete Dauer (ohne Sicherheitsfaktor) in Sekunden.
+
+        Ohne output_chars (z.B. aus dem Token-Schätzer) wird die Ausgabe so lang wie die Eingabe angenommen.
+        """
+        with self._lock:
+            stats = self._stats.get(model, {})
+            ttfb = stats.get("ttfb", self.DEFAULT_TTFB)
+            throughput = stats.get("throughput", self.DEFAULT_THROUGHPUT)
+        if output_chars is None:
+            output_chars = input_chars
+        return ttfb + output_chars / throughput
+
+    def timeout_for(self, model, input_chars, output_chars=None):
+        """Frist in Sekunden für einen Request dieser Länge."""
+        timeout = self.safety_factor * self.estimate(model, input_chars, output_chars)
+        return min(self.max_timeout, max(self.min_timeout, timeout))
+
+    def new_deadline(self, model, input_chars, output_chars=None):
+        """Erstellt eine Deadline für einen Request und loggt die Berechnung."""
+        deadline = Deadline(self.timeout_for(model, input_chars, output_chars))
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            with self._lock:
+                samples = self._stats.get(model, {}).get("samples", 0)
+            debug.log("Deadline berechnet",
+                      f"Request {deadline.request_id}: {deadline.timeout:.1f}s für {input_chars} Zeichen "
+                      f"(Modell: {model}, Messwerte: {samples})")
+        return deadline
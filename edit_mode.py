@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+import json
+import re
+import time
+
+from text_chunker import estimate_tokens
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+EDIT_INSTRUCTIONS = (
+    "Gib NICHT den ganzen Text zurück. Antworte ausschließlich mit einer JSON-Liste der nötigen "
+    "Ersetzungen in der Reihenfolge ihres Vorkommens, z.B. "
+    '[{"alt": "exakter Originalausschnitt", "neu": "Ersatz"}]. '
+    '"alt" muss wörtlich im Text vorkommen und so kurz wie möglich, aber eindeutig sein. '
+    "Ist nichts zu ändern, antworte mit []."
+)
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+
+
+class EditListError(ValueError):
+    """Die Antwort ist keine gültige Änderungsliste für den Originaltext."""
+
+
+def build_edit_prompt(system_prompt):
+    """Ergänzt den System Prompt um die Anweisung, nur eine Änderungsliste zu liefern."""
+    return f"{system_prompt}\n\n{EDIT_INSTRUCTIONS}"
+
+
+def parse_edits(response_text):
+    """
+    Parst die Änderungsliste des Modells.
+
+    Returns:
+        list: Liste von (alt, neu) Tupeln
+
+    Raises:
+        EditListError: Wenn die Antwort kein gültiges JSON in der erwarteten Form ist
+    """
+    if response_text is None:
+        raise EditListError("Keine Antwort")
+    text = response_text.strip()
+    fenced = _FENCE_RE.match(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise EditListError(f"Kein gültiges JSON: {e}")
+    if not isinstance(data, list):
+        raise EditListError("JSON ist keine Liste")
+
+    edits = []
+    for item in data:
+        if not isinstance(item, dict):
+            raise EditListError(f"Eintrag ist kein Objekt: {item!r}")
+        old = item.get("alt", item.get("old"))
+        new = item.get("neu", item.get("new"))
+        if not isinstance(old, str) or not old or not isinstance(new, str):
+            raise EditListError(f"Ungültiger Eintrag: {item!r}")
+        edits.append((old, new))
+    return edits
+
+
+def apply_edits(original_text, edits):
+    """
+    Wendet die Ersetzungen der Reihe nach auf den Originaltext an.
+
+    Jede Ersetzung wird ab dem Ende der vorherigen gesucht, damit die Reihenfolge
+    eindeutig bleibt und bereits ersetzter Text nicht erneut getroffen wird.
+
+    Raises:
+        EditListError: Wenn ein Ausschnitt nicht (mehr) im Text vorkommt
+    """
+    parts = []
+    position = 0
+    for old, new in edits:
+        index = original_text.find(old, position)
+        if index < 0:
+            raise EditListError(f"Ausschnitt nicht gefunden: {old[:50]!r}")
+        parts.append(original_text[position:index])
+        parts.append(new)
+        position = index + len(old)
+    parts.append(original_text[position:])
+    return "".join(parts)
+
+
+def _log_savings(original_text, response_text, edits, duration):
+    debug = get_debug_logger() if get_debug_logger else None
+    if not debug:
+        return
+    output_tokens = estimate_tokens(response_text)
+    full_tokens = estimate_tokens(original_text)
+    debug.log("Diff-Modus angewendet",
+              f"{len(edits)} Ersetzungen, Ausgabe ~{output_tokens} statt ~{full_tokens} Tokens "
+              f"({max(0, full_tokens - output_tokens)} gespart), Dauer: {duration:.3f}s")
+
+
+async def improve_with_edits_async(provider, text, model, system_prompt, deadline=None):
+    """
+    Fordert eine Änderungsliste an und wendet sie lokal auf den Originaltext an.
+
+    Args:
+        provider (Provider): Das Backend (providers.py)
+        text (str): Der Originaltext
+        model (str): Das Modell
+        system_prompt (str): Der normale System Prompt (wird ergänzt)
+        deadline (Deadline): Optionale Frist
+
+    Returns:
+        str: Der verbesserte Text oder None, wenn die Liste ungültig ist (Aufrufer fällt auf
+             den vollständigen Text zurück)
+    """
+    start = time.monotonic()
+    response_text = await provider.improve_async(text, model, build_edit_prompt(system_prompt), None, deadline)
+    return _apply_response(text, response_text, time.monotonic() - start)
+
+
+def improve_with_edits(provider, text, model, system_prompt, deadline=None):
+    """Blockierendes Gegenstück zu improve_with_edits_async."""
+    start = time.monotonic()
+    response_text = provider.improve_stream(text, model, build_edit_prompt(system_prompt), None, deadline)
+    return _apply_response(text, response_text, time.monotonic() - start)
+
+
+def _apply_response(text, response_text, duration):
+    try:
+        edits = parse_edits(response_text)
+        improved_text = apply_edits(text, edits)
+    except EditListError as e:
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Diff-Modus: ungültige Änderungsliste, verwende vollständigen Text", str(e), level="WARNING")
+        return None
+    _log_savings(text, response_text, edits, duration)
+    return improved_text
+
+
+BENCHMARK_CORPUS = (
+    "Ich habe gestern mit meinem Kollege gesprochen und wir haben beschlossen das wir das Projekt "
+    "nächste Woche starten werden. Bitte gib mir bescheid, ob du Zeit hast.",
+    "Sehr geehrte Damen und Herren, hiermit möchte ich mich für die ausgeschriebene Stelle bewerben. "
+    "Ich habe fünf Jahre Erfahrung in der Softwareentwicklung und arbeite gerne im Team. "
+    "Über eine Einladung zu einem Vorstellungsgespräch würde ich mich sehr freuen.",
+    "Das Meeting wurde auf Donnerstag verschoben, weil der Raum am Mittwoch schon belegt war. "
+    "Die Agenda bleibt gleich, aber wir fangen eine halbe Stunde später an. "
+    "Falls jemand nicht kann, bitte kurz melden damit wir planen können.",
+)
+
+
+def benchmark(provider, model, system_prompt, corpus=BENCHMARK_CORPUS):
+    """
+    Vergleicht Diff-Modus und vollständige Überarbeitung auf einem Korpus (blockierend).
+
+    Returns:
+        dict: Summen für "full" und "edits" (output_tokens, seconds) sowie "fallbacks"
+    """
+    results = {"full": {"output_tokens": 0, "seconds": 0.0},
+               "edits": {"output_tokens": 0, "seconds": 0.0}, "fallbacks": 0}
+    for text in corpus:
+        start = time.monotonic()
+        full_text = provider.improve_stream(text, model, system_prompt, None)
+        results["full"]["seconds"] += time.monotonic() - start
+        results["full"]["output_tokens"] += estimate_tokens(full_text or "")
+
+        start = time.monotonic()
+        response_text = provider.improve_stream(text, model, build_edit_prompt(system_prompt), None)
+        results["edits"]["seconds"] += time.monotonic() - start
+        results["edits"]["output_tokens"] += estimate_tokens(response_text or "")
+        try:
+            apply_edits(text, parse_edits(response_text))
+        except EditListError:
+            results["fallbacks"] += 1
+    return results
+
+
+if __name__ == "__main__":
+    from config import ConfigManager
+    from providers import create_provider
+
+    config = ConfigManager()
+    provider = create_provider(config)
+    model = config.get("gemini_model") if provider.name == "gemini" else config.get("openai_model", "local")
+    results = benchmark(provider, model, config.get("system_prompt"))
+    for mode in ("full", "edits"):
+        print(f"{mode:>5}: ~{results[mode]['output_tokens']} Ausgabe-Tokens, {results[mode]['seconds']:.2f}s")
+    print(f"Ungültige Änderungslisten: {results['fallbacks']}/{len(BENCHMARK_CORPUS)}")
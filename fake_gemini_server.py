@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+Lokaler Ersatz für die Gemini REST API zum Messen von Latenz und Durchsatz ohne Netzwerk.
+
+Implementiert generateContent, streamGenerateContent (SSE), countTokens, models.get,
+cachedContents (Anlegen, Verlängern, Löschen) und Fortsetzungen (Verlauf mit Modell-Turn) so weit,
+dass genai.Client über einen Base-URL-Override damit spricht. TTFB, Tokens pro Sekunde,
+Chunk-Größe, Fehlerraten (429/500/Abbruch mitten im Stream) und ein Concurrency-Limit sind
+einstellbar, auch zur Laufzeit über configure().
+
+Start als Skript:
+    python fake_gemini_server.py --port 8765 --ttfb 0.4 --tps 80 --error-429 0.1
+Danach in den Einstellungen "gemini_base_url" auf http://127.0.0.1:8765 setzen
+(oder die Umgebungsvariable GEMINI_BASE_URL).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+_PATH_RE = re.compile(r"^/(?P<version>[^/]+)/models/(?P<model>[^:/?]+)(?::(?P<method>\w+))?")
+_CACHE_PATH_RE = re.compile(r"^/(?P<version>[^/]+)/cachedContents(?:/(?P<id>[^/?]+))?")
+
+DEFAULT_FAULTS = {
+    "ttfb": 0.3,                # Sekunden bis zum ersten Chunk bzw. zur Antwort
+    "ttfb_jitter": 0.0,         # Zusätzliche zufällige Verzögerung (0..jitter Sekunden)
+    "tokens_per_second": 80.0,  # Ausgabe-Durchsatz
+    "chunk_tokens": 8,          # Tokens pro Stream-Chunk
+    "error_rate_429": 0.0,      # Anteil Requests mit 429 RESOURCE_EXHAUSTED
+    "error_rate_500": 0.0,      # Anteil Requests mit 500 INTERNAL
+    "disconnect_rate": 0.0,     # Anteil Streams, die mitten im Stream abbrechen
+    "retry_delay": 1.0,         # retryDelay im 429 (Sekunden)
+    "max_concurrency": 0,       # Gleichzeitige Requests; darüber 429 (0 = unbegrenzt)
+    "response_text": None,      # Feste Antwort; None = Eingabetext zurückgeben
+}
+
+
+class FakeGeminiServer:
+    """
+    Fault-injizierender Gemini-Server in einem Hintergrund-Thread.
+
+    Beispiel:
+        server = FakeGeminiServer(ttfb=0.5, error_rate_429=0.2).start()
+        # genai.Client(api_key="test", http_options=HttpOptions(base_url=server.base_url))
+        server.stop()
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, seed=None, **faults):
+        self.host = host
+        self.port = port
+        self.faults = dict(DEFAULT_FAULTS)
+        self.configure(**faults)
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "streams": 0, "errors_429": 0, "errors_500": 0,
+                      "disconnects": 0, "rejected_concurrency": 0, "active": 0, "max_active": 0,
+                      "caches_created": 0, "cache_hits": 0, "continuations": 0}
+        self.caches = {}  # name -> {"model", "display_name", "tokens", "expires"}
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def configure(self, **faults):
+        """Ändert Fault-Parameter (auch während der Server läuft)."""
+        unknown = set(faults) - set(DEFAULT_FAULTS)
+        if unknown:
+            raise ValueError(f"Unbekannte Parameter: {', '.join(sorted(unknown))}")
+        self.faults.update(faults)
+        return self
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Startet den Server (Port 0 = freier Port) und gibt self zurück."""
+        handler = type("FakeGeminiHandler", (_FakeGeminiHandler,), {"server_state": self})
+        self._httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake_gemini_server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def serve_forever(self):
+        """Blockierender Betrieb (für den Skript-Modus)."""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self.stats[key] += delta
+            if key == "active":
+                self.stats["max_active"] = max(self.stats["max_active"], self.stats["active"])
+            return self.stats[key]
+
+
+def _extract_text(body):
+    """Gibt den zu verbessernden Text zurück (Prompt-Format aus gemini_api: System Prompt + Leerzeile + Text)."""
+    texts = []
+    for content in body.get("contents") or []:
+        if isinstance(content, str):
+            texts.append(content)
+            continue
+        for part in content.get("parts") or []:
+            if part.get("text"):
+                texts.append(part["text"])
+    prompt = "\n".join(texts)
+    if body.get("systemInstruction") or body.get("system_instruction") or body.get("cachedContent") \
+            or "\n\n" not in prompt:
+        return prompt
+    return prompt.split("\n\n", 1)[1]
+
+
+def _continuation(body):
+    """
+    Erkennt eine Fortsetzungs-Anfrage (Verlauf mit Modell-Turn).
+
+    Returns:
+        tuple: (Originaltext, bisherige Antwort) oder None
+    """
+    contents = body.get("contents") or []
+    if isinstance(contents, str) or len(contents) < 2:
+        return None
+    roles = [content.get("role") for content in contents if isinstance(content, dict)]
+    if "model" not in roles:
+        return None
+
+    def content_text(content):
+        return "".join(part.get("text", "") for part in content.get("parts") or [])
+
+    original = content_text(contents[0])
+    partial = "".join(content_text(c) for c in contents if isinstance(c, dict) and c.get("role") == "model")
+    return original, partial
+
+
+def _continuation_output(output, partial):
+    """Rest der Antwort ab dem Ende von partial, mit dem letzten Wort davor (wie ein echtes Modell)."""
+    if not output.startswith(partial):
+        return output
+    overlap = len(partial) - max(partial.rstrip().rfind(" "), 0)
+    return output[len(partial) - overlap:]
+
+
+def _token_count(value):
+    return len(json.dumps(value)) // CHARS_PER_TOKEN + 1 if value else 0
+
+
+def _ttl_seconds(body, default=3600.0):
+    try:
+        return float(str(body.get("ttl", default)).rstrip("s"))
+    except ValueError:
+        return default
+
+
+def _response_json(model, text, prompt_tokens, finished, cached_tokens=0):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    payload = {"candidates": [candidate], "modelVersion": model}
+    if finished:
+        candidate["finishReason"] = "STOP"
+        output_tokens = len(text) // CHARS_PER_TOKEN + 1
+        payload["usageMetadata"] = {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+                                    "totalTokenCount": prompt_tokens + output_tokens}
+        if cached_tokens:
+            payload["usageMetadata"]["cachedContentTokenCount"] = cached_tokens
+    return payload
+
+
+class _FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Hilfsfunktionen ---
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, code, status, message, retry_delay=None):
+        error = {"code": code, "message": message, "status": status}
+        if retry_delay is not None:
+            error["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                 "retryDelay": f"{retry_delay:g}s"}]
+        self._send_json(code, {"error": error})
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            return {}
+
+    # --- Endpunkte ---
+
+    def _cache_json(self, name):
+        entry = self.server_state.caches[name]
+        expire_time = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry["expires"]))
+        return {"name": name, "model": f"models/{entry['model']}", "displayName": entry["display_name"],
+                "expireTime": expire_time, "usageMetadata": {"totalTokenCount": entry["tokens"]}}
+
+    def _handle_cache(self, method, cache_id, body):
+        """cachedContents: POST legt an, GET liest, PATCH setzt die TTL neu, DELETE löscht."""
+        state = self.server_state
+        name = f"cachedContents/{cache_id}" if cache_id else None
+        with state._lock:
+            if method == "POST" and not cache_id:
+                state.stats["caches_created"] += 1
+                name = f"cachedContents/fake{state.stats['caches_created']}"
+                model = str(body.get("model", "")).split("/")[-1]
+                state.caches[name] = {"model": model, "display_name": body.get("displayName", ""),
+                                      "tokens": _token_count(body.get("systemInstruction")) +
+                                                _token_count(body.get("contents")),
+                                      "expires": time.time() + _ttl_seconds(body)}
+            elif name not in state.caches or state.caches[name]["expires"] < time.time():
+                state.caches.pop(name, None)
+                name = None
+            elif method == "PATCH":
+                state.caches[name]["expires"] = time.time() + _ttl_seconds(body)
+            elif method == "DELETE":
+                del state.caches[name]
+                self._send_json(200, {})
+                return
+            if name is None:
+                self._send_error(404, "NOT_FOUND", f"CachedContent nicht gefunden: {cache_id}")
+                return
+            payload = self._cache_json(name)
+        self._send_json(200, payload)
+
+    def do_PATCH(self):
+        match = _CACHE_PATH_RE.match(self.path)
+        body = self._read_body()
+        if not match or not match.group("id"):
+            self._send_error(404, "NOT_FOUND", f"Unbekannter Pfad: {self.path}")
+            return
+        self._handle_cache("PATCH", match.group("id"), body)
+
+    def do_DELETE(self):
+        match = _CACHE_PATH_RE.match(self.path)
+        if not match or not match.group("id"):
+            self._send_error(404, "NOT_FOUND", f"Unbekannter Pfad: {self.path}")
+            return
+        self._handle_cache("DELETE", match.group("id"), {})
+
+    def do_GET(self):
+        cache_match = _CACHE_PATH_RE.match(self.path)
+        if cache_match and cache_match.group("id"):
+            self._handle_cache("GET", cache_match.group("id"), {})
+            return
+        match = _PATH_RE.match(self.path)
+        if not match or match.group("method"):
+            self._send_error(404, "NOT_FOUND", f"Unbekannter Pfad: {self.path}")
+            return
+        model = match.group("model")
+        self._send_json(200, {"name": f"models/{model}", "displayName": model,
+                              "inputTokenLimit": 1048576, "outputTokenLimit": 65536,
+                              "supportedGenerationMethods": ["generateContent", "countTokens"]})
+
+    def do_POST(self):
+        state = self.server_state
+        faults = state.faults
+        match = _PATH_RE.match(self.path)
+        body = self._read_body()
+        cache_match = _CACHE_PATH_RE.match(self.path)
+        if cache_match and not cache_match.group("id"):
+            self._handle_cache("POST", None, body)
+            return
+        if not match:
+            self._send_error(404, "NOT_FOUND", f"Unbekannter Pfad: {self.path}")
+            return
+        model, method = match.group("model"), match.group("method")
+
+        if method == "countTokens":
+            tokens = len(_extract_text(body)) // CHARS_PER_TOKEN + 1
+            self._send_json(200, {"totalTokens": tokens})
+            return
+        if method not in ("generateContent", "streamGenerateContent"):
+            self._send_error(404, "NOT_FOUND", f"Unbekannte Methode: {method}")
+            return
+
+        state._count("requests")
+        active = state._count("active")
+        try:
+            if faults["max_concurrency"] and active > faults["max_concurrency"]:
+                state._count("rejected_concurrency")
+                self._send_error(429, "RESOURCE_EXHAUSTED", "Zu viele gleichzeitige Requests",
+                                 faults["retry_delay"])
+                return
+
+            roll = state.random.random()
+            if roll < faults["error_rate_429"]:
+                state._count("errors_429")
+                self._send_error(429, "RESOURCE_EXHAUSTED", "Quota überschritten (simuliert)", faults["retry_delay"])
+                return
+            if roll < faults["error_rate_429"] + faults["error_rate_500"]:
+                state._count("errors_500")
+                self._send_error(500, "INTERNAL", "Interner Fehler (simuliert)")
+                return
+
+            cached_tokens = 0
+            if body.get("cachedContent"):
+                with state._lock:
+                    entry = state.caches.get(body["cachedContent"])
+                    if entry is None or entry["expires"] < time.time():
+                        entry = None
+                    else:
+                        state.stats["cache_hits"] += 1
+                if entry is None:
+                    self._send_error(404, "NOT_FOUND", f"CachedContent nicht gefunden: {body['cachedContent']}")
+                    return
+                cached_tokens = entry["tokens"]
+
+            continuation = _continuation(body)
+            text = continuation[0] if continuation else _extract_text(body)
+            output = faults["response_text"] if faults["response_text"] is not None else text
+            if continuation:
+                state._count("continuations")
+                output = _continuation_output(output, continuation[1])
+            prompt_tokens = _token_count(body.get("contents", "")) + _token_count(body.get("systemInstruction"))
+            prompt_tokens += cached_tokens
+            time.sleep(faults["ttfb"] + state.random.uniform(0, faults["ttfb_jitter"]))
+
+            if method == "generateContent":
+                time.sleep(len(output) / CHARS_PER_TOKEN / max(faults["tokens_per_second"], 0.001))
+                self._send_json(200, _response_json(model, output, prompt_tokens, True, cached_tokens))
+            else:
+                self._stream(model, output, prompt_tokens, cached_tokens)
+        finally:
+            state._count("active", -1)
+
+    def _stream(self, model, output, prompt_tokens, cached_tokens=0):
+        state = self.server_state
+        faults = state.faults
+        state._count("streams")
+        chunk_chars = max(1, int(faults["chunk_tokens"]) * CHARS_PER_TOKEN)
+        chunks = [output[i:i + chunk_chars] for i in range(0, len(output), chunk_chars)] or [""]
+        disconnect_at = len(chunks) // 2 if state.random.random() < faults["disconnect_rate"] else None
+        delay = faults["chunk_tokens"] / max(faults["tokens_per_second"], 0.001)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for index, chunk_text in enumerate(chunks):
+            if index == disconnect_at:
+                # Verbindung ohne abschließenden Chunk schließen (wie ein abgerissener Stream)
+                state._count("disconnects")
+                self.close_connection = True
+                self.wfile.flush()
+                self.connection.close()
+                return
+            if index > 0:
+                time.sleep(delay)
+            payload = _response_json(model, chunk_text, prompt_tokens, index == len(chunks) - 1, cached_tokens)
+            self._write_chunk(f"data: {json.dumps(payload)}\r\n\r\n".encode("utf-8"))
+        self._write_chunk(b"")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fault-injizierender Gemini-Ersatzserver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--ttfb", type=float, default=DEFAULT_FAULTS["ttfb"])
+    parser.add_argument("--ttfb-jitter", type=float, default=DEFAULT_FAULTS["ttfb_jitter"])
+    parser.add_argument("--tps", type=float, default=DEFAULT_FAULTS["tokens_per_second"], help="Tokens pro Sekunde")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_FAULTS["chunk_tokens"])
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-500", type=float, default=0.0)
+    parser.add_argument("--disconnect", type=float, default=0.0)
+    parser.add_argument("--retry-delay", type=float, default=DEFAULT_FAULTS["retry_delay"])
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--response-text", default=None)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(
+        host=args.host, port=args.port, seed=args.seed,
+        ttfb=args.ttfb, ttfb_jitter=args.ttfb_jitter, tokens_per_second=args.tps,
+        chunk_tokens=args.chunk_tokens, error_rate_429=args.error_429, error_rate_500=args.error_500,
+        disconnect_rate=args.disconnect, retry_delay=args.retry_delay,
+        max_concurrency=args.max_concurrency, response_text=args.response_text,
+    )
+    print(f"Fake Gemini Server läuft auf {server.base_url} (Strg+C zum Beenden)")
+    print(f"Einstellung 'gemini_base_url' oder GEMINI_BASE_URL auf {server.base_url} setzen.")
+    server.serve_forever()
+    print(f"Statistik: {server.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
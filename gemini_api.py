@@ -1,8 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+import collections
+import hashlib
+import importlib.util
+import inspect
+import itertools
 import os
+import random
+import threading
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from async_runtime import get_async_runtime
+from deadline import DeadlineExceeded
+from stream_filters import clean_text, ContinuationStitcher
+from stream_recorder import StreamRecorder
+from text_chunker import split_text, estimate_tokens
 
 try:
     from google import genai
@@ -12,14 +27,1160 @@ except ImportError:
     print("FATAL ERROR: 'google-genai' not found.")
     print("Install with: pip install google-genai")
 
-# Debug Logger Import
-try:
-    from debug_logger import get_debug_logger
-except ImportError:
-    get_debug_logger = None
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+# --- Client-Pool ---
+# Ein langlebiger Client pro (API Key, SDK-Fähigkeiten). Der Client hält intern einen
+# httpx-Connection-Pool, dadurch entfallen DNS/TCP/TLS-Handshakes bei jedem Hotkey.
+CLIENT_KEEPALIVE_EXPIRY = 120.0  # Sekunden, die eine ungenutzte Verbindung offen bleibt
+CLIENT_MAX_KEEPALIVE_CONNECTIONS = 10
+
+_sdk_capabilities = None
+_base_url = os.environ.get("GEMINI_BASE_URL") or None  # Override, z.B. für fake_gemini_server.py
+_client_pool = {}
+_client_pool_lock = threading.Lock()
+_client_pool_stats = {"hits": 0, "misses": 0, "rebuilds": 0}
+
+
+def probe_sdk_capabilities():
+    """
+    Ermittelt einmalig, welche Features die installierte google-genai Version unterstützt.
+    
+    Returns:
+        dict: Fähigkeiten (api_key_param, http_options, client_args, http2, aio)
+    """
+    global _sdk_capabilities
+    if _sdk_capabilities is not None:
+        return _sdk_capabilities
+    
+    caps = {
+        "api_key_param": False,   # genai.Client(api_key=...) möglich
+        "http_options": False,    # genai.types.HttpOptions vorhanden
+        "client_args": False,     # HttpOptions(client_args=...) für httpx-Optionen
+        "http2": False,           # 'h2' installiert -> httpx kann HTTP/2
+        "aio": False,             # Async-Client (client.aio) vorhanden
+        "request_http_options": False,  # GenerateContentConfig(http_options=...) pro Request
+    }
+    if HAS_GENAI:
+        try:
+            params = inspect.signature(genai.Client.__init__).parameters
+            caps["api_key_param"] = "api_key" in params or any(
+                p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()
+            )
+        except (TypeError, ValueError):
+            caps["api_key_param"] = True
+        
+        http_options_cls = getattr(getattr(genai, "types", None), "HttpOptions", None)
+        if http_options_cls is not None:
+            caps["http_options"] = True
+            fields = getattr(http_options_cls, "model_fields", {}) or {}
+            caps["client_args"] = "client_args" in fields
+        
+        caps["http2"] = importlib.util.find_spec("h2") is not None
+        caps["aio"] = hasattr(genai.Client, "aio")
+        
+        config_cls = getattr(getattr(genai, "types", None), "GenerateContentConfig", None)
+        if config_cls is not None and caps["http_options"]:
+            caps["request_http_options"] = "http_options" in (getattr(config_cls, "model_fields", {}) or {})
+    
+    _sdk_capabilities = caps
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    if debug:
+        debug.log("SDK-Fähigkeiten ermittelt", ", ".join(f"{k}={v}" for k, v in caps.items()))
+    return caps
+
+
+def _build_http_options(caps):
+    """Erstellt HttpOptions mit persistentem (HTTP/2-fähigem) Connection-Pool und Base-URL-Override, falls unterstützt."""
+    if not caps["http_options"]:
+        return None
+    options = {}
+    if _base_url:
+        options["base_url"] = _base_url
+    if caps["client_args"]:
+        try:
+            import httpx
+            client_args = {
+                "limits": httpx.Limits(
+                    max_keepalive_connections=CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=CLIENT_KEEPALIVE_EXPIRY,
+                ),
+            }
+            if caps["http2"]:
+                client_args["http2"] = True
+            options["client_args"] = client_args
+            if importlib.util.find_spec("aiohttp") is None:
+                # Neuere SDKs nutzen für den Async-Client aiohttp, dort passen die httpx-Optionen nicht
+                options["async_client_args"] = dict(client_args)
+        except Exception:
+            pass
+    if not options:
+        return None
+    try:
+        return genai.types.HttpOptions(**options)
+    except Exception:
+        return None
+
+
+def set_base_url(base_url):
+    """
+    Setzt einen alternativen API-Endpoint (z.B. fake_gemini_server.py) und baut den Pool neu auf.
+    
+    Args:
+        base_url (str): Basis-URL oder leer für den offiziellen Endpoint
+    """
+    global _base_url
+    base_url = base_url or os.environ.get("GEMINI_BASE_URL") or None
+    if base_url == _base_url:
+        return
+    _base_url = base_url
+    reset_client_pool()
+    debug = get_debug_logger() if get_debug_logger else None
+    if debug:
+        debug.log("Gemini Base-URL gesetzt", base_url or "Standard-Endpoint")
+
+
+def _create_client(api_key, caps):
+    """Erstellt einen neuen genai.Client entsprechend der SDK-Fähigkeiten."""
+    debug = get_debug_logger() if get_debug_logger else None
+    
+    if not caps["api_key_param"]:
+        # Fallback: Client akzeptiert keinen api_key Parameter, verwende Umgebungsvariable
+        os.environ['GEMINI_API_KEY'] = api_key
+        if debug:
+            debug.log("API Key in Umgebungsvariable gesetzt (Fallback)", f"Länge: {len(api_key)} Zeichen")
+        return genai.Client()
+    
+    http_options = _build_http_options(caps)
+    if http_options is not None:
+        try:
+            client = genai.Client(api_key=api_key, http_options=http_options)
+            if debug:
+                debug.log("Client erstellt", f"Mit direktem API Key, persistentem Pool, HTTP/2: {caps['http2']}, "
+                                             f"Base-URL: {_base_url or 'Standard'}")
+            return client
+        except (TypeError, ValueError) as e:
+            if debug:
+                debug.log("HttpOptions nicht akzeptiert, erstelle Client ohne", f"Fehler: {e}", level="WARNING")
+    
+    client = genai.Client(api_key=api_key)
+    if debug:
+        debug.log("Client erstellt", "Mit direktem API Key")
+    return client
+
+
+def _close_client(client):
+    """Schließt einen Client (falls die SDK-Version das unterstützt)."""
+    close = getattr(client, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def get_client(api_key):
+    """
+    Gibt den gepoolten Client für den API Key zurück und erstellt ihn bei Bedarf.
+    
+    Wechselt der API Key, werden Clients für alte Keys geschlossen und verworfen.
+    
+    Args:
+        api_key (str): Der Gemini API Key
+        
+    Returns:
+        genai.Client: Der wiederverwendbare Client
+    """
+    caps = probe_sdk_capabilities()
+    pool_key = (api_key, tuple(sorted(caps.items())))
+    debug = get_debug_logger() if get_debug_logger else None
+    
+    with _client_pool_lock:
+        client = _client_pool.get(pool_key)
+        if client is not None:
+            _client_pool_stats["hits"] += 1
+            if debug:
+                debug.log("Client-Pool Treffer", _format_pool_stats(), level="DEBUG")
+            return client
+        
+        _client_pool_stats["misses"] += 1
+        stale_keys = [key for key in _client_pool if key[0] != api_key]
+        for key in stale_keys:
+            _close_client(_client_pool.pop(key))
+        if stale_keys:
+            _client_pool_stats["rebuilds"] += 1
+        
+        client = _create_client(api_key, caps)
+        _client_pool[pool_key] = client
+        if debug:
+            debug.log("Client-Pool Fehltreffer", _format_pool_stats())
+        return client
+
+
+def reset_client_pool():
+    """Schließt und verwirft alle gepoolten Clients (z.B. nach API-Key-Änderung)."""
+    with _client_pool_lock:
+        had_clients = bool(_client_pool)
+        for client in _client_pool.values():
+            _close_client(client)
+        _client_pool.clear()
+        if had_clients:
+            _client_pool_stats["rebuilds"] += 1
+    debug = get_debug_logger() if get_debug_logger else None
+    if debug:
+        debug.log("Client-Pool zurückgesetzt", _format_pool_stats())
+
+
+def get_client_pool_stats():
+    """Gibt eine Kopie der Client-Pool-Zähler zurück."""
+    return dict(_client_pool_stats)
+
+
+def _format_pool_stats():
+    return ", ".join(f"{k}: {v}" for k, v in _client_pool_stats.items())
+
+
+# --- Connection Pre-Warming ---
+# Baut DNS/TCP/TLS zum Gemini-Endpoint auf, während main.py noch die Markierung kopiert.
+# Die warme Verbindung liegt danach im Pool des gemeinsamen Clients und wird vom
+# Streaming-Aufruf wiederverwendet.
+PREWARM_WAIT_TIMEOUT = 2.0  # Max. Wartezeit des Streaming-Aufrufs auf einen laufenden Pre-Warm
+
+_prewarm_lock = threading.Lock()
+_prewarm_event = None
+_prewarm_info = {"started": None, "duration": None, "success": False}
+_last_connection_use = 0.0
+
+
+def mark_connection_used():
+    """Merkt sich, dass die gepoolte Verbindung gerade benutzt wurde."""
+    global _last_connection_use
+    _last_connection_use = time.time()
+
+
+def is_connection_warm():
+    """True, wenn die gepoolte Verbindung vermutlich noch offen ist (Keep-Alive nicht abgelaufen)."""
+    return time.time() - _last_connection_use < CLIENT_KEEPALIVE_EXPIRY * 0.5
+
+
+def prewarm_connection(api_key, model, force=False):
+    """
+    Startet den Verbindungsaufbau zum Gemini-Endpoint im Hintergrund.
+    
+    Args:
+        api_key (str): Der Gemini API Key
+        model (str): Das Modell (für einen leichtgewichtigen models.get Aufruf)
+        force (bool): Auch aufwärmen, wenn die Verbindung noch warm sein sollte
+        
+    Returns:
+        threading.Event: Wird gesetzt, sobald der Pre-Warm fertig ist (oder None)
+    """
+    global _prewarm_event
+    if not HAS_GENAI or not api_key:
+        return None
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    
+    with _prewarm_lock:
+        if _prewarm_event is not None and not _prewarm_event.is_set():
+            # Läuft bereits
+            return _prewarm_event
+        if not force and is_connection_warm():
+            if debug:
+                debug.log("Pre-Warm übersprungen", "Verbindung ist noch warm", level="DEBUG")
+            return None
+        event = threading.Event()
+        _prewarm_event = event
+        _prewarm_info.update({"started": time.time(), "duration": None, "success": False})
+    
+    def prewarm_thread():
+        start = time.time()
+        try:
+            client = get_client(api_key)
+            # models.get ist ein günstiger GET-Request ohne Token-Verbrauch.
+            # Gewärmt wird der Pool, den die App nutzt: der Async-Client auf dem gemeinsamen Loop.
+            if probe_sdk_capabilities()["aio"]:
+                get_async_runtime().submit(client.aio.models.get(model=model)).result(timeout=10)
+            else:
+                client.models.get(model=model)
+            mark_connection_used()
+            _prewarm_info["success"] = True
+        except Exception as e:
+            if debug:
+                debug.log("Pre-Warm fehlgeschlagen", f"Fehler: {e}", level="WARNING")
+        finally:
+            _prewarm_info["duration"] = time.time() - start
+            event.set()
+            if debug:
+                debug.log_performance("Pre-Warm (DNS/TCP/TLS)", _prewarm_info["duration"],
+                                      f"Erfolgreich: {_prewarm_info['success']}")
+    
+    threading.Thread(target=prewarm_thread, daemon=True).start()
+    return event
+
+
+def wait_for_prewarm(timeout=PREWARM_WAIT_TIMEOUT):
+    """
+    Wartet auf einen laufenden Pre-Warm, damit der Request die warme Verbindung nutzt.
+    
+    Returns:
+        float: Geschätzte eingesparte Setup-Zeit in Sekunden (0.0 wenn kein Pre-Warm genutzt)
+    """
+    event = _prewarm_event
+    if event is None:
+        return 0.0
+    
+    wait_start = time.time()
+    finished = event.wait(timeout)
+    waited = time.time() - wait_start
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    if not finished or not _prewarm_info["success"]:
+        if debug and waited > 0.001:
+            debug.log("Pre-Warm nicht nutzbar", f"Gewartet: {waited:.3f}s, Fertig: {finished}", level="WARNING")
+        return 0.0
+    
+    duration = _prewarm_info["duration"] or 0.0
+    saved = max(0.0, duration - waited)
+    if debug:
+        debug.log("Pre-Warm genutzt", f"Verbindungsaufbau: {duration:.3f}s, Gewartet: {waited:.3f}s, Eingespart: {saved:.3f}s")
+    return saved
+
+
+# --- Kontext-Cache für den System Prompt ---
+# Der System Prompt wird als system_instruction gesendet und steht damit als stabiler Präfix
+# vor dem Text (Voraussetzung für implizites Prefix-Caching). Ist er lang genug für explizites
+# Caching, wird pro (API Key, Modell) ein CachedContent angelegt und per Name referenziert.
+# Anlegen und Verlängern laufen im Hintergrund, der Request nutzt nur einen fertigen Cache.
+CONTEXT_CACHE_TTL = 900               # Sekunden Lebensdauer eines Caches
+CONTEXT_CACHE_REFRESH_MARGIN = 120    # So lange vor Ablauf wird die TTL bei Nutzung verlängert
+CONTEXT_CACHE_MIN_TOKENS = {          # Mindestgröße für explizites Caching pro Modell
+    "gemini-3-pro-preview": 4096,
+    "gemini-2.5-pro": 4096,
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-flash-lite": 1024,
+    "gemini-2.0-flash": 4096,
+}
+
+_context_cache_enabled = True
+_context_caches = {}          # (api_key, model) -> {"name", "prompt_hash", "expires"}
+_context_cache_skipped = set()  # (api_key, model, prompt_hash), für die kein Cache möglich ist
+_context_cache_pending = set()
+_context_cache_lock = threading.Lock()
+_context_cache_stats = {"created": 0, "refreshed": 0, "deleted": 0, "failed": 0, "hits": 0,
+                        "prompt_tokens": 0, "cached_tokens": 0}
+
+
+def configure_context_cache(enabled):
+    """Schaltet explizites Caching ein oder aus (aus: vorhandene Caches werden gelöscht)."""
+    global _context_cache_enabled
+    _context_cache_enabled = bool(enabled)
+    if not _context_cache_enabled:
+        invalidate_context_caches()
+
+
+def _prompt_hash(system_prompt):
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+
+
+def _cache_supported(model, system_prompt):
+    """True, wenn Modell und Prompt-Länge explizites Caching erlauben."""
+    min_tokens = CONTEXT_CACHE_MIN_TOKENS.get(model)
+    return min_tokens is not None and estimate_tokens(system_prompt) >= min_tokens
+
+
+def get_cached_content(api_key, model, system_prompt):
+    """
+    Gibt den Namen eines gültigen Caches für den System Prompt zurück (ohne zu blockieren).
+    
+    Fehlt der Cache oder läuft er bald ab, wird er im Hintergrund angelegt bzw. verlängert.
+    
+    Returns:
+        str: Name des CachedContent (z.B. "cachedContents/abc") oder None
+    """
+    if not _context_cache_enabled or not HAS_GENAI or not api_key or not system_prompt:
+        return None
+    if not _cache_supported(model, system_prompt):
+        return None
+    
+    prompt_hash = _prompt_hash(system_prompt)
+    now = time.time()
+    with _context_cache_lock:
+        entry = _context_caches.get((api_key, model))
+        if entry is not None and entry["prompt_hash"] == prompt_hash and entry["expires"] > now + 5:
+            _context_cache_stats["hits"] += 1
+            name = entry["name"]
+            needs_refresh = entry["expires"] - now < CONTEXT_CACHE_REFRESH_MARGIN
+        else:
+            name = None
+            needs_refresh = False
+            if (api_key, model, prompt_hash) in _context_cache_skipped:
+                return None
+    
+    if name is None or needs_refresh:
+        prepare_context_cache(api_key, model, system_prompt)
+    return name
+
+
+def prepare_context_cache(api_key, model, system_prompt):
+    """
+    Legt den Cache für (API Key, Modell, System Prompt) im Hintergrund an oder verlängert ihn.
+    
+    Ein Cache für einen alten System Prompt wird dabei gelöscht.
+    
+    Returns:
+        threading.Thread: Der gestartete Thread oder None
+    """
+    if not _context_cache_enabled or not HAS_GENAI or not api_key or not system_prompt:
+        return None
+    if not _cache_supported(model, system_prompt):
+        return None
+    
+    key = (api_key, model)
+    with _context_cache_lock:
+        if key in _context_cache_pending:
+            return None
+        _context_cache_pending.add(key)
+    
+    def cache_thread():
+        try:
+            _ensure_context_cache(api_key, model, system_prompt)
+        finally:
+            with _context_cache_lock:
+                _context_cache_pending.discard(key)
+    
+    thread = threading.Thread(target=cache_thread, daemon=True)
+    thread.start()
+    return thread
+
+
+def _ensure_context_cache(api_key, model, system_prompt):
+    """Blockierender Teil von prepare_context_cache."""
+    debug = get_debug_logger() if get_debug_logger else None
+    prompt_hash = _prompt_hash(system_prompt)
+    key = (api_key, model)
+    with _context_cache_lock:
+        entry = _context_caches.get(key)
+    
+    client = get_client(api_key)
+    start = time.time()
+    try:
+        if entry is not None and entry["prompt_hash"] == prompt_hash and entry["expires"] > time.time() + 5:
+            client.caches.update(name=entry["name"], config=genai.types.UpdateCachedContentConfig(
+                ttl=f"{CONTEXT_CACHE_TTL}s"))
+            with _context_cache_lock:
+                entry["expires"] = time.time() + CONTEXT_CACHE_TTL
+                _context_cache_stats["refreshed"] += 1
+            if debug:
+                debug.log("Kontext-Cache verlängert", f"Modell: {model}, Cache: {entry['name']}, "
+                                                      f"TTL: {CONTEXT_CACHE_TTL}s", level="DEBUG")
+            return entry["name"]
+        
+        cache = client.caches.create(model=model, config=genai.types.CreateCachedContentConfig(
+            system_instruction=system_prompt,
+            ttl=f"{CONTEXT_CACHE_TTL}s",
+            display_name="text-improver-system-prompt",
+        ))
+    except Exception as e:
+        with _context_cache_lock:
+            _context_cache_stats["failed"] += 1
+            if entry is None or entry["prompt_hash"] != prompt_hash:
+                _context_cache_skipped.add((api_key, model, prompt_hash))
+            if _context_caches.get(key) is entry:
+                _context_caches.pop(key, None)
+        if debug:
+            debug.log("Kontext-Cache nicht verfügbar", f"Modell: {model}, verwende system_instruction. "
+                                                       f"Fehler: {e}", level="WARNING")
+        return None
+    
+    with _context_cache_lock:
+        old_entry = _context_caches.get(key)
+        _context_caches[key] = {"name": cache.name, "prompt_hash": prompt_hash,
+                                "expires": time.time() + CONTEXT_CACHE_TTL}
+        _context_cache_stats["created"] += 1
+    if old_entry is not None and old_entry["name"] != cache.name:
+        _delete_context_cache(client, old_entry["name"])
+    if debug:
+        debug.log("Kontext-Cache angelegt", f"Modell: {model}, Cache: {cache.name}, ~{estimate_tokens(system_prompt)} "
+                                            f"Tokens, TTL: {CONTEXT_CACHE_TTL}s, Dauer: {time.time() - start:.3f}s")
+    return cache.name
+
+
+def _delete_context_cache(client, name):
+    try:
+        client.caches.delete(name=name)
+        _context_cache_stats["deleted"] += 1
+    except Exception as e:
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Kontext-Cache nicht löschbar", f"Cache: {name}, Fehler: {e}", level="WARNING")
+
+
+def invalidate_context_caches(wait=False):
+    """
+    Verwirft alle Caches (z.B. nach Änderung des System Prompts) und löscht sie serverseitig.
+    
+    Args:
+        wait (bool): Auf das Löschen warten (beim Beenden), sonst im Hintergrund
+    """
+    with _context_cache_lock:
+        entries = list(_context_caches.items())
+        _context_caches.clear()
+        _context_cache_skipped.clear()
+    if not entries:
+        return
+    
+    def delete_all():
+        for (api_key, model), entry in entries:
+            # Nur mit einem bereits gepoolten Client löschen; Caches alter API Keys laufen per TTL ab
+            with _client_pool_lock:
+                client = next((c for key, c in _client_pool.items() if key[0] == api_key), None)
+            if client is not None:
+                _delete_context_cache(client, entry["name"])
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    if debug:
+        debug.log("Kontext-Caches verworfen", f"{len(entries)} Cache(s)")
+    if wait:
+        delete_all()
+    else:
+        threading.Thread(target=delete_all, daemon=True).start()
+
+
+def _drop_rejected_cache(exc, kwargs, api_key, model):
+    """Verwirft einen Cache, den der Server abgelehnt hat (abgelaufen/gelöscht); der Fallback läuft ohne."""
+    config = kwargs.get("config")
+    if getattr(config, "cached_content", None) is None or classify_error(exc)[0] != "client":
+        return
+    with _context_cache_lock:
+        entry = _context_caches.get((api_key, model))
+        if entry is not None and entry["name"] == config.cached_content:
+            _context_caches.pop((api_key, model), None)
+    debug = get_debug_logger() if get_debug_logger else None
+    if debug:
+        debug.log("Kontext-Cache abgelehnt", f"Modell: {model}, Cache: {config.cached_content}, Fehler: {exc}",
+                  level="WARNING")
+
+
+def get_context_cache_stats():
+    """Gibt eine Kopie der Cache-Zähler zurück."""
+    return dict(_context_cache_stats)
+
+
+def log_usage(model, usage, debug):
+    """
+    Verbucht die Token-Nutzung einer Antwort (usage_metadata) und loggt den gecachten Anteil.
+    
+    Args:
+        model (str): Das Modell
+        usage: usage_metadata der Antwort bzw. des letzten Stream-Chunks (oder None)
+        debug: Debug Logger (oder None)
+    """
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+    output_tokens = getattr(usage, "candidates_token_count", None) or 0
+    _context_cache_stats["prompt_tokens"] += prompt_tokens
+    _context_cache_stats["cached_tokens"] += cached_tokens
+    if debug:
+        share = cached_tokens / prompt_tokens * 100 if prompt_tokens else 0.0
+        debug.log("Token-Nutzung", f"Modell: {model}, Eingabe: {prompt_tokens}, davon gecacht: {cached_tokens} "
+                                   f"({share:.0f}%), Ausgabe: {output_tokens}")
+
+
+def _request_kwargs(model, text, system_prompt=None, deadline=None, api_key=None, partial=None):
+    """
+    Baut die Argumente für generate_content(_stream).
+    
+    Der System Prompt geht als system_instruction (bzw. als Verweis auf seinen Kontext-Cache)
+    vor den Text, damit der Präfix über alle Requests identisch bleibt.
+    Mit Deadline wird die Restzeit als Request-Timeout (Socket/HTTP) mitgegeben, sofern
+    die SDK-Version Request-spezifische HttpOptions unterstützt.
+    Mit partial wird eine Fortsetzung angefordert: die bisherige Antwort geht als Modell-Turn mit.
+    """
+    kwargs = {"model": model, "contents": _continuation_contents(text, partial) if partial else text}
+    config = {}
+    if system_prompt:
+        cached_content = get_cached_content(api_key, model, system_prompt)
+        if cached_content:
+            config["cached_content"] = cached_content
+        else:
+            config["system_instruction"] = system_prompt
+    if deadline is not None and probe_sdk_capabilities()["request_http_options"]:
+        timeout_ms = max(1000, int(deadline.remaining() * 1000))
+        config["http_options"] = genai.types.HttpOptions(timeout=timeout_ms)
+    if config:
+        kwargs["config"] = genai.types.GenerateContentConfig(**config)
+    return kwargs
+
+
+def extract_response_text(response):
+    """
+    Extrahiert den Text aus einer Response bzw. einem Stream-Chunk.
+    
+    Methode 1: Direktes text-Attribut (häufigste Methode im neuen SDK).
+    Methode 2: Über candidates (Fallback für ältere SDK-Versionen).
+    """
+    text = getattr(response, "text", None)
+    if text:
+        return text
+    
+    if hasattr(response, 'candidates') and response.candidates:
+        for candidate in response.candidates:
+            if hasattr(candidate, 'content') and candidate.content:
+                if hasattr(candidate.content, 'parts'):
+                    for part in candidate.content.parts or []:
+                        if hasattr(part, 'text') and part.text:
+                            return part.text
+                elif hasattr(candidate.content, 'text') and candidate.content.text:
+                    return candidate.content.text
+    return None
+
+
+# --- Transport: Retry mit Backoff, Retry-Hinweise, Circuit Breaker ---
+# Transiente Fehler (429, 5xx, Netzwerk) werden mit exponentiellem Backoff plus Jitter
+# wiederholt, solange noch kein Chunk geliefert wurde. Nach wiederholten Fehlern öffnet
+# pro Modell ein Circuit Breaker, damit weitere Requests sofort scheitern statt zu warten.
+RETRY_MAX_ATTEMPTS = 3          # Versuche insgesamt (1 = kein Retry)
+RETRY_BASE_DELAY = 0.5          # Sekunden, verdoppelt sich pro Versuch
+RETRY_MAX_DELAY = 8.0           # Obergrenze für eine einzelne Wartezeit
+BREAKER_FAILURE_THRESHOLD = 5   # Aufeinanderfolgende transiente Fehler bis zum Öffnen
+BREAKER_COOLDOWN = 30.0         # Sekunden, bis ein Probe-Request durchgelassen wird
+
+RETRYABLE_ERRORS = ("rate_limit", "overloaded", "server", "network")
+_NETWORK_ERROR_MODULES = ("httpx", "httpcore", "aiohttp", "ssl", "socket")
+
+_transport_config = {
+    "max_attempts": RETRY_MAX_ATTEMPTS,
+    "base_delay": RETRY_BASE_DELAY,
+    "max_delay": RETRY_MAX_DELAY,
+    "failure_threshold": BREAKER_FAILURE_THRESHOLD,
+    "cooldown": BREAKER_COOLDOWN,
+}
+_transport_stats = {"attempts": 0, "retries": 0, "rate_limited": 0, "gave_up": 0, "breaker_rejections": 0}
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Wird ausgelöst, wenn der Circuit Breaker eines Modells offen ist."""
+
+
+class CircuitBreaker:
+    """
+    Circuit Breaker für ein Modell.
+    
+    closed: Requests laufen normal. Nach failure_threshold aufeinanderfolgenden transienten
+    Fehlern wechselt er auf open: Requests scheitern sofort. Nach cooldown Sekunden wird
+    genau ein Probe-Request durchgelassen (half_open); Erfolg schließt, Fehler öffnet erneut.
+    """
+    
+    def __init__(self, model, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_running = False
+        self._lock = threading.Lock()
+    
+    def before_request(self):
+        """Prüft, ob ein Request erlaubt ist (CircuitOpenError sonst)."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.cooldown - (time.monotonic() - self.opened_at)
+            if self.state == "open" and remaining <= 0:
+                self._set_state("half_open")
+            if self.state == "half_open" and not self._probe_running:
+                self._probe_running = True
+                return
+            _transport_stats["breaker_rejections"] += 1
+            raise CircuitOpenError(f"Circuit Breaker für {self.model} offen "
+                                   f"(noch {max(0.0, remaining):.0f}s, {self.failures} Fehler in Folge)")
+    
+    def release_probe(self):
+        """Gibt den Probe-Slot frei, ohne den Zustand zu ändern (Abbruch, Client-Fehler)."""
+        with self._lock:
+            self._probe_running = False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_running = False
+            if self.state != "closed":
+                self._set_state("closed")
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_running = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._set_state("open")
+    
+    def _set_state(self, state):
+        old_state, self.state = self.state, state
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Circuit Breaker", f"Modell: {self.model}, {old_state} -> {state}, Fehler in Folge: {self.failures}",
+                      level="WARNING" if state == "open" else "INFO")
+
+
+def configure_transport(max_attempts=None, failure_threshold=None, cooldown=None):
+    """Übernimmt Retry- und Breaker-Einstellungen (bestehende Breaker werden angepasst)."""
+    if max_attempts is not None:
+        _transport_config["max_attempts"] = max(1, int(max_attempts))
+    if failure_threshold is not None:
+        _transport_config["failure_threshold"] = max(1, int(failure_threshold))
+    if cooldown is not None:
+        _transport_config["cooldown"] = max(0.0, float(cooldown))
+    with _circuit_breakers_lock:
+        for breaker in _circuit_breakers.values():
+            breaker.failure_threshold = _transport_config["failure_threshold"]
+            breaker.cooldown = _transport_config["cooldown"]
+
+
+def get_circuit_breaker(model):
+    """Gibt den Circuit Breaker eines Modells zurück (wird bei Bedarf erstellt)."""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(model, _transport_config["failure_threshold"], _transport_config["cooldown"])
+            _circuit_breakers[model] = breaker
+        return breaker
+
+
+def get_transport_stats():
+    """Gibt Retry-Zähler und Breaker-Zustände zurück."""
+    stats = dict(_transport_stats)
+    with _circuit_breakers_lock:
+        stats["breakers"] = {model: breaker.state for model, breaker in _circuit_breakers.items()}
+    return stats
+
+
+def _format_transport_stats():
+    return ", ".join(f"{k}: {v}" for k, v in _transport_stats.items())
+
+
+def _parse_delay(value):
+    """Parst Retry-Angaben wie "17s", "1.5s" oder "3" in Sekunden."""
+    try:
+        return float(str(value).strip().rstrip("s"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_hint(exc):
+    """
+    Liest den Retry-Hinweis des Servers aus einer Exception.
+    
+    Gemini liefert bei 429 ein google.rpc.RetryInfo mit retryDelay im Fehler-JSON,
+    andere Server einen Retry-After Header.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            delay = _parse_delay(headers.get("retry-after"))
+            if delay is not None:
+                return delay
+        except Exception:
+            pass
+    
+    details = getattr(exc, "details", None)
+    if isinstance(details, dict):
+        error = details.get("error", details)
+        for detail in error.get("details", []) if isinstance(error, dict) else []:
+            if isinstance(detail, dict) and "RetryInfo" in str(detail.get("@type", "")):
+                return _parse_delay(detail.get("retryDelay"))
+    return None
+
+
+def classify_error(exc):
+    """
+    Ordnet eine Exception einer Fehlerklasse zu.
+    
+    Returns:
+        tuple: (klasse, retry_hinweis_sekunden) mit klasse in rate_limit, overloaded, server,
+               network, client, unknown
+    """
+    if isinstance(exc, (DeadlineExceeded, CircuitOpenError, asyncio.CancelledError)):
+        return "unknown", None
+    
+    code = getattr(exc, "code", None)
+    if not isinstance(code, int):
+        code = getattr(exc, "status_code", None)
+    if isinstance(code, int):
+        if code == 429:
+            return "rate_limit", _retry_hint(exc)
+        if code == 503:
+            return "overloaded", _retry_hint(exc)
+        if code in (408, 500, 502, 504):
+            return "server", _retry_hint(exc)
+        if 400 <= code < 500:
+            return "client", None
+    
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return "network", None
+    if type(exc).__module__.split(".")[0] in _NETWORK_ERROR_MODULES:
+        return "network", None
+    return "unknown", None
+
+
+def _retry_delay(attempt, error_kind, hint, deadline):
+    """
+    Wartezeit vor dem nächsten Versuch (Full Jitter, Server-Hinweis als Untergrenze).
+    
+    Returns:
+        float: Sekunden oder None, wenn kein weiterer Versuch sinnvoll ist
+    """
+    if attempt >= _transport_config["max_attempts"] or error_kind not in RETRYABLE_ERRORS:
+        return None
+    backoff = min(_transport_config["max_delay"], _transport_config["base_delay"] * (2 ** (attempt - 1)))
+    delay = random.uniform(0, backoff)
+    if hint is not None:
+        delay = max(delay, hint)
+    if deadline is not None and delay >= deadline.remaining():
+        return None
+    return delay
+
+
+def _on_attempt_failed(model, attempt, exc, breaker, deadline):
+    """Verbucht einen Fehlversuch und gibt die Wartezeit bis zum Retry zurück (None = aufgeben)."""
+    error_kind, hint = classify_error(exc)
+    if error_kind in RETRYABLE_ERRORS:
+        breaker.record_failure()
+    else:
+        breaker.release_probe()
+    if error_kind == "rate_limit":
+        _transport_stats["rate_limited"] += 1
+    
+    delay = _retry_delay(attempt, error_kind, hint, deadline)
+    if delay is not None and breaker.state == "open":
+        delay = None
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    if delay is None:
+        if error_kind in RETRYABLE_ERRORS:
+            _transport_stats["gave_up"] += 1
+        if debug:
+            debug.log("Transport: kein weiterer Versuch",
+                      f"Modell: {model}, Versuch {attempt}, Fehlerklasse: {error_kind}, Breaker: {breaker.state}, "
+                      f"Fehler: {exc} | {_format_transport_stats()}", level="ERROR")
+        return None
+    
+    _transport_stats["retries"] += 1
+    if debug:
+        hint_text = f", Server-Hinweis: {hint:.1f}s" if hint is not None else ""
+        debug.log("Transport: Retry",
+                  f"Modell: {model}, Versuch {attempt}/{_transport_config['max_attempts']}, "
+                  f"Fehlerklasse: {error_kind}, Wartezeit: {delay:.2f}s{hint_text}, Fehler: {exc}", level="WARNING")
+    return delay
+
+
+def call_with_retry(model, attempt_fn, deadline=None):
+    """
+    Führt attempt_fn() mit Retry und Circuit Breaker aus (blockierend).
+    
+    Args:
+        model (str): Modell (bestimmt den Circuit Breaker)
+        attempt_fn (callable): Ein Versuch; muss vor der ersten Ausgabe an den Nutzer fehlschlagen
+        deadline (Deadline): Optionale Frist; Wartezeiten darüber hinaus werden nicht begonnen
+        
+    Raises:
+        CircuitOpenError: Wenn der Breaker offen ist
+        Exception: Der letzte Fehler, wenn alle Versuche scheitern
+    """
+    breaker = get_circuit_breaker(model)
+    attempt = 0
+    while True:
+        attempt += 1
+        if deadline is not None:
+            deadline.check()
+        breaker.before_request()
+        _transport_stats["attempts"] += 1
+        try:
+            result = attempt_fn()
+        except Exception as e:
+            delay = _on_attempt_failed(model, attempt, e, breaker, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def call_with_retry_async(model, attempt_fn, deadline=None):
+    """Async-Gegenstück zu call_with_retry; attempt_fn() liefert eine Coroutine."""
+    breaker = get_circuit_breaker(model)
+    attempt = 0
+    while True:
+        attempt += 1
+        if deadline is not None:
+            deadline.check()
+        breaker.before_request()
+        _transport_stats["attempts"] += 1
+        try:
+            result = await attempt_fn()
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            delay = _on_attempt_failed(model, attempt, e, breaker, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+# --- Stream-Aufzeichnung ---
+# Zeichnet Chunks echter Streams mit Ankunftszeit als Fixtures auf (Wiedergabe: providers.ReplayProvider).
+_recording = {"enabled": False, "directory": None}
+
+
+def set_stream_recording(enabled, directory=None):
+    """
+    Schaltet die Aufzeichnung von Streams ein oder aus.
+    
+    Args:
+        enabled (bool): Aufzeichnen
+        directory (str): Zielverzeichnis (Standard: AppData/stream_recordings)
+    """
+    _recording["enabled"] = bool(enabled)
+    _recording["directory"] = directory or None
+
+
+def _new_recorder(model, text):
+    """Erstellt einen StreamRecorder, falls die Aufzeichnung aktiv ist."""
+    if not _recording["enabled"]:
+        return None
+    return StreamRecorder(model, len(text), _recording["directory"])
+
+
+def _open_stream(client, api_key, model, text, system_prompt, deadline=None, partial=None):
+    """
+    Öffnet einen Stream mit Retry; der erste Chunk wird mitgelesen, da 429/503 oft erst dort auftreten.
+    
+    Returns:
+        tuple: (response, iterator über alle Chunks inkl. des ersten)
+    """
+    def attempt():
+        kwargs = _request_kwargs(model, text, system_prompt, deadline, api_key, partial)
+        try:
+            response = client.models.generate_content_stream(**kwargs)
+            iterator = iter(response)
+            for first_chunk in iterator:
+                return response, itertools.chain([first_chunk], iterator)
+            return response, iter(())
+        except Exception as e:
+            _drop_rejected_cache(e, kwargs, api_key, model)
+            raise
+    
+    return call_with_retry(model, attempt, deadline)
+
+
+async def _aclose_quietly(response):
+    aclose = getattr(response, "aclose", None)
+    if aclose:
+        try:
+            await aclose()
+        except Exception:
+            pass
+
+
+async def _open_stream_async(client, api_key, model, text, system_prompt, deadline=None, partial=None):
+    """
+    Async-Gegenstück zu _open_stream.
+    
+    Returns:
+        tuple: (response, erster Chunk oder None bei leerem Stream)
+    """
+    async def attempt():
+        kwargs = _request_kwargs(model, text, system_prompt, deadline, api_key, partial)
+        try:
+            response = await client.aio.models.generate_content_stream(**kwargs)
+        except Exception as e:
+            _drop_rejected_cache(e, kwargs, api_key, model)
+            raise
+        try:
+            return response, await response.__anext__()
+        except StopAsyncIteration:
+            return response, None
+        except BaseException as e:
+            await _aclose_quietly(response)
+            if isinstance(e, Exception):
+                _drop_rejected_cache(e, kwargs, api_key, model)
+            raise
+    
+    return await call_with_retry_async(model, attempt, deadline)
+
+
+# --- Fortsetzung nach Stream-Abbruch ---
+# Bricht ein Stream nach den ersten Chunks ab, wird der erhaltene Teil behalten und nur die
+# Fortsetzung angefordert (bisherige Antwort als Modell-Turn). Wiederholungen am Anfang der
+# Fortsetzung entfernt ContinuationStitcher, damit bereits eingefügter Text nicht doppelt erscheint.
+SALVAGE_MAX_ATTEMPTS = 2  # Fortsetzungs-Requests pro abgebrochenem Stream
+
+CONTINUATION_INSTRUCTION = (
+    "Deine Antwort wurde mitten im Text unterbrochen. Setze sie exakt an der Stelle fort, an der sie "
+    "endet, ohne etwas zu wiederholen und ohne Einleitung oder Kommentar."
+)
+
+_salvage_stats = {"attempts": 0, "succeeded": 0, "failed": 0, "salvaged_bytes": 0, "continued_bytes": 0}
+
+
+def _continuation_contents(text, partial):
+    """Verlauf für eine Fortsetzung: Originaltext, bisherige Antwort, Anweisung zum Fortsetzen."""
+    types = genai.types
+    return [
+        types.Content(role="user", parts=[types.Part(text=text)]),
+        types.Content(role="model", parts=[types.Part(text=partial)]),
+        types.Content(role="user", parts=[types.Part(text=CONTINUATION_INSTRUCTION)]),
+    ]
+
+
+def get_salvage_stats():
+    """Gibt eine Kopie der Fortsetzungs-Zähler zurück."""
+    return dict(_salvage_stats)
+
+
+def _format_salvage_stats():
+    s = _salvage_stats
+    return (f"Fortsetzungen: {s['succeeded']}/{s['attempts']} erfolgreich, übernommen: {s['salvaged_bytes']} Bytes, "
+            f"nachgeladen: {s['continued_bytes']} Bytes")
+
+
+def _salvage_finished(model, partial, continuation, start, error, debug):
+    """Verbucht das Ergebnis einer Fortsetzung und loggt es."""
+    if continuation is None:
+        _salvage_stats["failed"] += 1
+        if debug:
+            debug.log("Fortsetzung fehlgeschlagen", f"Modell: {model}, Fehler: {error} | {_format_salvage_stats()}",
+                      level="ERROR")
+        return
+    _salvage_stats["succeeded"] += 1
+    _salvage_stats["salvaged_bytes"] += len(partial.encode("utf-8"))
+    _salvage_stats["continued_bytes"] += len(continuation.encode("utf-8"))
+    if debug:
+        debug.log_performance("Stream fortgesetzt", time.monotonic() - start,
+                              f"Modell: {model}, übernommen: {len(partial)} Zeichen (~{estimate_tokens(partial)} "
+                              f"Tokens nicht neu erzeugt), Fortsetzung: {len(continuation)} Zeichen | "
+                              f"{_format_salvage_stats()}")
+
+
+def _emit_chunk(on_chunk_callback, chunk_text, debug):
+    if chunk_text and on_chunk_callback:
+        try:
+            on_chunk_callback(chunk_text)
+        except Exception as callback_error:
+            if debug:
+                debug.log_exception("Fehler im Chunk-Callback", callback_error)
+
+
+def _salvage_stream(client, api_key, model, text, system_prompt, partial, on_chunk_callback, deadline=None):
+    """
+    Fordert nach einem Stream-Abbruch die Fortsetzung an (blockierend).
+    
+    Args:
+        partial (str): Der bis zum Abbruch erhaltene (und an on_chunk_callback gegebene) Text
+        on_chunk_callback (callable): Erhält nur die neuen, angeschlossenen Chunks
+        
+    Returns:
+        str: Die angeschlossene Fortsetzung (ohne partial) oder None, wenn sie scheitert
+        
+    Raises:
+        DeadlineExceeded: Wenn die Frist während der Fortsetzung abläuft
+    """
+    debug = get_debug_logger() if get_debug_logger else None
+    _salvage_stats["attempts"] += 1
+    start = time.monotonic()
+    produced = []
+    error = None
+    for attempt in range(1, SALVAGE_MAX_ATTEMPTS + 1):
+        prefix = partial + "".join(produced)
+        stitcher = ContinuationStitcher(prefix)
+        if debug:
+            debug.log("Fordere Fortsetzung an", f"Modell: {model}, Versuch {attempt}, bisher: {len(prefix)} Zeichen")
+        try:
+            response, chunks = _open_stream(client, api_key, model, text, system_prompt, deadline, partial=prefix)
+            for chunk in chunks:
+                if deadline is not None and deadline.expired():
+                    close = getattr(response, "close", None)
+                    if close:
+                        close()
+                    raise DeadlineExceeded("Frist während der Fortsetzung abgelaufen")
+                stitched = stitcher.feed(extract_response_text(chunk) or "")
+                if stitched:
+                    produced.append(stitched)
+                    _emit_chunk(on_chunk_callback, stitched, debug)
+            stitched = stitcher.finish()
+            if stitched:
+                produced.append(stitched)
+                _emit_chunk(on_chunk_callback, stitched, debug)
+            continuation = "".join(produced)
+            _salvage_finished(model, partial, continuation, start, None, debug)
+            return continuation
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            error = e
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Fortsetzung nach Ablauf der Frist abgebrochen: {e}")
+    _salvage_finished(model, partial, None, start, error, debug)
+    return None
+
+
+async def _salvage_stream_async(api_key, model, text, system_prompt, partial, on_chunk_callback, deadline=None):
+    """Async-Gegenstück zu _salvage_stream (gleiche Rückgabe)."""
+    debug = get_debug_logger() if get_debug_logger else None
+    _salvage_stats["attempts"] += 1
+    start = time.monotonic()
+    produced = []
+    error = None
+    for attempt in range(1, SALVAGE_MAX_ATTEMPTS + 1):
+        prefix = partial + "".join(produced)
+        stitcher = ContinuationStitcher(prefix)
+        if debug:
+            debug.log("Fordere Fortsetzung an (async)", f"Modell: {model}, Versuch {attempt}, bisher: {len(prefix)} Zeichen")
+        stream = improve_text_with_gemini_stream_async(text, api_key, model, system_prompt, deadline, partial=prefix)
+        try:
+            async for chunk_text in stream:
+                stitched = stitcher.feed(chunk_text)
+                if stitched:
+                    produced.append(stitched)
+                    _emit_chunk(on_chunk_callback, stitched, debug)
+            stitched = stitcher.finish()
+            if stitched:
+                produced.append(stitched)
+                _emit_chunk(on_chunk_callback, stitched, debug)
+            continuation = "".join(produced)
+            _salvage_finished(model, partial, continuation, start, None, debug)
+            return continuation
+        except (asyncio.CancelledError, DeadlineExceeded, CircuitOpenError):
+            raise
+        except Exception as e:
+            error = e
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Fortsetzung nach Ablauf der Frist abgebrochen: {e}")
+        finally:
+            await stream.aclose()
+    _salvage_finished(model, partial, None, start, error, debug)
+    return None
 
 
-def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chunk_callback):
+def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chunk_callback, deadline=None):
     """
     Sendet Text an Gemini API mit Streaming und ruft für jeden Chunk einen Callback auf.
     
@@ -29,6 +1190,8 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
         model (str): Das zu verwendende Gemini Modell
         system_prompt (str): Der System Prompt für die Verbesserung
         on_chunk_callback (callable): Funktion die für jeden Text-Chunk aufgerufen wird (chunk_text)
+        deadline (Deadline): Optionale Frist; Restzeit wird als Request-Timeout verwendet und
+            der Stream wird bei Ablauf geschlossen
         
     Returns:
         str: Der vollständige verbesserte Text oder None bei Fehler
@@ -46,22 +1209,9 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
             debug.start_timer("api_setup")
             debug.log("Initialisiere Gemini API", f"Modell: {model}, API Key vorhanden: {bool(api_key)}")
         
-        # Erstelle Client mit direkt übergebenem API Key (sauberer als Umgebungsvariable)
+        # Hole gepoolten Client (wird nur beim ersten Aufruf bzw. nach Key-Wechsel erstellt)
         try:
-            # Versuche API Key direkt zu übergeben (neue SDK-Version)
-            try:
-                client = genai.Client(api_key=api_key)
-                if debug:
-                    debug.log("Client erstellt", "Mit direktem API Key")
-            except TypeError:
-                # Fallback: Falls Client keine api_key Parameter akzeptiert, verwende Umgebungsvariable
-                if 'GEMINI_API_KEY' not in os.environ:
-                    os.environ['GEMINI_API_KEY'] = api_key
-                    if debug:
-                        debug.log("API Key in Umgebungsvariable gesetzt (Fallback)", f"Länge: {len(api_key)} Zeichen")
-                client = genai.Client()
-                if debug:
-                    debug.log("Client erstellt", "Mit Umgebungsvariable (Fallback)")
+            client = get_client(api_key)
         except Exception as e:
             if debug:
                 debug.log_exception("Fehler beim Erstellen des Clients", e)
@@ -69,35 +1219,31 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
             traceback.print_exc()
             return None
         
+        # Nutze eine ggf. gerade aufgewärmte Verbindung (vom Hotkey gestartet)
+        prewarm_saved = wait_for_prewarm(deadline.timeout_for(PREWARM_WAIT_TIMEOUT) if deadline else PREWARM_WAIT_TIMEOUT)
+        
         if debug:
             setup_time = debug.end_timer("api_setup")
             if setup_time is not None:
-                debug.log("API Client erstellt", f"Dauer: {setup_time:.3f}s")
+                debug.log("API Client bereit", f"Dauer: {setup_time:.3f}s, Pre-Warm Ersparnis: {prewarm_saved:.3f}s")
             else:
-                debug.log("API Client erstellt")
+                debug.log("API Client bereit")
             debug.start_timer("prompt_creation")
         
-        # Erstelle den Prompt
-        prompt = f"{system_prompt}\n\n{text}"
-        
+        # System Prompt als system_instruction (stabiler Präfix), Text als Inhalt
         if debug:
             prompt_time = debug.end_timer("prompt_creation")
             if prompt_time is not None:
-                debug.log("Prompt erstellt", f"Länge: {len(prompt)} Zeichen, Dauer: {prompt_time:.3f}s")
+                debug.log("Prompt erstellt", f"System Prompt: {len(system_prompt or '')} Zeichen, Text: {len(text)} "
+                                             f"Zeichen, Dauer: {prompt_time:.3f}s")
             else:
-                debug.log("Prompt erstellt", f"Länge: {len(prompt)} Zeichen")
-            debug.log("Prompt Vorschau", f"{prompt[:100]}...", level="DEBUG")
+                debug.log("Prompt erstellt", f"System Prompt: {len(system_prompt or '')} Zeichen, Text: {len(text)} Zeichen")
+            debug.log("Prompt Vorschau", f"{text[:100]}...", level="DEBUG")
             debug.start_timer("api_request")
         
-        # Validierung
-        if not prompt or not prompt.strip():
-            if debug:
-                debug.log("Prompt ist leer", level="ERROR")
-            print("FEHLER: Prompt ist leer!")
-            return None
-        
-        # Sende Anfrage an Gemini mit Streaming
+        # Sende Anfrage an Gemini mit Streaming (Chunks als Liste, am Ende einmal zusammengefügt)
         full_text = ""
+        parts = []
         chunk_count = 0
         
         # Versuche Streaming-API
@@ -108,10 +1254,9 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
             if debug:
                 debug.log("Verwende generate_content_stream für Streaming", f"Modell: {model}")
             
-            response = client.models.generate_content_stream(
-                model=model,
-                contents=prompt
-            )
+            # Transiente Fehler (429/503/Netzwerk) bis zum ersten Chunk werden mit Backoff wiederholt
+            recorder = _new_recorder(model, text)
+            response, chunks = _open_stream(client, api_key, model, text, system_prompt, deadline)
             
             if debug:
                 request_time = debug.end_timer("api_request")
@@ -123,42 +1268,37 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
             # Verarbeite jeden Chunk aus dem Stream
             chunks_processed = 0
             first_chunk_received = False
+            usage = None
             
-            for chunk in response:
+            for chunk in chunks:
                 chunks_processed += 1
                 chunk_text = None
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                
+                if deadline is not None and deadline.expired():
+                    # Frist abgelaufen: Stream schließen statt weiter zu lesen
+                    close = getattr(response, "close", None)
+                    if close:
+                        close()
+                    raise DeadlineExceeded(f"Frist abgelaufen nach {chunks_processed} Chunks")
                 
                 if debug and chunks_processed == 1:
                     debug.log("Erster Chunk-Objekt erhalten", f"Typ: {type(chunk)}, Hat text: {hasattr(chunk, 'text')}, Hat candidates: {hasattr(chunk, 'candidates')}")
                 
                 # Versuche verschiedene Möglichkeiten, Text aus Chunk zu extrahieren
-                # Methode 1: Direktes text-Attribut (häufigste Methode im neuen SDK)
-                chunk_text = getattr(chunk, "text", None)
-                
-                # Methode 2: Über candidates (Fallback für ältere SDK-Versionen)
-                if not chunk_text and hasattr(chunk, 'candidates') and chunk.candidates:
-                    for candidate in chunk.candidates:
-                        if hasattr(candidate, 'content') and candidate.content:
-                            if hasattr(candidate.content, 'parts'):
-                                for part in candidate.content.parts:
-                                    if hasattr(part, 'text') and part.text:
-                                        chunk_text = part.text
-                                        break
-                            elif hasattr(candidate.content, 'text'):
-                                chunk_text = candidate.content.text
-                                break
-                        if chunk_text:
-                            break
+                chunk_text = extract_response_text(chunk)
                 
                 if chunk_text:
-                    full_text += chunk_text
+                    parts.append(chunk_text)
                     chunk_count += 1
+                    if recorder:
+                        recorder.chunk(chunk_text)
                     
                     if debug and not first_chunk_received:
                         first_chunk_received = True
                         first_chunk_time = debug.end_timer("first_chunk_wait")
                         if first_chunk_time is not None:
-                            debug.log("Erster Text-Chunk erhalten", f"Nach {first_chunk_time:.3f}s, Text: {chunk_text[:50]}...")
+                            debug.log("Erster Text-Chunk erhalten", f"Nach {first_chunk_time:.3f}s (Pre-Warm Ersparnis: {prewarm_saved:.3f}s), Text: {chunk_text[:50]}...")
                         else:
                             debug.log("Erster Text-Chunk erhalten", f"Text: {chunk_text[:50]}...")
                     
@@ -176,9 +1316,15 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
                                 f"Typ: {type(chunk)}, Hat text: {hasattr(chunk, 'text')}, Hat candidates: {hasattr(chunk, 'candidates')}", 
                                 level="WARNING")
             
+            full_text = "".join(parts)
             if debug:
                 debug.log("Chunk-Verarbeitung abgeschlossen", f"{chunks_processed} Chunk-Objekte verarbeitet, {chunk_count} mit Text")
             
+            mark_connection_used()
+            log_usage(model, usage, debug)
+            if recorder:
+                recorder.save()
+            
             if chunk_count == 0:
                 if debug:
                     debug.log("KEINE CHUNKS EMPFANGEN", f"{chunks_processed} Chunk-Objekte verarbeitet, aber kein Text extrahiert", level="ERROR")
@@ -194,16 +1340,48 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
                     else:
                         debug.log("Streaming abgeschlossen", f"{chunk_count} Chunks, Gesamttext: {len(full_text)} Zeichen")
         
+        except DeadlineExceeded as e:
+            if debug:
+                debug.log("Stream wegen Deadline abgebrochen", str(e), level="ERROR")
+            return None
+        except CircuitOpenError as e:
+            if debug:
+                debug.log("Request abgelehnt (Circuit Breaker)", str(e), level="ERROR")
+            print(f"Gemini API vorübergehend nicht erreichbar: {e}")
+            return None
         except AttributeError as e:
             if debug:
                 debug.log("generate_content_stream nicht verfügbar (AttributeError)", f"Fehler: {e}", level="WARNING")
             streaming_success = False
         except Exception as e:
+            if deadline is not None and deadline.expired():
+                if debug:
+                    debug.log("Stream-Timeout (Deadline)", f"Fehler: {e}", level="ERROR")
+                return None
             if debug:
                 debug.log_exception("Fehler bei generate_content_stream", e)
             print(f"Fehler bei generate_content_stream: {e}")
             traceback.print_exc()
-            streaming_success = False
+            if parts:
+                # Abbruch mitten im Stream: Erhaltenes behalten und nur die Fortsetzung anfordern
+                try:
+                    continuation = _salvage_stream(client, api_key, model, text, system_prompt, "".join(parts),
+                                                   on_chunk_callback, deadline)
+                except (DeadlineExceeded, CircuitOpenError) as salvage_error:
+                    if debug:
+                        debug.log("Fortsetzung abgebrochen", str(salvage_error), level="ERROR")
+                    return None
+                if continuation is None:
+                    # Ein vollständiger neuer Aufruf würde bereits weitergegebenen Text doppeln
+                    return None
+                parts.append(continuation)
+                full_text = "".join(parts)
+                streaming_success = True
+            elif classify_error(e)[0] in RETRYABLE_ERRORS:
+                # Transienter Fehler, Retries bereits ausgeschöpft - kein zweiter voller Aufruf
+                return None
+            else:
+                streaming_success = False
         
         # Fallback: Normale API ohne Streaming (falls Streaming fehlschlägt)
         if not streaming_success:
@@ -211,10 +1389,12 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
                 if debug:
                     debug.log("Verwende normale API ohne Streaming", f"Modell: {model}")
                 
-                response = client.models.generate_content(
-                    model=model,
-                    contents=prompt
+                response = call_with_retry(
+                    model,
+                    lambda: client.models.generate_content(**_request_kwargs(model, text, system_prompt, deadline, api_key)),
+                    deadline
                 )
+                log_usage(model, getattr(response, "usage_metadata", None), debug)
                 
                 if debug:
                     request_time = debug.end_timer("api_request")
@@ -223,23 +1403,8 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
                     else:
                         debug.log("API-Request gesendet (ohne Stream)", "Dauer konnte nicht gemessen werden")
                 
-                # Extrahiere Text (vereinfacht mit getattr)
-                full_text = getattr(response, "text", None)
-                
-                # Fallback über candidates falls text nicht direkt verfügbar
-                if not full_text and hasattr(response, 'candidates') and response.candidates:
-                    for candidate in response.candidates:
-                        if hasattr(candidate, 'content') and candidate.content:
-                            if hasattr(candidate.content, 'parts'):
-                                for part in candidate.content.parts:
-                                    if hasattr(part, 'text') and part.text:
-                                        full_text = part.text
-                                        break
-                            elif hasattr(candidate.content, 'text'):
-                                full_text = candidate.content.text
-                                break
-                        if full_text:
-                            break
+                # Extrahiere Text (direkt oder über candidates)
+                full_text = extract_response_text(response)
                 
                 if debug:
                     debug.log("Text von normaler API erhalten", f"Länge: {len(full_text)} Zeichen")
@@ -266,12 +1431,8 @@ def improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chun
             print("WARNUNG: Kein Text von Gemini API erhalten!")
             return None
         
-        # Entferne Anführungszeichen am Anfang und Ende, falls vorhanden
-        improved_text = full_text.strip()
-        if improved_text.startswith('"') and improved_text.endswith('"'):
-            improved_text = improved_text[1:-1].strip()
-        if improved_text.startswith("'") and improved_text.endswith("'"):
-            improved_text = improved_text[1:-1].strip()
+        # Nachbearbeitung: Präambel, Codezaun, umschließende Anführungszeichen, Leerraum
+        improved_text = clean_text(full_text, text)
         
         if debug:
             debug.log("Text-Verbesserung abgeschlossen", f"Finale Länge: {len(improved_text)} Zeichen")
@@ -304,32 +1465,14 @@ def improve_text_with_gemini(text, api_key, model, system_prompt):
         return None
     
     try:
-        # Erstelle Client mit direkt übergebenem API Key
-        try:
-            client = genai.Client(api_key=api_key)
-        except TypeError:
-            # Fallback: Falls Client keine api_key Parameter akzeptiert, verwende Umgebungsvariable
-            if 'GEMINI_API_KEY' not in os.environ:
-                os.environ['GEMINI_API_KEY'] = api_key
-            client = genai.Client()
-        
-        # Erstelle den Prompt
-        prompt = f"{system_prompt}\n\n{text}"
-        
-        # Sende Anfrage an Gemini
-        response = client.models.generate_content(
-            model=model,
-            contents=prompt
-        )
-        
-        # Extrahiere den verbesserten Text
-        improved_text = response.text.strip()
-        
-        # Entferne Anführungszeichen am Anfang und Ende, falls vorhanden
-        if improved_text.startswith('"') and improved_text.endswith('"'):
-            improved_text = improved_text[1:-1].strip()
-        if improved_text.startswith("'") and improved_text.endswith("'"):
-            improved_text = improved_text[1:-1].strip()
+        # Hole gepoolten Client
+        client = get_client(api_key)
+        
+        # Sende Anfrage an Gemini (System Prompt als system_instruction bzw. Kontext-Cache)
+        response = client.models.generate_content(**_request_kwargs(model, text, system_prompt, api_key=api_key))
+        
+        # Extrahiere den verbesserten Text und bereinige ihn (Präambel, Anführungszeichen, ...)
+        improved_text = clean_text(response.text, text)
         
         return improved_text
             
@@ -338,3 +1481,688 @@ def improve_text_with_gemini(text, api_key, model, system_prompt):
         traceback.print_exc()
         return None
 
+
+def count_tokens(text, api_key, model):
+    """
+    Zählt die Tokens eines Textes exakt über die API (für die Kalibrierung des lokalen Schätzers).
+    
+    Args:
+        text (str): Der zu zählende Text
+        api_key (str): Der Gemini API Key
+        model (str): Das Modell, dessen Tokenizer verwendet wird
+        
+    Returns:
+        int: Anzahl Tokens
+    """
+    if not HAS_GENAI:
+        raise RuntimeError("google-genai nicht installiert")
+    client = get_client(api_key)
+    response = client.models.count_tokens(model=model, contents=text)
+    mark_connection_used()
+    return response.total_tokens
+
+
+
+class _OrderedSegmentEmitter:
+    """
+    Reicht Chunks paralleler Segmente in Originalreihenfolge an einen Callback weiter.
+    
+    Chunks des vordersten Segments gehen sofort durch, alle anderen werden gepuffert,
+    bis ihr Vorgänger fertig ist.
+    """
+    
+    def __init__(self, on_chunk_callback, debug=None):
+        self.on_chunk_callback = on_chunk_callback
+        self.debug = debug
+        self.leader = 0
+        self.buffers = {}  # index -> Liste gepufferter Chunks
+        self.lock = threading.Lock()
+    
+    def _emit(self, chunk_text):
+        if self.on_chunk_callback:
+            try:
+                self.on_chunk_callback(chunk_text)
+            except Exception as callback_error:
+                if self.debug:
+                    self.debug.log_exception("Fehler im Chunk-Callback", callback_error)
+    
+    def chunk(self, index, chunk_text):
+        """Nimmt einen Chunk von Segment index entgegen."""
+        with self.lock:
+            if index == self.leader:
+                self._emit(chunk_text)
+            else:
+                self.buffers.setdefault(index, []).append(chunk_text)
+    
+    def segment_done(self, index, separator):
+        """Markiert Segment index als fertig; das nächste Segment wird vorderstes."""
+        with self.lock:
+            if separator:
+                self._emit(separator)
+            self.leader = index + 1
+            for chunk_text in self.buffers.pop(index + 1, []):
+                self._emit(chunk_text)
+
+
+def _notify_segment(on_segment_callback, index, segment_text, debug):
+    if on_segment_callback:
+        try:
+            on_segment_callback(index, segment_text)
+        except Exception as callback_error:
+            if debug:
+                debug.log_exception("Fehler im Segment-Callback", callback_error)
+
+
+def improve_long_text_stream(text, api_key, model, system_prompt, on_chunk_callback,
+                             max_chunk_tokens=1200, max_concurrency=4, on_segment_callback=None,
+                             deadline=None):
+    """
+    Verbessert lange Texte in Segmenten parallel und setzt sie in Originalreihenfolge zusammen.
+    
+    Der Text wird an Absatz-/Satzgrenzen unter dem Token-Budget geteilt. Höchstens
+    max_concurrency Segmente sind gleichzeitig unterwegs bzw. gepuffert (begrenzter Speicher).
+    Chunks des vordersten Segments werden sofort an on_chunk_callback weitergereicht, spätere
+    Segmente werden gepuffert, bis sie an der Reihe sind.
+    
+    Args:
+        text (str): Der zu verbessernde Text
+        api_key (str): Der Gemini API Key
+        model (str): Das zu verwendende Gemini Modell
+        system_prompt (str): Der System Prompt für die Verbesserung
+        on_chunk_callback (callable): Wie bei improve_text_with_gemini_stream (chunk_text), in Reihenfolge
+        max_chunk_tokens (int): Token-Budget pro Segment
+        max_concurrency (int): Maximale Anzahl paralleler Requests
+        on_segment_callback (callable): Optional, wird in Reihenfolge mit (index, verbesserter_text)
+            aufgerufen, sobald ein Segment fertig ist (inkl. originalem Trenner am Ende)
+        deadline (Deadline): Optionale gemeinsame Frist für alle Segmente
+        
+    Returns:
+        str: Der vollständige verbesserte Text oder None bei Fehler
+    """
+    if not text or not text.strip():
+        return None
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    segments = split_text(text, max_chunk_tokens)
+    
+    if len(segments) <= 1:
+        result = improve_text_with_gemini_stream(text, api_key, model, system_prompt, on_chunk_callback, deadline)
+        if result:
+            _notify_segment(on_segment_callback, 0, result, debug)
+        return result
+    
+    max_concurrency = max(1, int(max_concurrency))
+    if debug:
+        debug.log("Langtext-Modus", f"{len(segments)} Segmente, ~{estimate_tokens(text)} Tokens, "
+                                    f"Budget: {max_chunk_tokens} Tokens/Segment, Parallel: {max_concurrency}")
+        debug.start_timer("long_text_processing")
+    
+    emitter = _OrderedSegmentEmitter(on_chunk_callback, debug)
+    
+    def run_segment(index):
+        segment_text = segments[index][0]
+        if not segment_text.strip():
+            # Nur Leerraum - nichts zu verbessern
+            return segment_text
+        return improve_text_with_gemini_stream(segment_text, api_key, model, system_prompt,
+                                               lambda chunk_text: emitter.chunk(index, chunk_text), deadline)
+    
+    results = []
+    futures = {}
+    next_submit = 0
+    
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="long_text") as pool:
+        try:
+            for index in range(len(segments)):
+                # Gleitendes Fenster: max. max_concurrency Segmente gleichzeitig in Arbeit/gepuffert
+                while next_submit < len(segments) and next_submit < index + max_concurrency:
+                    futures[next_submit] = pool.submit(run_segment, next_submit)
+                    next_submit += 1
+                
+                improved_segment = futures.pop(index).result()
+                if not improved_segment:
+                    if debug:
+                        debug.log("Segment fehlgeschlagen", f"Segment {index + 1}/{len(segments)}", level="ERROR")
+                    return None
+                
+                separator = segments[index][1]
+                results.append(improved_segment + separator)
+                emitter.segment_done(index, separator)
+                _notify_segment(on_segment_callback, index, improved_segment + separator, debug)
+                
+                if debug:
+                    debug.log(f"Segment {index + 1}/{len(segments)} fertig", f"{len(improved_segment)} Zeichen")
+        finally:
+            for future in futures.values():
+                future.cancel()
+    
+    improved_text = "".join(results)
+    if debug:
+        long_time = debug.end_timer("long_text_processing")
+        debug.log_performance("Langtext-Verarbeitung", long_time,
+                              f"{len(segments)} Segmente, Input: {len(text)} Zeichen, Output: {len(improved_text)} Zeichen")
+    return improved_text.strip()
+
+
+# --- Async API ---
+# Gegenstücke zu den blockierenden Funktionen auf Basis von client.aio. Sie laufen auf dem
+# gemeinsamen Loop der AsyncRuntime; ein task.cancel() schließt den HTTP-Stream sofort.
+
+_STREAM_END = object()
+
+
+async def _wait_for_prewarm_async(timeout=PREWARM_WAIT_TIMEOUT):
+    """Wie wait_for_prewarm, ohne den Event Loop zu blockieren."""
+    event = _prewarm_event
+    if event is None or event.is_set():
+        return wait_for_prewarm(0)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, wait_for_prewarm, timeout)
+
+
+async def _stream_via_thread(text, api_key, model, system_prompt, deadline=None):
+    """
+    Fallback für SDK-Versionen ohne Async-Client: blockierender Stream in einem Executor-Thread.
+    Bei Abbruch werden weitere Chunks verworfen, der HTTP-Stream selbst läuft aber zu Ende.
+    """
+    loop = asyncio.get_running_loop()
+    chunk_queue = asyncio.Queue()
+    cancelled = threading.Event()
+    
+    def on_chunk(chunk_text):
+        if not cancelled.is_set():
+            loop.call_soon_threadsafe(chunk_queue.put_nowait, chunk_text)
+    
+    future = loop.run_in_executor(None, improve_text_with_gemini_stream, text, api_key, model, system_prompt,
+                                  on_chunk, deadline)
+    future.add_done_callback(lambda f: chunk_queue.put_nowait(_STREAM_END))
+    try:
+        while True:
+            item = await chunk_queue.get()
+            if item is _STREAM_END:
+                break
+            yield item
+    finally:
+        cancelled.set()
+
+
+async def improve_text_with_gemini_stream_async(text, api_key, model, system_prompt, deadline=None, partial=None):
+    """
+    Async-Gegenstück zu improve_text_with_gemini_stream: liefert die Text-Chunks als Async-Iterator.
+    
+    Wird der konsumierende Task abgebrochen, wird der zugrunde liegende HTTP-Stream geschlossen.
+    Fehler werden als Exception weitergereicht (kein Non-Streaming-Fallback, siehe
+    improve_text_with_gemini_async).
+    
+    Args:
+        text (str): Der zu verbessernde Text
+        api_key (str): Der Gemini API Key
+        model (str): Das zu verwendende Gemini Modell
+        system_prompt (str): Der System Prompt für die Verbesserung
+        deadline (Deadline): Optionale Frist (Request-Timeout und Prüfung zwischen Chunks)
+        partial (str): Optional, bisherige Antwort eines abgebrochenen Streams (fordert die Fortsetzung an)
+        
+    Yields:
+        str: Die Text-Chunks in Empfangsreihenfolge (unbearbeitet)
+    """
+    if not HAS_GENAI or not text or not text.strip():
+        return
+    
+    debug = get_debug_logger() if get_debug_logger else None
+    caps = probe_sdk_capabilities()
+    
+    if not caps["aio"]:
+        if debug:
+            debug.log("Async-Client nicht verfügbar", "Verwende Thread-Fallback", level="WARNING")
+        fallback = _stream_via_thread(text, api_key, model, system_prompt, deadline)
+        try:
+            async for chunk_text in fallback:
+                yield chunk_text
+        finally:
+            await fallback.aclose()
+        return
+    
+    client = get_client(api_key)
+    await _wait_for_prewarm_async(deadline.timeout_for(PREWARM_WAIT_TIMEOUT) if deadline else PREWARM_WAIT_TIMEOUT)
+    
+    # Transiente Fehler (429/503/Netzwerk) bis zum ersten Chunk werden mit Backoff wiederholt
+    recorder = None if partial else _new_recorder(model, text)
+    response, first_chunk = await _open_stream_async(client, api_key, model, text, system_prompt, deadline, partial)
+    usage = None
+    try:
+        if first_chunk is not None:
+            usage = getattr(first_chunk, "usage_metadata", None)
+            chunk_text = extract_response_text(first_chunk)
+            if chunk_text:
+                if recorder:
+                    recorder.chunk(chunk_text)
+                yield chunk_text
+            async for chunk in response:
+                if deadline is not None:
+                    deadline.check()
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                chunk_text = extract_response_text(chunk)
+                if chunk_text:
+                    if recorder:
+                        recorder.chunk(chunk_text)
+                    yield chunk_text
+        mark_connection_used()
+        log_usage(model, usage, debug)
+        if recorder:
+            recorder.save()
+    finally:
+        # Schließt den HTTP-Stream auch bei Abbruch (CancelledError) oder vorzeitigem Ende
+        await _aclose_quietly(response)
+
+
+async def improve_text_with_gemini_async(text, api_key, model, system_prompt, on_chunk_callback=None,
+                                         deadline=None):
+    """
+    Async-Gegenstück zu improve_text_with_gemini_stream (gleicher Callback-Vertrag).
+    
+    Args:
+        text (str): Der zu verbessernde Text
+        api_key (str): Der Gemini API Key
+        model (str): Das zu verwendende Gemini Modell
+        system_prompt (str): Der System Prompt für die Verbesserung
+        on_chunk_callback (callable): Optional, wird für jeden Text-Chunk im Loop-Thread aufgerufen
+        deadline (Deadline): Optionale Frist; bei Ablauf wird der Stream geschlossen
+        
+    Returns:
+        str: Der vollständige verbesserte Text oder None bei Fehler
+        
+    Raises:
+        DeadlineExceeded: Wenn die Frist abläuft, bevor der Text vollständig ist
+    """
+    if not HAS_GENAI or not text or not text.strip():
+        return None
+    
+    return await _with_deadline(
+        _improve_text_async_impl(text, api_key, model, system_prompt, on_chunk_callback, deadline),
+        deadline
+    )
+
+
+async def _with_deadline(coro, deadline):
+    """Führt eine Coroutine mit der Restzeit der Deadline aus (DeadlineExceeded bei Ablauf)."""
+    if deadline is None:
+        return await coro
+    if deadline.expired():
+        coro.close()
+        deadline.check()
+    try:
+        return await asyncio.wait_for(coro, timeout=deadline.remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Frist von {deadline.timeout:.1f}s für Request {deadline.request_id} abgelaufen")
+
+
+async def _improve_text_async_impl(text, api_key, model, system_prompt, on_chunk_callback, deadline):
+    debug = get_debug_logger() if get_debug_logger else None
+    parts = []
+    stream_error = None
+    
+    if debug:
+        debug.log("Starte Async-Streaming", f"Modell: {model}, Text-Länge: {len(text)} Zeichen")
+        debug.start_timer("async_first_chunk_wait")
+    
+    stream_start = time.monotonic()
+    stream = improve_text_with_gemini_stream_async(text, api_key, model, system_prompt, deadline)
+    try:
+        async for chunk_text in stream:
+            if not parts:
+                record_ttfb(model, time.monotonic() - stream_start)
+                if debug:
+                    first_chunk_time = debug.end_timer("async_first_chunk_wait")
+                    if first_chunk_time is not None:
+                        debug.log("Erster Text-Chunk erhalten (async)", f"Nach {first_chunk_time:.3f}s")
+            parts.append(chunk_text)
+            if on_chunk_callback:
+                try:
+                    on_chunk_callback(chunk_text)
+                except Exception as callback_error:
+                    if debug:
+                        debug.log_exception("Fehler im Chunk-Callback", callback_error)
+    except (asyncio.CancelledError, DeadlineExceeded):
+        if debug:
+            debug.log("Async-Streaming abgebrochen", f"{len(parts)} Chunks bis zum Abbruch")
+        raise
+    except CircuitOpenError as e:
+        if debug:
+            debug.log("Request abgelehnt (Circuit Breaker)", str(e), level="ERROR")
+        print(f"Gemini API vorübergehend nicht erreichbar: {e}")
+        return None
+    except Exception as e:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"Stream-Fehler nach Ablauf der Frist: {e}")
+        if debug:
+            debug.log_exception("Fehler bei Async-Streaming", e)
+        print(f"Fehler bei Async-Streaming: {e}")
+        if parts:
+            stream_error = e
+        elif classify_error(e)[0] in RETRYABLE_ERRORS:
+            # Transienter Fehler, Retries bereits ausgeschöpft - kein zweiter voller Aufruf
+            return None
+    finally:
+        await stream.aclose()
+    
+    if stream_error is not None:
+        # Abbruch mitten im Stream: Erhaltenes behalten und nur die Fortsetzung anfordern
+        if not probe_sdk_capabilities()["aio"]:
+            return None
+        try:
+            continuation = await _salvage_stream_async(api_key, model, text, system_prompt, "".join(parts),
+                                                       on_chunk_callback, deadline)
+        except CircuitOpenError as e:
+            if debug:
+                debug.log("Fortsetzung abgelehnt (Circuit Breaker)", str(e), level="ERROR")
+            return None
+        if continuation is None:
+            # Ein vollständiger neuer Aufruf würde bereits weitergegebenen Text doppeln
+            return None
+        parts.append(continuation)
+    
+    if not parts and probe_sdk_capabilities()["aio"]:
+        # Fallback: Normale API ohne Streaming
+        try:
+            if debug:
+                debug.log("Verwende normale Async-API ohne Streaming", f"Modell: {model}")
+            client = get_client(api_key)
+            response = await call_with_retry_async(
+                model,
+                lambda: client.aio.models.generate_content(**_request_kwargs(model, text, system_prompt, deadline, api_key)),
+                deadline
+            )
+            log_usage(model, getattr(response, "usage_metadata", None), debug)
+            full_text = extract_response_text(response)
+            if full_text:
+                parts.append(full_text)
+                if on_chunk_callback:
+                    on_chunk_callback(full_text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if debug:
+                debug.log_exception("Fehler bei normaler Async-API", e)
+            print(f"Fehler bei normaler Async-API: {e}")
+            return None
+    
+    full_text = "".join(parts)
+    if not full_text.strip():
+        if debug:
+            debug.log("Kein Text von Async-API erhalten", level="ERROR")
+        return None
+    return clean_text(full_text, text)
+
+
+# --- Hedged Requests ---
+# Kommt beim Primärmodell innerhalb der Schwelle kein Chunk, wird dieselbe Anfrage zusätzlich
+# an ein Fallback-Modell gestellt. Der Stream, der zuerst Text liefert, gewinnt; der andere
+# wird abgebrochen (HTTP-Stream geschlossen).
+HEDGE_DEFAULT_THRESHOLD = 3.0   # Sekunden, solange zu wenige TTFB-Messwerte vorliegen
+HEDGE_MIN_SAMPLES = 10          # Ab so vielen Messwerten wird das p90 verwendet
+TTFB_HISTORY_SIZE = 50
+
+_ttfb_history = {}  # Modell -> deque der letzten TTFB-Messwerte (Sekunden)
+_hedge_stats = {"requests": 0, "fired": 0, "hedge_won": 0, "primary_won": 0, "both_failed": 0}
+
+
+def record_ttfb(model, ttfb):
+    """Merkt sich die Zeit bis zum ersten Chunk eines Modells (für das gelernte p90)."""
+    history = _ttfb_history.setdefault(model, collections.deque(maxlen=TTFB_HISTORY_SIZE))
+    history.append(ttfb)
+
+
+def get_ttfb_percentile(model, percentile=0.9):
+    """Gibt das Perzentil der TTFB-Historie zurück (None bei zu wenig Messwerten)."""
+    history = _ttfb_history.get(model)
+    if not history or len(history) < HEDGE_MIN_SAMPLES:
+        return None
+    values = sorted(history)
+    index = min(len(values) - 1, int(round(percentile * (len(values) - 1))))
+    return values[index]
+
+
+def get_hedge_threshold(model, fixed_threshold=0):
+    """Schwelle für den Hedge: fester Wert (>0) oder gelerntes p90 der TTFB."""
+    if fixed_threshold and fixed_threshold > 0:
+        return float(fixed_threshold)
+    learned = get_ttfb_percentile(model)
+    return learned if learned is not None else HEDGE_DEFAULT_THRESHOLD
+
+
+def get_hedge_stats():
+    """Gibt eine Kopie der Hedge-Zähler zurück."""
+    return dict(_hedge_stats)
+
+
+def _format_hedge_stats():
+    return ", ".join(f"{k}: {v}" for k, v in _hedge_stats.items())
+
+
+async def _cancel_stream(first_task, stream):
+    """Bricht einen Stream ab, dessen erster Chunk noch aussteht."""
+    if first_task is not None and not first_task.done():
+        first_task.cancel()
+        await asyncio.gather(first_task, return_exceptions=True)
+    try:
+        await stream.aclose()
+    except Exception:
+        pass
+
+
+async def improve_text_hedged_async(text, api_key, model, system_prompt, on_chunk_callback=None,
+                                    deadline=None, fallback_model=None, hedge_threshold=0, on_winner=None):
+    """
+    Wie improve_text_with_gemini_async, aber mit Hedge auf ein Fallback-Modell.
+    
+    Args:
+        text (str): Der zu verbessernde Text
+        api_key (str): Der Gemini API Key
+        model (str): Das Primärmodell
+        system_prompt (str): Der System Prompt für die Verbesserung
+        on_chunk_callback (callable): Optional, wird für jeden Chunk des Gewinners aufgerufen
+        deadline (Deadline): Optionale Frist
+        fallback_model (str): Modell für die zweite Anfrage (ohne: kein Hedge)
+        hedge_threshold (float): Feste Schwelle in Sekunden; 0 = gelerntes p90 der TTFB
+        on_winner (callable): Optional, erhält das Modell, dessen Stream gewonnen hat
+            (ohne Aufruf stammt die Antwort vom Primärmodell)
+        
+    Returns:
+        str: Der vollständige verbesserte Text oder None bei Fehler
+    """
+    if not HAS_GENAI or not text or not text.strip():
+        return None
+    if not fallback_model or fallback_model == model or not probe_sdk_capabilities()["aio"]:
+        return await improve_text_with_gemini_async(text, api_key, model, system_prompt, on_chunk_callback, deadline)
+    
+    return await _with_deadline(
+        _improve_text_hedged_impl(text, api_key, model, system_prompt, on_chunk_callback,
+                                  deadline, fallback_model, hedge_threshold, on_winner),
+        deadline
+    )
+
+
+async def _improve_text_hedged_impl(text, api_key, model, system_prompt, on_chunk_callback,
+                                    deadline, fallback_model, hedge_threshold, on_winner=None):
+    debug = get_debug_logger() if get_debug_logger else None
+    threshold = get_hedge_threshold(model, hedge_threshold)
+    _hedge_stats["requests"] += 1
+    start = time.monotonic()
+    
+    primary = improve_text_with_gemini_stream_async(text, api_key, model, system_prompt, deadline)
+    primary_first = asyncio.ensure_future(primary.__anext__())
+    candidates = {primary_first: (model, primary)}
+    hedge_first = None
+    
+    winner_model = None
+    winner_stream = None
+    first_chunk = None
+    
+    try:
+        done, _ = await asyncio.wait({primary_first}, timeout=threshold)
+        primary_failed = bool(done) and (primary_first.cancelled() or primary_first.exception() is not None)
+        if not done or primary_failed:
+            # Primärmodell zu langsam oder sofort gescheitert (z.B. Circuit Breaker offen) - Fallback-Modell
+            _hedge_stats["fired"] += 1
+            if debug:
+                reason = "gescheitert" if primary_failed else f"kein Chunk nach {threshold:.2f}s"
+                debug.log("Hedge ausgelöst", f"{model}: {reason}, starte {fallback_model}")
+            hedge = improve_text_with_gemini_stream_async(text, api_key, fallback_model, system_prompt, deadline)
+            hedge_first = asyncio.ensure_future(hedge.__anext__())
+            candidates[hedge_first] = (fallback_model, hedge)
+        
+        pending = set(candidates)
+        while pending and winner_stream is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if winner_stream is not None:
+                    break
+                task_model, task_stream = candidates[task]
+                if task.cancelled() or task.exception() is not None:
+                    if debug:
+                        error = "abgebrochen" if task.cancelled() else task.exception()
+                        debug.log("Hedge-Kandidat fehlgeschlagen", f"Modell: {task_model}, Fehler: {error}", level="WARNING")
+                    continue
+                winner_model, winner_stream, first_chunk = task_model, task_stream, task.result()
+    finally:
+        # Verlierer (und bei Fehlern alle offenen Streams) abbrechen
+        for task, (task_model, task_stream) in candidates.items():
+            if task_stream is not winner_stream:
+                await _cancel_stream(task, task_stream)
+    
+    if winner_stream is None:
+        _hedge_stats["both_failed"] += 1
+        if debug:
+            debug.log("Hedge: kein Stream lieferte Text", _format_hedge_stats(), level="ERROR")
+        # Letzter Versuch inkl. Non-Streaming-Fallback
+        return await _improve_text_async_impl(text, api_key, model, system_prompt, on_chunk_callback, deadline)
+    
+    ttfb = time.monotonic() - start
+    if winner_model == model:
+        record_ttfb(model, ttfb)
+        if hedge_first is not None:
+            _hedge_stats["primary_won"] += 1
+    else:
+        _hedge_stats["hedge_won"] += 1
+    if debug:
+        debug.log("Hedge-Gewinner", f"Modell: {winner_model}, erster Chunk nach {ttfb:.3f}s | {_format_hedge_stats()}")
+    if on_winner:
+        on_winner(winner_model)
+    
+    parts = []
+    
+    def emit(chunk_text):
+        parts.append(chunk_text)
+        if on_chunk_callback:
+            try:
+                on_chunk_callback(chunk_text)
+            except Exception as callback_error:
+                if debug:
+                    debug.log_exception("Fehler im Chunk-Callback", callback_error)
+    
+    try:
+        emit(first_chunk)
+        async for chunk_text in winner_stream:
+            emit(chunk_text)
+    except (asyncio.CancelledError, DeadlineExceeded):
+        raise
+    except Exception as e:
+        if debug:
+            debug.log_exception("Fehler im Hedge-Stream", e)
+        print(f"Fehler im Hedge-Stream: {e}")
+        # Erhaltenes behalten und die Fortsetzung beim Gewinner-Modell anfordern
+        try:
+            continuation = await _salvage_stream_async(api_key, winner_model, text, system_prompt, "".join(parts),
+                                                       on_chunk_callback, deadline)
+        except CircuitOpenError:
+            continuation = None
+        if continuation is None:
+            return None
+        parts.append(continuation)
+    finally:
+        await winner_stream.aclose()
+    
+    full_text = "".join(parts)
+    if not full_text.strip():
+        return None
+    return clean_text(full_text, text)
+
+
+async def improve_long_text_async(text, api_key, model, system_prompt, on_chunk_callback=None,
+                                  max_chunk_tokens=1200, max_concurrency=4, on_segment_callback=None,
+                                  deadline=None, improve_fn=None, segments=None, known_segments=None):
+    """
+    Async-Gegenstück zu improve_long_text_stream: Segmente laufen als Tasks auf einem Loop.
+    
+    Argumente und Rückgabe wie bei improve_long_text_stream. Ein Abbruch des Aufrufers
+    bricht alle laufenden Segment-Requests ab. improve_fn ersetzt optional
+    improve_text_with_gemini_async (gleiche Signatur), z.B. für andere Provider.
+    
+    Mit segments (Liste von (segment, trenner)) wird nicht selbst geteilt; known_segments
+    (Index -> verbesserter Text) werden ohne Request in der Reihenfolge übernommen
+    (Absatz-Speicher, siehe paragraph_memo).
+    """
+    if not text or not text.strip():
+        return None
+    
+    improve_fn = improve_fn or improve_text_with_gemini_async
+    debug = get_debug_logger() if get_debug_logger else None
+    known_segments = known_segments or {}
+    if segments is None:
+        segments = split_text(text, max_chunk_tokens)
+    
+    if len(segments) <= 1 and not known_segments:
+        result = await improve_fn(text, api_key, model, system_prompt, on_chunk_callback, deadline)
+        if result:
+            _notify_segment(on_segment_callback, 0, result, debug)
+        return result
+    
+    max_concurrency = max(1, int(max_concurrency))
+    if debug:
+        debug.log("Langtext-Modus (async)", f"{len(segments)} Segmente, ~{estimate_tokens(text)} Tokens, "
+                                            f"Budget: {max_chunk_tokens} Tokens/Segment, Parallel: {max_concurrency}")
+        debug.start_timer("long_text_processing")
+    
+    emitter = _OrderedSegmentEmitter(on_chunk_callback, debug)
+    
+    async def run_segment(index):
+        segment_text = segments[index][0]
+        if index in known_segments:
+            emitter.chunk(index, known_segments[index])
+            return known_segments[index]
+        if not segment_text.strip():
+            return segment_text
+        return await improve_fn(segment_text, api_key, model, system_prompt,
+                                lambda chunk_text: emitter.chunk(index, chunk_text), deadline)
+    
+    results = []
+    tasks = {}
+    next_submit = 0
+    try:
+        for index in range(len(segments)):
+            while next_submit < len(segments) and next_submit < index + max_concurrency:
+                tasks[next_submit] = asyncio.ensure_future(run_segment(next_submit))
+                next_submit += 1
+            
+            improved_segment = await tasks.pop(index)
+            if not improved_segment:
+                if debug:
+                    debug.log("Segment fehlgeschlagen", f"Segment {index + 1}/{len(segments)}", level="ERROR")
+                return None
+            
+            separator = segments[index][1]
+            results.append(improved_segment + separator)
+            emitter.segment_done(index, separator)
+            _notify_segment(on_segment_callback, index, improved_segment + separator, debug)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+    
+    improved_text = "".join(results)
+    if debug:
+        long_time = debug.end_timer("long_text_processing")
+        debug.log_performance("Langtext-Verarbeitung (async)", long_time,
+                              f"{len(segments)} Segmente, Input: {len(text)} Zeichen, Output: {len(improved_text)} Zeichen")
+    return improved_text.strip()
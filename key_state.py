@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Echter Tastenzustand aus dem Hotkey-Listener.
+
+Nach dem Hotkey (z.B. Ctrl+R) hält der Benutzer die Tasten oft noch gedrückt; ein simuliertes
+Ctrl+C oder Backspace würde dann mit den gehaltenen Modifiern kombiniert. Statt fest zu warten
+(bisher 50 ms vor Ctrl+C und vor Backspace), verfolgt TrackingHotKeys gedrückte und losgelassene
+Tasten, und wait_for_release() kehrt zurück, sobald alle Hotkey-Tasten losgelassen sind
+(höchstens bis zum Timeout).
+"""
+
+import threading
+import time
+
+try:
+    from pynput import keyboard
+    HAS_PYNPUT = True
+except ImportError:
+    HAS_PYNPUT = False
+
+
+RELEASE_TIMEOUT = 0.5     # Obergrenze, falls ein Loslassen-Ereignis verloren geht
+FIXED_DELAY = 0.05        # Bisherige feste Wartezeit (Bezug für die gesparte Zeit)
+HISTOGRAM_BUCKETS_MS = (0, 10, 20, 30, 40)  # Obergrenzen der Klassen (gesparte ms); letzte Klasse "40-50"
+
+
+class KeyState:
+    """Menge der gerade gedrückten Tasten (kanonisch, wie pynput.HotKey sie vergleicht)."""
+
+    def __init__(self):
+        self._pressed = set()
+        self._cond = threading.Condition()
+
+    def press(self, key):
+        with self._cond:
+            self._pressed.add(key)
+
+    def release(self, key):
+        with self._cond:
+            self._pressed.discard(key)
+            self._cond.notify_all()
+
+    def is_pressed(self, key):
+        with self._cond:
+            return key in self._pressed
+
+    def wait_for_release(self, keys, timeout=RELEASE_TIMEOUT):
+        """
+        Wartet, bis keine der Tasten mehr gedrückt ist.
+
+        Nach einem Timeout gelten die Tasten als losgelassen (verlorenes Ereignis soll nicht
+        jede weitere Anfrage ausbremsen).
+
+        Args:
+            keys (iterable): Die Tasten (kanonisch)
+            timeout (float): Maximale Wartezeit
+
+        Returns:
+            tuple: (gewartete Sekunden, True wenn losgelassen / False bei Timeout)
+        """
+        keys = set(keys)
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            while self._pressed & keys:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._pressed -= keys
+                    return time.monotonic() - start, False
+                self._cond.wait(remaining)
+        return time.monotonic() - start, True
+
+
+if HAS_PYNPUT:
+    class TrackingHotKeys(keyboard.GlobalHotKeys):
+        """GlobalHotKeys, der zusätzlich den Tastenzustand in ein KeyState schreibt."""
+
+        def __init__(self, hotkeys, key_state, *args, **kwargs):
+            self.key_state = key_state
+            self.hotkey_keys = set()
+            for hotkey in hotkeys:
+                self.hotkey_keys.update(keyboard.HotKey.parse(hotkey))
+            super().__init__(hotkeys, *args, **kwargs)
+
+        def _on_press(self, key, *args):
+            # Zuerst den Zustand setzen: der Hotkey-Callback sieht die Tasten so bereits als gedrückt
+            if key is not None:
+                self.key_state.press(self.canonical(key))
+            super()._on_press(key, *args)
+
+        def _on_release(self, key, *args):
+            super()._on_release(key, *args)
+            if key is not None:
+                self.key_state.release(self.canonical(key))
+else:
+    TrackingHotKeys = None
+
+
+class ReleaseStats:
+    """Histogramm der gegenüber der festen Wartezeit gesparten Zeit (pro Wartestelle)."""
+
+    def __init__(self, fixed_delay=FIXED_DELAY):
+        self.fixed_delay = fixed_delay
+        self.counts = {}    # Wartestelle -> Liste der Klassen-Zähler
+        self.timeouts = 0
+
+    def record(self, label, waited, released=True):
+        """
+        Zählt eine Wartezeit.
+
+        Returns:
+            float: Gesparte Millisekunden (negativ, wenn länger als die feste Wartezeit gewartet wurde)
+        """
+        saved_ms = (self.fixed_delay - waited) * 1000
+        counts = self.counts.setdefault(label, [0] * (len(HISTOGRAM_BUCKETS_MS) + 1))
+        counts[self._bucket(saved_ms)] += 1
+        if not released:
+            self.timeouts += 1
+        return saved_ms
+
+    @staticmethod
+    def _bucket(saved_ms):
+        for index, upper in enumerate(HISTOGRAM_BUCKETS_MS):
+            if saved_ms < upper:
+                return index
+        return len(HISTOGRAM_BUCKETS_MS)
+
+    def format_histogram(self):
+        """Formatiert das Histogramm für das Debug-Log, z.B. "ctrl_c (gesparte ms) < 0: 1, 40-50: 7"."""
+        labels = ["< 0"]
+        labels += [f"{low}-{high}" for low, high in zip(HISTOGRAM_BUCKETS_MS, HISTOGRAM_BUCKETS_MS[1:])]
+        labels.append(f"{HISTOGRAM_BUCKETS_MS[-1]}-{self.fixed_delay * 1000:.0f}")
+        lines = []
+        for label, counts in sorted(self.counts.items()):
+            buckets = ", ".join(f"{name}: {count}" for name, count in zip(labels, counts) if count)
+            lines.append(f"{label} (gesparte ms) {buckets}")
+        if self.timeouts:
+            lines.append(f"Timeouts: {self.timeouts}")
+        return "; ".join(lines)
@@ -9,6 +9,7 @@ import sys
 import traceback
 import queue
 import logging
+import asyncio
 from datetime import datetime
 
 # --- Konsolenfenster verstecken (außer bei Debug) ---# Diese Funktion wird so früh wie möglich aufgerufen, um das Fenster zu verstecken
@@ -110,8 +111,25 @@ except ImportError:
 # --- Local Module Imports ---
 try:
     from config import ConfigManager
-    from gemini_api import improve_text_with_gemini, improve_text_with_gemini_stream
+    from gemini_api import (improve_text_with_gemini, improve_text_with_gemini_stream,
+                            probe_sdk_capabilities, get_client, reset_client_pool,
+                            configure_transport, set_base_url, set_stream_recording,
+                            configure_context_cache)
+    from providers import create_provider, GeminiProvider
     from settings_window import SettingsWindow
+    from response_cache import ResponseCache
+    from paragraph_memo import ParagraphMemo
+    from token_estimator import TokenEstimator
+    from async_runtime import get_async_runtime
+    from deadline import AdaptiveTimeout, DeadlineExceeded
+    from model_router import ModelRouter
+    from edit_mode import build_edit_prompt, improve_with_edits_async
+    from stream_insert import StreamInserter
+    from clipboard_watcher import create_clipboard_watcher
+    from clipboard_backend import create_clipboard, selection_owned_by_active_window
+    from key_state import KeyState, ReleaseStats, TrackingHotKeys
+    from timing_profiles import get_timing_profiles, get_foreground_app
+    from text_masking import mask_text, build_masked_prompt, log_missing
     from debug_logger import init_debug_logger, get_debug_logger
     from debug_window import DebugWindow, DebugWindowHandler
 except ImportError as e:
@@ -142,7 +160,11 @@ class TextImproverApp:
         self.is_shutting_down = False
         self.is_processing = False
         self.original_text = None  # Speichert den ursprünglichen Text
-        self.stream_thread_obj = None  # Referenz zum Stream-Thread
+        self.stream_future = None  # Future des laufenden API-Tasks
+        self.current_request_id = None  # Nachrichten anderer (veralteter) Requests werden verworfen
+        self.current_deadline = None
+        # Gemeinsamer asyncio Loop für alle API-Requests
+        self.async_runtime = get_async_runtime()
         # Queue für Thread-zu-GUI Kommunikation (Thread-sicher)
         self.message_queue = queue.Queue()
         # Starte Queue-Processor
@@ -167,6 +189,52 @@ class TextImproverApp:
             # Verbinde Debug-Logger mit Debug-Fenster (wird später erstellt)
             # Das wird in open_debug_window gemacht
         
+        # Adaptive Frist pro Request (aus Eingabelänge und gemessenem Durchsatz)
+        self.adaptive_timeout = AdaptiveTimeout(
+            min_timeout=float(self.config.get("request_timeout_min", 15)),
+            max_timeout=float(self.config.get("request_timeout_max", 300)),
+        )
+        
+        # Lokaler Token-Schätzer (kalibriert gegen count_tokens) für Größenprüfung vor dem Senden
+        self.token_estimator = TokenEstimator()
+        
+        # Modell-Router (wählt das Modell pro Request, falls aktiviert)
+        self.model_router = self.create_model_router()
+        
+        # Antwort-Cache (Speicher-LRU + Datei-Store im AppData-Verzeichnis)
+        self.response_cache = self.create_response_cache()
+        
+        # Absatz-Speicher (nur geänderte Absätze erneut senden)
+        self.paragraph_memo = self.create_paragraph_memo()
+        
+        # Zwischenablage im eigenen Prozess (Tk-Root, pyperclip als Fallback)
+        self.clipboard = create_clipboard(self.root, self.config.get("clipboard_backend", "pyperclip"))
+        
+        # Zwischenablage-Watcher (wartet auf die neue Auswahl statt paste() abzufragen)
+        self.clipboard_watcher = None
+        
+        # Direkte PRIMARY-Erfassung (X11): zuletzt erfasster (Text, Zeitstempel) und Latenz pro Methode
+        self.last_primary_capture = (None, None)
+        self.capture_stats = {}
+        
+        # Tastenzustand aus dem Hotkey-Listener (Ctrl+C/Backspace erst nach Loslassen der Hotkey-Tasten)
+        self.key_state = KeyState()
+        self.hotkey_keys = set()
+        self.release_stats = ReleaseStats()
+        self.request_release_savings = []
+        
+        # Zeitprofile pro Zielanwendung (gelernte Wartezeiten für Ctrl+C/Ctrl+V)
+        self.timing_profiles = get_timing_profiles()
+        self.current_app = None
+        
+        # Backend (Gemini oder OpenAI-kompatibler Server) aus den Einstellungen
+        self.provider = create_provider(self.config)
+        
+        # Gemini Client einmalig vorbereiten (SDK-Probe + gepoolter Client) und bei Key-Wechsel neu aufbauen
+        self.config.add_change_listener(self.on_config_changed)
+        self.init_api_client()
+        self.root.after(60000, self.schedule_idle_prewarm)
+        
         # Verstecke Hauptfenster immer (läuft im Hintergrund)
         self.root.withdraw()
         
@@ -189,6 +257,175 @@ class TextImproverApp:
         
         debug_print("Quick Text Improver gestartet. Drücke STRG+R um markierten Text zu verbessern.")
     
+    def init_api_client(self):
+        """Ermittelt SDK-Fähigkeiten und erstellt den gepoolten Gemini Client im Hintergrund."""
+        api_key = self.config.get("gemini_api_key")
+        self.configure_api_transport()
+        set_base_url(self.config.get("gemini_base_url", ""))
+        set_stream_recording(self.config.get("record_streams", False))
+        configure_context_cache(self.config.get("context_cache_enabled", True))
+        if not isinstance(self.provider, GeminiProvider):
+            return
+        
+        def init_thread():
+            try:
+                probe_sdk_capabilities()
+                if api_key:
+                    get_client(api_key)
+                    self.provider.prepare_context(self.get_provider_model(), self.config.get("system_prompt"))
+            except Exception as e:
+                if self.debug:
+                    self.debug.log_exception("Fehler beim Vorbereiten des Gemini Clients", e)
+                debug_print(f"Fehler beim Vorbereiten des Gemini Clients: {e}")
+        
+        threading.Thread(target=init_thread, daemon=True).start()
+    
+    def configure_api_transport(self):
+        """Überträgt Retry- und Circuit-Breaker-Einstellungen an gemini_api."""
+        configure_transport(
+            max_attempts=int(self.config.get("retry_max_attempts", 3)),
+            failure_threshold=int(self.config.get("circuit_breaker_threshold", 5)),
+            cooldown=float(self.config.get("circuit_breaker_cooldown", 30)),
+        )
+    
+    def create_model_router(self):
+        """Erstellt den Modell-Router mit den aktuellen Einstellungen."""
+        return ModelRouter(
+            self.adaptive_timeout,
+            candidates=self.config.get("router_candidates") or None,
+            latency_slo=float(self.config.get("router_latency_slo", 8.0)),
+            short_tokens=int(self.config.get("router_short_tokens", 150)),
+            long_tokens=int(self.config.get("router_long_tokens", 1500)),
+        )
+    
+    def create_response_cache(self):
+        """Erstellt den Antwort-Cache gemäß Einstellungen (oder None wenn deaktiviert)."""
+        if not self.config.get("response_cache_enabled", True):
+            return None
+        try:
+            return ResponseCache(
+                max_memory_entries=int(self.config.get("response_cache_memory_entries", 200)),
+                max_disk_bytes=int(float(self.config.get("response_cache_max_mb", 20)) * 1024 * 1024),
+                ttl_seconds=float(self.config.get("response_cache_ttl_hours", 168)) * 3600,
+            )
+        except Exception as e:
+            if self.debug:
+                self.debug.log_exception("Antwort-Cache konnte nicht erstellt werden", e)
+            debug_print(f"Antwort-Cache konnte nicht erstellt werden: {e}")
+            return None
+    
+    def create_paragraph_memo(self):
+        """Erstellt den Absatz-Speicher gemäß Einstellungen (oder None wenn deaktiviert)."""
+        if not self.config.get("paragraph_memo_enabled", True):
+            return None
+        try:
+            return ParagraphMemo(max_entries=int(self.config.get("paragraph_memo_max_entries", 2000)))
+        except Exception as e:
+            if self.debug:
+                self.debug.log_exception("Absatz-Speicher konnte nicht erstellt werden", e)
+            debug_print(f"Absatz-Speicher konnte nicht erstellt werden: {e}")
+            return None
+    
+    def get_cache_menu_text(self):
+        """Text für den Cache-Eintrag im Tray-Menü."""
+        if not self.response_cache:
+            return "Cache: deaktiviert"
+        stats = self.response_cache.get_stats()
+        return f"Cache: {stats['hits']} Treffer / {stats['misses']} Fehltreffer / {stats['evictions']} verdrängt"
+    
+    def on_tray_clear_cache(self, icon=None, item=None):
+        """Callback für Tray Menü: Antwort-Cache und Absatz-Speicher leeren."""
+        debug_print("Tray action: Clear cache")
+        if self.response_cache:
+            self.response_cache.clear()
+        if self.paragraph_memo:
+            self.paragraph_memo.clear()
+    
+    def prewarm_api_connection(self, force=False):
+        """Startet den Pre-Warm der Gemini-Verbindung (falls aktiviert)."""
+        if not self.config.get("connection_prewarm", True):
+            return
+        try:
+            self.provider.prewarm(self.get_provider_model(), force=force)
+        except Exception as e:
+            debug_print(f"Fehler beim Pre-Warm: {e}")
+    
+    def get_provider_model(self):
+        """Modellname für den aktiven Provider (Gemini-Modell oder Modell des lokalen Servers)."""
+        if isinstance(self.provider, GeminiProvider):
+            return self.config.get("gemini_model")
+        if self.provider.name == "replay":
+            return "replay"
+        return self.config.get("openai_model", "local")
+    
+    def recreate_provider(self):
+        """Erstellt den Provider nach geänderten Backend-Einstellungen neu."""
+        old_provider = self.provider
+        self.provider = create_provider(self.config)
+        old_provider.close()
+        if self.debug:
+            self.debug.log("Provider gewechselt", f"{old_provider.name} -> {self.provider.name}")
+    
+    def schedule_idle_prewarm(self):
+        """Hält die Verbindung im Leerlauf warm (alle 'prewarm_idle_interval' Sekunden)."""
+        if self.is_shutting_down:
+            return
+        try:
+            interval = float(self.config.get("prewarm_idle_interval", 0) or 0)
+        except (TypeError, ValueError):
+            interval = 0
+        if interval <= 0:
+            # Deaktiviert - prüfe später erneut, falls Einstellung geändert wird
+            self.root.after(60000, self.schedule_idle_prewarm)
+            return
+        if not self.is_processing:
+            self.prewarm_api_connection()
+        self.root.after(int(interval * 1000), self.schedule_idle_prewarm)
+    
+    def on_config_changed(self, key, old_value, new_value):
+        """Reagiert auf geänderte Einstellungen (ConfigManager Change-Listener)."""
+        if key == "gemini_api_key":
+            if self.debug:
+                self.debug.log("API Key geändert", "Baue Client-Pool neu auf")
+            reset_client_pool()
+            self.recreate_provider()
+            self.init_api_client()
+        elif key == "gemini_base_url":
+            set_base_url(new_value)
+            self.init_api_client()
+        elif key == "record_streams":
+            set_stream_recording(new_value)
+        elif key == "system_prompt":
+            # Kontext-Cache des alten Prompts verwerfen und für den neuen anlegen
+            self.provider.prepare_context(self.get_provider_model(), new_value, invalidate=True)
+        elif key == "gemini_model":
+            self.provider.prepare_context(self.get_provider_model(), self.config.get("system_prompt"))
+        elif key == "context_cache_enabled":
+            configure_context_cache(new_value)
+            self.provider.prepare_context(self.get_provider_model(), self.config.get("system_prompt"))
+        elif key in ("provider", "openai_base_url", "openai_api_key", "replay_path", "replay_speed"):
+            self.recreate_provider()
+            self.init_api_client()
+        elif key in ("retry_max_attempts", "circuit_breaker_threshold", "circuit_breaker_cooldown"):
+            self.configure_api_transport()
+        elif key in ("clipboard_watcher", "clipboard_backend"):
+            if key == "clipboard_backend":
+                self.clipboard = create_clipboard(self.root, new_value)
+            if self.clipboard_watcher:
+                self.clipboard_watcher.close()
+            self.clipboard_watcher = None
+        elif key.startswith("router_") and key != "router_enabled":
+            self.model_router = self.create_model_router()
+        elif key in ("paragraph_memo_enabled", "paragraph_memo_max_entries"):
+            if self.paragraph_memo:
+                self.paragraph_memo.flush()
+            self.paragraph_memo = self.create_paragraph_memo()
+        elif key.startswith("response_cache_"):
+            # Ein-/Ausschalten, Größe und TTL sofort übernehmen (Einträge auf der Platte bleiben erhalten)
+            if self.response_cache:
+                self.response_cache.flush()
+            self.response_cache = self.create_response_cache()
+    
     def setup_tray_icon(self):
         """Erstellt das System Tray Icon."""
         if not HAS_PYSTRAY:
@@ -228,8 +465,12 @@ class TextImproverApp:
             if self.debug and self.debug.enabled:
                 menu_items.append(pystray.MenuItem('Debug Logs...', self.on_tray_open_debug))
             
+            if self.response_cache or self.paragraph_memo:
+                menu_items.append(pystray.MenuItem('Cache leeren', self.on_tray_clear_cache))
+            
             menu_items.extend([
                 pystray.Menu.SEPARATOR,
+                pystray.MenuItem(lambda item: self.get_cache_menu_text(), None, enabled=False),
                 pystray.MenuItem(f'Version: {APP_VERSION}', None, enabled=False),
                 pystray.MenuItem(f'Hotkey: {self.config.get("hotkey")}', None, enabled=False),
                 pystray.Menu.SEPARATOR,
@@ -403,12 +644,15 @@ class TextImproverApp:
                 return
             
             debug_print(f"Hotkey '{hotkey_str}' aktiviert!")
+            # Verbindungsaufbau parallel zum Kopieren der Markierung starten
+            self.prewarm_api_connection()
             self.root.after(0, self.process_selected_text)
         
         def listener_thread_func():
             """Funktion die im Listener Thread läuft."""
             try:
-                self.hotkey_listener = keyboard.GlobalHotKeys({hotkey_str: on_activate})
+                self.hotkey_listener = TrackingHotKeys({hotkey_str: on_activate}, self.key_state)
+                self.hotkey_keys = self.hotkey_listener.hotkey_keys
                 debug_print(f"Hotkey Listener gestartet mit: {hotkey_str}")
                 self.hotkey_listener.run()
             except Exception as e:
@@ -444,6 +688,77 @@ class TextImproverApp:
         self.listener_thread = None
         debug_print("Hotkey Listener gestoppt.")
     
+    def get_clipboard_watcher(self):
+        """Zwischenablage-Watcher (beim ersten Hotkey erstellt, danach wiederverwendet)."""
+        if self.clipboard_watcher is None:
+            self.clipboard_watcher = create_clipboard_watcher(self.config.get("clipboard_watcher", "auto"),
+                                                              clipboard=self.clipboard)
+        return self.clipboard_watcher
+    
+    def capture_primary_selection(self):
+        """
+        Liest den markierten Text direkt aus der X11-PRIMARY-Auswahl.
+        
+        Verwendet wird die Auswahl nur, wenn sie der Anwendung mit dem aktiven Fenster gehört
+        (sonst würde Text ersetzt, der woanders markiert ist) und ihr Zeitstempel (Zeitpunkt der
+        Besitzübernahme) sich seit der letzten Erfassung geändert hat; liefert der Besitzer keinen
+        Zeitstempel, muss sich der Text geändert haben. Sonst wird Ctrl+C verwendet.
+        
+        Returns:
+            str: Der markierte Text oder None (nicht verfügbar oder veraltet)
+        """
+        if not getattr(self.clipboard, "has_primary", False):
+            return None
+        if not selection_owned_by_active_window("PRIMARY"):
+            if self.debug:
+                self.debug.log("PRIMARY-Auswahl gehört nicht zum aktiven Fenster, verwende Ctrl+C")
+            return None
+        try:
+            text, timestamp = self.clipboard.read_selection("PRIMARY")
+        except Exception as e:
+            if self.debug:
+                self.debug.log("PRIMARY-Auswahl nicht lesbar, verwende Ctrl+C", f"Fehler: {e}", level="WARNING")
+            return None
+        if not text or not text.strip():
+            return None
+        last_text, last_timestamp = self.last_primary_capture
+        fresh = timestamp != last_timestamp if timestamp is not None else text != last_text
+        if not fresh:
+            if self.debug:
+                self.debug.log("PRIMARY-Auswahl veraltet, verwende Ctrl+C",
+                               f"Zeitstempel: {timestamp if timestamp is not None else '-'}")
+            return None
+        self.last_primary_capture = (text, timestamp)
+        return text
+    
+    def wait_for_hotkey_release(self, label):
+        """
+        Wartet, bis der Benutzer die Hotkey-Tasten losgelassen hat (statt einer festen Pause).
+        
+        Args:
+            label (str): Wartestelle für die Statistik ("ctrl_c", "backspace")
+        
+        Returns:
+            float: Gesparte Millisekunden gegenüber der bisherigen festen Wartezeit
+        """
+        waited, released = self.key_state.wait_for_release(self.hotkey_keys)
+        saved_ms = self.release_stats.record(label, waited, released)
+        self.request_release_savings.append((label, saved_ms))
+        if self.debug and not released:
+            self.debug.log("Hotkey-Tasten nicht losgelassen, fahre nach Timeout fort",
+                           f"Wartestelle: {label}, gewartet: {waited:.3f}s", level="WARNING")
+        return saved_ms
+    
+    def record_capture_latency(self, method, seconds):
+        """Zählt die Erfassungsdauer pro Methode (primary/keystroke) für den Vergleich im Debug-Log."""
+        count, total = self.capture_stats.get(method, (0, 0.0))
+        self.capture_stats[method] = (count + 1, total + seconds)
+    
+    def format_capture_stats(self):
+        """Formatiert die mittlere Erfassungsdauer pro Methode."""
+        return ", ".join(f"{method}: Ø {total / count * 1000:.1f} ms ({count}x)"
+                         for method, (count, total) in sorted(self.capture_stats.items()))
+    
     def process_selected_text(self):
         """Verarbeitet den markierten Text."""
         if self.is_processing:
@@ -453,12 +768,17 @@ class TextImproverApp:
         
         self.is_processing = True
         self.original_text = None
+        self.request_release_savings = []
         overall_start = time.time()
+        hotkey_at = time.monotonic()
         
         if self.debug:
             self.debug.log("=== Text-Verbesserung gestartet ===", level="INFO")
             self.debug.start_timer("overall_processing")
         
+        # True, sobald die weitere Verarbeitung an den API-Task/die Queue übergeben wurde
+        handed_off = False
+        
         try:
             if not HAS_PYPERCLIP:
                 messagebox.showerror("Fehler", "'pyperclip' fehlt.")
@@ -467,48 +787,53 @@ class TextImproverApp:
             try:
                 if self.debug:
                     self.debug.start_timer("text_selection")
-                
-                # Simuliere Ctrl+C um markierten Text zu kopieren
+                capture_start = time.monotonic()
                 keyboard_controller = keyboard.Controller()
                 
-                # Minimale Verzögerung für Stabilität
-                time.sleep(0.05)  # Reduziert von 0.1s auf 0.05s
-                
-                # Leere Clipboard temporär für zuverlässige Änderungserkennung
-                pyperclip.copy("")
-                time.sleep(0.02)  # Minimale Pause damit Clipboard geleert wird (reduziert von 0.05s)
+                # Zielanwendung bestimmt die Wartezeiten (gilt auch für das spätere Einfügen)
+                self.current_app = get_foreground_app()
                 
-                if self.debug:
-                    self.debug.log("Clipboard geleert", "Vor Copy-Befehl")
+                # X11: markierten Text direkt aus PRIMARY lesen (kein Ctrl+C, Zwischenablage bleibt unberührt)
+                selected_text = None
+                if self.config.get("capture_strategy", "keystroke") == "primary":
+                    selected_text = self.capture_primary_selection()
                 
-                # Sende Ctrl+C
-                keyboard_controller.press(keyboard.Key.ctrl)
-                keyboard_controller.press('c')
-                keyboard_controller.release('c')
-                keyboard_controller.release(keyboard.Key.ctrl)
-                
-                # Warte bis Clipboard nicht mehr leer ist (mit Timeout)
-                start_wait = time.time()
-                selected_text = ""
-                while time.time() - start_wait < 0.8:  # Max 0.8 Sekunden warten (reduziert von 1.0s)
-                    selected_text = pyperclip.paste()
+                if selected_text is not None:
+                    capture_method = "primary"
+                else:
+                    # Simuliere Ctrl+C um markierten Text zu kopieren, sobald die Hotkey-Tasten losgelassen sind
+                    self.wait_for_hotkey_release("ctrl_c")
+                    
+                    # Watcher merkt sich den Zustand der Zwischenablage (Polling-Variante leert sie)
+                    clipboard_watcher = self.get_clipboard_watcher()
+                    clipboard_watcher.arm()
+                    
+                    # Sende Ctrl+C
+                    keyboard_controller.press(keyboard.Key.ctrl)
+                    keyboard_controller.press('c')
+                    keyboard_controller.release('c')
+                    keyboard_controller.release(keyboard.Key.ctrl)
+                    
+                    # Warten, bis die Anwendung die Zwischenablage neu belegt hat, dann einmal lesen
+                    ctrl_c_sent = time.monotonic()
+                    selected_text = clipboard_watcher.capture(self.timing_profiles.capture_timeout(self.current_app))
                     if selected_text:
-                        break
-                    time.sleep(0.03)  # Reduziert von 0.05s auf 0.03s für schnellere Checks
+                        self.timing_profiles.record(self.current_app, "clipboard_ready", time.monotonic() - ctrl_c_sent)
+                    capture_method = "keystroke"
                 
-                # Falls nach 1 Sekunde immer noch leer, versuche es nochmal
-                if not selected_text:
-                    if self.debug:
-                        self.debug.log("Clipboard nach 1s leer, warte länger...", level="WARNING")
-                    time.sleep(0.3)
-                    selected_text = pyperclip.paste()
+                self.record_capture_latency(capture_method, time.monotonic() - capture_start)
                 
                 if self.debug:
                     text_selection_time = self.debug.end_timer("text_selection")
+                    method_details = (capture_method if capture_method == "primary"
+                                      else f"{capture_method} (Watcher: {clipboard_watcher.name})")
                     if text_selection_time is not None:
-                        self.debug.log("Text ausgewählt", f"Länge: {len(selected_text)} Zeichen, Dauer: {text_selection_time:.3f}s")
+                        self.debug.log("Text ausgewählt", f"Länge: {len(selected_text)} Zeichen, Dauer: {text_selection_time:.3f}s, "
+                                                          f"Methode: {method_details}")
                     else:
-                        self.debug.log("Text ausgewählt", f"Länge: {len(selected_text)} Zeichen")
+                        self.debug.log("Text ausgewählt", f"Länge: {len(selected_text)} Zeichen, Methode: {method_details}")
+                    self.debug.log("Erfassungs-Latenz", self.format_capture_stats())
+                    self.debug.log("Zeitprofil", self.timing_profiles.format_profile(self.current_app))
                 
                 if not selected_text or selected_text.strip() == "":
                     if self.tray_icon:
@@ -522,6 +847,43 @@ class TextImproverApp:
                     self.is_processing = False
                     return
                 
+                # Verbessere Text mit Gemini Streaming (verwende Einstellungen aus Config)
+                provider = self.provider
+                model = self.get_provider_model()
+                system_prompt = self.config.get("system_prompt")
+                
+                # Maskierung: URLs, Code, E-Mail-Adressen, Zahlen durch Platzhalter ersetzen (lokal wiederhergestellt)
+                masked = mask_text(selected_text) if self.config.get("masking_enabled", False) else None
+                request_text = masked.text if masked else selected_text
+                request_prompt = build_masked_prompt(system_prompt) if masked else system_prompt
+                
+                # Modell-Router: Modell aus Länge, Prompt und gemessener Latenz/Fehlerrate wählen (nur Gemini-Modelle)
+                if self.config.get("router_enabled", False) and isinstance(provider, GeminiProvider):
+                    model, route_reason = self.model_router.choose(request_text, request_prompt, model)
+                
+                # Größenprüfung vor dem Senden: Modell mit passendem Kontext, Einzel-Request oder Segmente
+                split_threshold = (int(self.config.get("long_text_threshold_tokens", 2000))
+                                   if self.config.get("long_text_mode", True) else None)
+                # Ausweichmodelle nur bei Gemini (andere Backends kennen die Gemini-Modelle nicht)
+                plan = self.token_estimator.plan_request(request_text, request_prompt, model,
+                                                         split_threshold=split_threshold,
+                                                         candidates=None if isinstance(provider, GeminiProvider) else [model])
+                model = plan["model"]
+                long_text_mode = plan["split"]
+                
+                # Zu großer Text: vor dem Löschen abbrechen, die Markierung bleibt erhalten
+                if not plan["fits"]:
+                    if self.tray_icon:
+                        try:
+                            self.tray_icon.notify("Markierter Text ist zu lang", "Quick Text Improver")
+                        except:
+                            pass
+                    if self.debug:
+                        self.debug.log("Text zu lang", plan["reason"], level="WARNING")
+                    debug_print(f"Markierter Text ist zu lang: {plan['reason']}")
+                    self.is_processing = False
+                    return
+                
                 # Speichere ursprünglichen Text für möglichen Abbruch
                 self.original_text = selected_text
                 
@@ -538,13 +900,13 @@ class TextImproverApp:
                     self.debug.start_timer("text_deletion")
                 
                 # Lösche markierten Text (einmaliges Backspace, da Text noch markiert ist)
-                # Minimale Wartezeit vor dem Löschen
-                time.sleep(0.05)  # Reduziert von 0.1s auf 0.05s
+                # Erst wenn keine Hotkey-Taste mehr gedrückt ist (sonst z.B. Ctrl+Backspace = Wort löschen)
+                self.wait_for_hotkey_release("backspace")
                 # Drücke Backspace einmal, um die Markierung zu löschen
                 keyboard_controller.press(keyboard.Key.backspace)
                 keyboard_controller.release(keyboard.Key.backspace)
-                # Minimale Pause, damit die App reagieren kann
-                time.sleep(0.03)  # Reduziert von 0.05s auf 0.03s
+                # Pause, damit die App reagieren kann (aus dem Zeitprofil der Anwendung)
+                time.sleep(self.timing_profiles.key_wait(self.current_app, "after_backspace"))
                 
                 if self.debug:
                     deletion_time = self.debug.end_timer("text_deletion")
@@ -552,31 +914,127 @@ class TextImproverApp:
                         self.debug.log("Text gelöscht", f"Dauer: {deletion_time:.3f}s")
                     else:
                         self.debug.log("Text gelöscht")
+                    savings = ", ".join(f"{label}: {saved_ms:+.1f} ms" for label, saved_ms in self.request_release_savings)
+                    self.debug.log("Gesparte Wartezeit (Hotkey-Tasten losgelassen)",
+                                   f"Diese Anfrage: {savings}; Histogramm: {self.release_stats.format_histogram()}")
                 
-                # Verbessere Text mit Gemini Streaming (verwende Einstellungen aus Config)
-                api_key = self.config.get("gemini_api_key")
-                model = self.config.get("gemini_model")
-                system_prompt = self.config.get("system_prompt")
+                if self.debug:
+                    self.debug.log("API-Parameter", f"Modell: {model}, Prompt-Länge: {len(request_prompt)} Zeichen")
+                    if masked:
+                        self.debug.log("Maskierung", masked.summary(
+                            lambda chars: self.adaptive_timeout.estimate(model, chars)))
+                
+                # Frist für diesen Request; Nachrichten älterer Requests werden ab jetzt verworfen
+                if self.current_deadline:
+                    self.current_deadline.cancel()
+                deadline = self.adaptive_timeout.new_deadline(model, len(request_text), plan["output_chars"])
+                request_id = deadline.request_id
+                self.current_deadline = deadline
+                self.current_request_id = request_id
+                
+                # Cache-Treffer: direkt zum Einfügen, kein Netzwerkaufruf. Ergebnisse des Diff-Modus
+                # (nur Einzel-Requests) liegen unter eigenem Schlüssel
+                edit_mode = self.config.get("edit_mode", False) and not long_text_mode
+                cache_prompt = build_edit_prompt(system_prompt) if edit_mode else system_prompt
+                if self.response_cache:
+                    cached_text = self.response_cache.get(model, cache_prompt, selected_text)
+                    if cached_text:
+                        if self.debug:
+                            self.debug.end_timer("overall_processing")
+                            self.debug.log("Antwort aus Cache", f"Output: {len(cached_text)} Zeichen")
+                        self.message_queue.put(("success", {
+                            "request_id": request_id,
+                            "improved_text": cached_text,
+                            "chunk_count": 0
+                        }))
+                        handed_off = True
+                        return
+                
+                # Absatz-Speicher: bekannte Absätze übernehmen, nur geänderte senden. Nur für Texte, die
+                # ohnehin in Segmenten verarbeitet werden; kürzere behalten den Zusammenhang über Absätze
+                # hinweg sowie Diff-Modus, Hedging und Einfügen während des Streams
+                memo_plan = None
+                if self.paragraph_memo and long_text_mode:
+                    memo_plan = self.paragraph_memo.plan(model, system_prompt, request_text,
+                                                         unmask=masked.restore if masked else None)
+                    if memo_plan:
+                        if self.debug:
+                            ratio = memo_plan["hits"] / memo_plan["total"] * 100
+                            self.debug.log("Absatz-Speicher",
+                                           f"{memo_plan['hits']}/{memo_plan['total']} Absätze übernommen ({ratio:.0f}%), "
+                                           f"{memo_plan['total'] - memo_plan['hits']} werden gesendet, "
+                                           f"~{memo_plan['saved_tokens']} Tokens gespart; gesamt: "
+                                           f"{self.paragraph_memo.format_stats()}")
+                
+                # Token-Schätzer im Hintergrund gegen count_tokens kalibrieren (nur bis genug Messwerte vorliegen)
+                if provider.supports_token_count and self.token_estimator.needs_calibration(model, request_text):
+                    self.token_estimator.calibrate_in_background(
+                        model, request_text,
+                        lambda text, model=model: provider.count_tokens(text, model)
+                    )
+                
+                # Langtext-Modus: Segmente parallel verbessern, fertige Segmente sofort in Reihenfolge einfügen.
+                # Nicht bei Maskierung: erst die vollständige Antwort zeigt, ob alle Platzhalter erhalten sind
+                segment_queue = None
+                segment_insert_thread = None
+                if long_text_mode and self.config.get("auto_insert_text", True) and not masked:
+                    segment_queue = queue.Queue()
+                    
+                    def segment_insert_worker():
+                        first_segment = True
+                        while True:
+                            segment = segment_queue.get()
+                            if segment is None:
+                                break
+                            if request_id != self.current_request_id:
+                                # Veralteter Request - nichts mehr einfügen
+                                continue
+                            if first_segment:
+                                # Kurze Pause, damit die Anwendung bereit ist
+                                time.sleep(self.timing_profiles.key_wait(self.current_app, "app_ready"))
+                                first_segment = False
+                            self.insert_text(segment)
+                    
+                    segment_insert_thread = threading.Thread(target=segment_insert_worker, daemon=True)
+                    segment_insert_thread.start()
+                
+                # Einzel-Request: festgeschriebene Präfixe schon während des Streams einfügen (nicht bei Maskierung, s.o.)
+                stream_inserter = None
+                if (not long_text_mode and self.config.get("auto_insert_text", True)
+                        and self.config.get("stream_insert_enabled", False) and not masked):
+                    stream_inserter = StreamInserter(
+                        self.insert_text,
+                        source_text=request_text,
+                        started_at=hotkey_at,
+                        is_current=lambda: request_id == self.current_request_id
+                    )
                 
                 if self.debug:
-                    self.debug.log("API-Parameter", f"Modell: {model}, Prompt-Länge: {len(system_prompt)} Zeichen")
+                    if long_text_mode:
+                        self.debug.log("Langtext-Modus aktiv", plan["reason"])
                     self.debug.start_timer("api_call")
                     self.debug.start_timer("first_chunk")
                 
-                # Callback für jeden Chunk - sammle Text (wird am Ende mit Typing-Effekt eingefügt)
-                accumulated_text = ""
+                # Callback für jeden Chunk - sammle Text (und reiche ihn ggf. an das Stream-Einfügen weiter)
+                accumulated_parts = []
+                accumulated_chars = 0
                 chunk_count = 0
                 first_chunk_received = False
+                first_chunk_at = None
                 
                 def on_chunk_received(chunk_text):
                     """Wird für jeden Text-Chunk aufgerufen (im API-Thread)."""
-                    nonlocal accumulated_text, chunk_count, first_chunk_received
+                    nonlocal accumulated_chars, chunk_count, first_chunk_received, first_chunk_at
                     
-                    accumulated_text += chunk_text
+                    accumulated_parts.append(chunk_text)
+                    accumulated_chars += len(chunk_text)
                     chunk_count += 1
+                    if stream_inserter:
+                        stream_inserter.feed(chunk_text)
                     
                     if not first_chunk_received:
                         first_chunk_received = True
+                        first_chunk_at = time.monotonic()
                         if self.debug:
                             first_chunk_time = self.debug.end_timer("first_chunk")
                             if first_chunk_time is not None:
@@ -585,30 +1043,153 @@ class TextImproverApp:
                                 self.debug.log("Erster Chunk erhalten")
                     
                     if self.debug and chunk_count % 5 == 0:
-                        self.debug.log(f"Chunk {chunk_count} erhalten", f"Akkumulierte Länge: {len(accumulated_text)} Zeichen")
+                        self.debug.log(f"Chunk {chunk_count} erhalten", f"Akkumulierte Länge: {accumulated_chars} Zeichen")
                 
-                # Starte Streaming in separatem Thread
+                # Starte Streaming als Task auf dem gemeinsamen Event Loop (kein Thread pro Request)
                 improved_text = None
                 error_occurred = False
-                stream_thread_obj = None
-                stream_start_time = time.time()
-                stream_timeout = 120  # 2 Minuten Timeout
+                masking_failed = False
+                answer_model = model  # Beim Hedge ggf. das Fallback-Modell
+                
+                def on_hedge_winner(winner_model):
+                    nonlocal answer_model
+                    answer_model = winner_model
                 
-                def stream_thread():
-                    nonlocal improved_text, error_occurred
+                async def stream_task():
+                    nonlocal improved_text, error_occurred, masking_failed
                     # chunk_count wird in on_chunk_received aktualisiert und ist dort verfügbar
                     try:
                         if self.debug:
-                            self.debug.log("Starte API-Aufruf im Thread", f"Text-Länge: {len(selected_text)} Zeichen")
+                            self.debug.log("Starte API-Aufruf (async)", f"Text-Länge: {len(request_text)} Zeichen, {deadline}")
                             self.debug.start_timer("api_call")
+                        api_start = time.monotonic()
+                        
+                        if long_text_mode:
+                            api_coro = provider.improve_long_text_async(
+                                request_text,
+                                model,
+                                request_prompt,
+                                on_chunk_received,
+                                max_chunk_tokens=int(self.config.get("long_text_chunk_tokens", 1200)),
+                                max_concurrency=int(self.config.get("long_text_max_concurrency", 4)),
+                                on_segment_callback=(lambda index, segment: segment_queue.put(segment))
+                                if segment_queue else None,
+                                deadline=deadline,
+                                segments=memo_plan["segments"] if memo_plan else None,
+                                known_segments=memo_plan["known"] if memo_plan else None
+                            )
+                        elif edit_mode:
+                            # Diff-Modus: nur eine Änderungsliste anfordern und lokal anwenden,
+                            # bei ungültiger Liste vollständigen Text anfordern
+                            async def edit_or_full_text():
+                                edited_text = await improve_with_edits_async(provider, request_text, model,
+                                                                             request_prompt, deadline=deadline)
+                                if edited_text is not None:
+                                    return edited_text
+                                return await provider.improve_async(request_text, model, request_prompt,
+                                                                    on_chunk_received, deadline=deadline)
+                            
+                            api_coro = edit_or_full_text()
+                        elif self.config.get("hedge_enabled", False):
+                            # Hedge: bei spätem ersten Chunk zusätzlich das Fallback-Modell anfragen
+                            api_coro = provider.improve_hedged_async(
+                                request_text,
+                                model,
+                                request_prompt,
+                                on_chunk_received,
+                                deadline=deadline,
+                                fallback_model=self.config.get("hedge_fallback_model"),
+                                hedge_threshold=float(self.config.get("hedge_threshold", 0) or 0),
+                                on_winner=on_hedge_winner
+                            )
+                        else:
+                            api_coro = provider.improve_async(
+                                request_text,
+                                model,
+                                request_prompt,
+                                on_chunk_received,
+                                deadline=deadline
+                            )
+                        
+                        if masked:
+                            # Fehlt ein Platzhalter, würde der maskierte Abschnitt (URL, Code, Zahl) stillschweigend
+                            # aus dem Text verschwinden: Antwort verwerfen und ohne Maskierung wiederholen
+                            masked_coro = api_coro
+                            
+                            async def masked_or_unmasked_text():
+                                nonlocal masking_failed
+                                masked_text = await masked_coro
+                                if not masked_text or not log_missing(masked, masked_text):
+                                    return masked_text
+                                masking_failed = True
+                                if self.debug:
+                                    self.debug.log("Maskierung: Antwort verworfen, wiederhole ohne Maskierung",
+                                                   level="WARNING")
+                                if long_text_mode:
+                                    return await provider.improve_long_text_async(
+                                        selected_text,
+                                        model,
+                                        system_prompt,
+                                        max_chunk_tokens=int(self.config.get("long_text_chunk_tokens", 1200)),
+                                        max_concurrency=int(self.config.get("long_text_max_concurrency", 4)),
+                                        deadline=deadline
+                                    )
+                                return await provider.improve_async(selected_text, model, system_prompt,
+                                                                    deadline=deadline)
+                            
+                            api_coro = masked_or_unmasked_text()
+                        
+                        # Die Deadline wird im Provider als Request- und Stream-Timeout durchgesetzt
+                        try:
+                            improved_text = await api_coro
+                        except DeadlineExceeded as e:
+                            self.model_router.record(model, False)
+                            error_msg = f"API-Aufruf hat zu lange gedauert (Timeout nach {deadline.timeout:.0f} Sekunden)."
+                            if self.debug:
+                                self.debug.log("API-Timeout", f"{error_msg} {e}", level="ERROR")
+                            debug_print(error_msg)
+                            if segment_queue:
+                                segment_queue.put(None)
+                            if stream_inserter:
+                                stream_inserter.cancel()
+                            self.message_queue.put(("error", {
+                                "request_id": request_id,
+                                "message": error_msg,
+                                "detailed": error_msg
+                            }))
+                            return
+                        
+                        self.model_router.record(model, bool(improved_text))
+                        response_text = improved_text
+                        if self.debug:
+                            self.debug.log("Provider-Metriken", provider.format_metrics())
                         
-                        improved_text = improve_text_with_gemini_stream(
-                            selected_text,
-                            api_key,
-                            model,
-                            system_prompt,
-                            on_chunk_received
-                        )
+                        # Durchsatz lernen (nur Einzel-Requests, parallele Segmente verfälschen die Messung)
+                        if improved_text and not long_text_mode and first_chunk_at is not None:
+                            self.adaptive_timeout.record(model, first_chunk_at - api_start, len(improved_text),
+                                                         time.monotonic() - api_start)
+                        
+                        # Segment-Einfügen beenden und abwarten (ohne den Loop zu blockieren)
+                        if segment_queue:
+                            segment_queue.put(None)
+                            await asyncio.get_running_loop().run_in_executor(None, segment_insert_thread.join)
+                        
+                        # Platzhalter wiederherstellen (nach einer Wiederholung ohne Maskierung gibt es keine)
+                        if masked and improved_text and not masking_failed:
+                            improved_text = masked.restore(improved_text)
+                        
+                        # Stream-Einfügen: Rest (zurückgehaltener Schwanz) einfügen bzw. bei Fehler abbrechen
+                        if stream_inserter:
+                            if improved_text:
+                                stream_inserter.finish(improved_text)
+                            else:
+                                stream_inserter.cancel()
+                            await asyncio.get_running_loop().run_in_executor(None, stream_inserter.join)
+                            if improved_text:
+                                # Eingefügt wurde der inkrementell bereinigte Text
+                                improved_text = stream_inserter.text
+                            if self.debug:
+                                self.debug.log("Stream-Einfügen", stream_inserter.summary())
                         
                         # Hole chunk_count aus dem Closure (wird in on_chunk_received aktualisiert)
                         final_chunk_count = chunk_count
@@ -631,6 +1212,7 @@ class TextImproverApp:
                             if self.debug:
                                 detailed_msg += f"\n\nDebug-Info:\n- Fehler aufgetreten: {error_occurred}\n- Text erhalten: {improved_text is not None}\n- Chunks empfangen: {final_chunk_count}"
                             self.message_queue.put(("error", {
+                                "request_id": request_id,
                                 "message": error_msg,
                                 "detailed": detailed_msg
                             }))
@@ -646,62 +1228,58 @@ class TextImproverApp:
                                                  f"Input: {len(selected_text)} Zeichen, Output: {len(improved_text)} Zeichen, {final_chunk_count} Chunks")
                                 self.debug.log("=== Text-Verbesserung abgeschlossen ===", level="INFO")
                             
+                            # Gespeichert unter dem Modell, das die Antwort geliefert hat; nicht nach verworfener
+                            # maskierter Antwort (der Absatz-Speicher lernt dann ebenfalls nicht)
+                            if self.response_cache and not masking_failed:
+                                self.response_cache.put(answer_model, cache_prompt, selected_text, improved_text)
+                            if self.paragraph_memo and not masking_failed:
+                                self.paragraph_memo.remember(model, system_prompt, request_text, response_text,
+                                                             unmask=masked.restore if masked else None)
+                            
                             debug_print(f"Verbesserter Text vollständig: {improved_text[:100]}...")
-                            self.message_queue.put(("success", {
-                                "improved_text": improved_text,
-                                "chunk_count": final_chunk_count
-                            }))
+                            if segment_queue or stream_inserter:
+                                # Segmente bzw. Stream wurden bereits eingefügt
+                                self.message_queue.put(("insert_complete", {"request_id": request_id}))
+                            else:
+                                self.message_queue.put(("success", {
+                                    "request_id": request_id,
+                                    "improved_text": improved_text,
+                                    "chunk_count": final_chunk_count
+                                }))
+                    except asyncio.CancelledError:
+                        # Abbruch (z.B. beim Beenden) - HTTP-Stream wurde bereits geschlossen
+                        if segment_queue:
+                            segment_queue.put(None)
+                        if stream_inserter:
+                            stream_inserter.cancel()
+                        if self.debug:
+                            self.debug.log("API-Task abgebrochen", level="WARNING")
+                        raise
                     except Exception as e:
+                        if segment_queue:
+                            segment_queue.put(None)
+                        if stream_inserter:
+                            stream_inserter.cancel()
                         error_occurred = True
+                        self.model_router.record(model, False)
                         if self.debug:
-                            self.debug.log_exception("Fehler im Streaming-Thread", e)
-                        debug_print(f"Fehler im Streaming-Thread: {e}")
+                            self.debug.log_exception("Fehler im Streaming-Task", e)
+                        debug_print(f"Fehler im Streaming-Task: {e}")
                         traceback.print_exc()
                         error_msg = f"Fehler beim Verbessern des Textes:\n{e}"
                         self.message_queue.put(("error", {
+                            "request_id": request_id,
                             "message": error_msg,
                             "detailed": error_msg
                         }))
                 
-                stream_thread_obj = threading.Thread(target=stream_thread, daemon=True)
-                self.stream_thread_obj = stream_thread_obj  # Speichere Referenz
-                stream_thread_obj.start()
-                
-                # Polling statt join() - prüfe Thread-Status ohne GUI zu blockieren
-                def check_stream_thread():
-                    nonlocal improved_text, error_occurred
-                    
-                    if stream_thread_obj is None:
-                        return
-                    
-                    if not stream_thread_obj.is_alive():
-                        # Thread ist fertig, Queue wird die Nachricht verarbeiten
-                        return
-                    
-                    # Prüfe Timeout
-                    elapsed = time.time() - stream_start_time
-                    if elapsed > stream_timeout:
-                        error_msg = "API-Aufruf hat zu lange gedauert (Timeout nach 2 Minuten)."
-                        if self.debug:
-                            self.debug.log("API-Timeout", error_msg, level="ERROR")
-                        debug_print(error_msg)
-                        error_occurred = True
-                        improved_text = None
-                        self.message_queue.put(("error", {
-                            "message": error_msg,
-                            "detailed": error_msg
-                        }))
-                        return
-                    
-                    # Prüfe erneut in 500ms
-                    self.root.after(500, check_stream_thread)
-                
-                # Starte Polling
-                self.root.after(500, check_stream_thread)
+                # Speichere Referenz, damit der Task abgebrochen werden kann
+                self.stream_future = self.async_runtime.submit(stream_task())
+                handed_off = True
                 
                 # Die Verarbeitung wird jetzt über die Queue abgewickelt
                 # Die Funktion kehrt hier zurück, damit die GUI nicht blockiert wird
-                # check_stream_thread() und process_queue() übernehmen die weitere Verarbeitung
+                # stream_task() und process_queue() übernehmen die weitere Verarbeitung
                 return
                 
             except Exception as e:
@@ -715,8 +1293,9 @@ class TextImproverApp:
                         pass
                 messagebox.showerror("Fehler", error_msg)
             finally:
-                # Flags zurücksetzen
-                self.is_processing = False
+                # Flags zurücksetzen (außer der API-Task/die Queue übernimmt das)
+                if not handed_off:
+                    self.is_processing = False
         
         except Exception as e:
             debug_print(f"Unerwarteter Fehler: {e}")
@@ -724,6 +1303,13 @@ class TextImproverApp:
             # Flags zurücksetzen
             self.is_processing = False
     
+    def insert_text(self, text):
+        """Fügt Text gemäß eingestellter Methode ein (Typing-Effekt oder Clipboard)."""
+        if self.config.get("text_insert_method", "typed") == "clipboard":
+            self.insert_text_via_clipboard(text)
+        else:
+            self.type_text_with_effect(text, delay_per_char=0.0002)
+    
     def type_text_with_effect(self, text, delay_per_char=0.0002):
         """
         Fügt Text mit einem Typing-Effekt ein (Zeichen für Zeichen).
@@ -801,12 +1387,17 @@ class TextImproverApp:
             self.debug.log("Starte Text-Einfügen via Clipboard", f"Text-Länge: {len(text)} Zeichen")
         
         try:
-            # Kopiere Text in Zwischenablage
-            pyperclip.copy(text)
-            time.sleep(0.05)  # Kurze Pause damit Clipboard aktualisiert wird
+            # Kopiere Text in Zwischenablage; das Abholen durch die Anwendung ist nur beobachtbar,
+            # wenn der Tk-Thread frei ist (sonst blockiert das Warten genau diese Auslieferung)
+            app = self.current_app
+            pasted = threading.Event()
+            track_paste = self.clipboard.tracks_requests and threading.current_thread() is not threading.main_thread()
+            self.clipboard.copy(text, on_request=pasted.set if track_paste else None)
+            # Pause, bis die Zwischenablage aktualisiert ist (Tk besitzt sie sofort, xclip erst im Prozess)
+            time.sleep(self.clipboard.settle_delay)
             
             # Kurze Wartezeit, damit die Anwendung bereit ist
-            time.sleep(0.1)
+            time.sleep(self.timing_profiles.key_wait(app, "app_ready"))
             
             # Füge mit Ctrl+V ein
             keyboard_controller = keyboard.Controller()
@@ -814,7 +1405,11 @@ class TextImproverApp:
             keyboard_controller.press('v')
             keyboard_controller.release('v')
             keyboard_controller.release(keyboard.Key.ctrl)
-            time.sleep(0.05)  # Minimale Pause nach dem Einfügen
+            paste_sent = time.monotonic()
+            
+            # Pause nach dem Einfügen aus dem Zeitprofil; endet früher, sobald die Anwendung den Inhalt abholt
+            if pasted.wait(self.timing_profiles.paste_wait(app, observable=track_paste)):
+                self.timing_profiles.record(app, "paste_ready", time.monotonic() - paste_sent)
             
             if self.debug:
                 insert_time = time.time() - insert_start
@@ -841,7 +1436,7 @@ class TextImproverApp:
             self.debug.log("Kopiere Text in Zwischenablage", f"Text-Länge: {len(text)} Zeichen")
         
         try:
-            pyperclip.copy(text)
+            self.clipboard.copy(text)
             if self.debug:
                 self.debug.log("Text erfolgreich in Zwischenablage kopiert")
         except Exception as e:
@@ -858,6 +1453,16 @@ class TextImproverApp:
                 try:
                     msg_type, content = self.message_queue.get_nowait()
                     
+                    # Verwerfe Ergebnisse veralteter Requests (z.B. nach Timeout oder neuem Hotkey)
+                    msg_request_id = content.get("request_id") if isinstance(content, dict) else None
+                    if msg_request_id is not None and msg_request_id != self.current_request_id:
+                        if self.debug:
+                            self.debug.log("Veraltete Nachricht verworfen",
+                                           f"Typ: {msg_type}, Request {msg_request_id} (aktuell: {self.current_request_id})",
+                                           level="WARNING")
+                        self.message_queue.task_done()
+                        continue
+                    
                     if msg_type == "error":
                         # Fehler aufgetreten
                         error_msg = content.get("message", "Unbekannter Fehler")
@@ -869,6 +1474,7 @@ class TextImproverApp:
                         # Erfolgreich abgeschlossen - verarbeite Text basierend auf Einstellungen
                         improved_text = content.get("improved_text", "")
                         chunk_count = content.get("chunk_count", 0)
+                        request_id = content.get("request_id")
                         
                         if improved_text:
                             # Hole Einstellungen
@@ -877,47 +1483,47 @@ class TextImproverApp:
                             
                             if not auto_insert:
                                 # Nur in Zwischenablage kopieren, nicht einfügen
-                                def copy_thread():
+                                def copy_thread(request_id=request_id):
                                     try:
                                         self.copy_text_to_clipboard(improved_text)
-                                        self.message_queue.put(("insert_complete", {}))
+                                        self.message_queue.put(("insert_complete", {"request_id": request_id}))
                                     except Exception as e:
                                         if self.debug:
                                             self.debug.log_exception("Fehler im Copy-Thread", e)
                                         debug_print(f"Fehler im Copy-Thread: {e}")
-                                        self.message_queue.put(("insert_complete", {}))
+                                        self.message_queue.put(("insert_complete", {"request_id": request_id}))
                                 
                                 copy_thread_obj = threading.Thread(target=copy_thread, daemon=True)
                                 copy_thread_obj.start()
                             elif insert_method == "clipboard":
                                 # Über Clipboard einfügen
-                                def clipboard_thread():
+                                def clipboard_thread(request_id=request_id):
                                     try:
                                         # Kurze Pause, damit die Anwendung bereit ist
-                                        time.sleep(0.1)
+                                        time.sleep(self.timing_profiles.key_wait(self.current_app, "app_ready"))
                                         self.insert_text_via_clipboard(improved_text)
-                                        self.message_queue.put(("insert_complete", {}))
+                                        self.message_queue.put(("insert_complete", {"request_id": request_id}))
                                     except Exception as e:
                                         if self.debug:
                                             self.debug.log_exception("Fehler im Clipboard-Thread", e)
                                         debug_print(f"Fehler im Clipboard-Thread: {e}")
-                                        self.message_queue.put(("insert_complete", {}))
+                                        self.message_queue.put(("insert_complete", {"request_id": request_id}))
                                 
                                 clipboard_thread_obj = threading.Thread(target=clipboard_thread, daemon=True)
                                 clipboard_thread_obj.start()
                             else:
                                 # Standard: Mit Typing-Effekt einfügen
-                                def typing_thread():
+                                def typing_thread(request_id=request_id):
                                     try:
                                         # Kurze Pause, damit die Anwendung bereit ist
-                                        time.sleep(0.1)
+                                        time.sleep(self.timing_profiles.key_wait(self.current_app, "app_ready"))
                                         self.type_text_with_effect(improved_text, delay_per_char=0.0002)
-                                        self.message_queue.put(("insert_complete", {}))
+                                        self.message_queue.put(("insert_complete", {"request_id": request_id}))
                                     except Exception as e:
                                         if self.debug:
                                             self.debug.log_exception("Fehler im Typing-Thread", e)
                                         debug_print(f"Fehler im Typing-Thread: {e}")
-                                        self.message_queue.put(("insert_complete", {}))
+                                        self.message_queue.put(("insert_complete", {"request_id": request_id}))
                                 
                                 typing_thread_obj = threading.Thread(target=typing_thread, daemon=True)
                                 typing_thread_obj.start()
@@ -990,6 +1596,19 @@ class TextImproverApp:
         
         self.stop_hotkey_listener()
         
+        # Laufenden API-Task abbrechen und Event Loop stoppen
+        if self.stream_future and not self.stream_future.done():
+            self.stream_future.cancel()
+        self.provider.close()
+        self.async_runtime.stop()
+        if self.clipboard_watcher:
+            self.clipboard_watcher.close()
+        if self.paragraph_memo:
+            self.paragraph_memo.flush()
+        self.timing_profiles.flush()
+        if self.response_cache:
+            self.response_cache.flush()
+        
         # Schließe Debug-Fenster falls offen
         if self.debug_window_instance and self.debug_window_instance.winfo_exists():
             try:
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+
+from config import AVAILABLE_MODELS
+from text_chunker import estimate_tokens
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+TIER_LITE = 0
+TIER_FLASH = 1
+TIER_PRO = 2
+TIER_NAMES = {TIER_LITE: "lite", TIER_FLASH: "flash", TIER_PRO: "pro"}
+
+RESULT_WINDOW = 20        # Anzahl berücksichtigter Ergebnisse pro Modell
+MAX_ERROR_RATE = 0.5      # Modelle mit höherer Fehlerrate werden gemieden
+MIN_ERROR_SAMPLES = 3     # Erst ab so vielen Ergebnissen zählt die Fehlerrate
+
+
+def model_tier(model):
+    """Leitet die Leistungsklasse eines Modells aus dem Namen ab."""
+    name = model.lower()
+    if "lite" in name:
+        return TIER_LITE
+    if "pro" in name:
+        return TIER_PRO
+    return TIER_FLASH
+
+
+class ModelRouter:
+    """
+    Wählt das Modell pro Request aus dem Kandidaten-Pool.
+
+    Kurze Texte bevorzugen ein Lite-Modell, lange ein Pro-Modell, alles dazwischen Flash.
+    Von dieser Präferenz ausgehend wird das erste Modell genommen, dessen erwartete Latenz
+    (aus AdaptiveTimeout) das SLO einhält und dessen Fehlerrate im gleitenden Fenster
+    akzeptabel ist. Hält keines das SLO ein, gewinnt das schnellste.
+    """
+
+    def __init__(self, latency_estimator, candidates=None, latency_slo=8.0,
+                 short_tokens=150, long_tokens=1500):
+        self.latency_estimator = latency_estimator
+        self.candidates = tuple(candidates) if candidates else AVAILABLE_MODELS
+        self.latency_slo = float(latency_slo)
+        self.short_tokens = int(short_tokens)
+        self.long_tokens = int(long_tokens)
+        self._results = {}  # model -> deque[bool] (True = Erfolg)
+        self._lock = threading.Lock()
+
+    def record(self, model, success):
+        """Nimmt das Ergebnis eines Requests in die gleitende Fehlerstatistik auf."""
+        with self._lock:
+            self._results.setdefault(model, collections.deque(maxlen=RESULT_WINDOW)).append(bool(success))
+
+    def error_rate(self, model):
+        """Fehlerrate im gleitenden Fenster (0.0 bei zu wenigen Ergebnissen)."""
+        with self._lock:
+            results = self._results.get(model)
+            if not results or len(results) < MIN_ERROR_SAMPLES:
+                return 0.0
+            return results.count(False) / len(results)
+
+    def preferred_tier(self, input_tokens):
+        if input_tokens <= self.short_tokens:
+            return TIER_LITE
+        if input_tokens >= self.long_tokens:
+            return TIER_PRO
+        return TIER_FLASH
+
+    def choose(self, text, system_prompt, default_model):
+        """
+        Wählt das Modell für einen Request.
+
+        Args:
+            text (str): Der zu verbessernde Text
+            system_prompt (str): Der System Prompt (zählt zur Eingabelänge)
+            default_model (str): Fallback, falls der Pool leer ist
+
+        Returns:
+            tuple: (modell, begründung)
+        """
+        if not self.candidates:
+            return default_model, "Kein Kandidaten-Pool, verwende Standardmodell"
+
+        input_tokens = estimate_tokens(system_prompt) + estimate_tokens(text)
+        tier = self.preferred_tier(input_tokens)
+
+        # Kandidaten nach Nähe zur bevorzugten Klasse; bei Gleichstand zählt die Pool-Reihenfolge,
+        # das eingestellte Standardmodell wird innerhalb seiner Klasse vorgezogen
+        ranked = sorted(
+            self.candidates,
+            key=lambda m: (abs(model_tier(m) - tier), m != default_model, self.candidates.index(m))
+        )
+
+        estimates = {}
+        for model in ranked:
+            estimates[model] = self.latency_estimator.estimate(model, len(text))
+            error_rate = self.error_rate(model)
+            if error_rate > MAX_ERROR_RATE:
+                continue
+            if estimates[model] <= self.latency_slo:
+                reason = (f"~{input_tokens} Tokens -> bevorzugt {TIER_NAMES[tier]}, "
+                          f"erwartet {estimates[model]:.1f}s <= SLO {self.latency_slo:.1f}s, "
+                          f"Fehlerrate {error_rate:.0%}")
+                return self._log(model, reason)
+
+        healthy = [m for m in ranked if self.error_rate(m) <= MAX_ERROR_RATE] or ranked
+        fastest = min(healthy, key=lambda m: estimates[m])
+        reason = (f"~{input_tokens} Tokens, kein Modell hält SLO {self.latency_slo:.1f}s ein -> "
+                  f"schnellstes: erwartet {estimates[fastest]:.1f}s")
+        return self._log(fastest, reason)
+
+    def _log(self, model, reason):
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Modell-Router", f"Gewählt: {model} | {reason}")
+        return model, reason
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from config import get_appdata_path
+from text_chunker import estimate_tokens, split_paragraphs
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+MEMO_FILE_NAME = "paragraph_memo.json"
+MEMO_VERSION = 1
+SAVE_DELAY = 2.0  # Sekunden; mehrere remember() kurz hintereinander ergeben einen Schreibvorgang
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_paragraph(paragraph):
+    """Vereinheitlicht Leerraum, damit reine Umbruch-/Einrückungsänderungen denselben Schlüssel ergeben."""
+    return _WHITESPACE_RE.sub(" ", paragraph).strip()
+
+
+class ParagraphMemo:
+    """
+    Merkt sich verbesserte Absätze, um bei erneutem Aufruf nur geänderte Absätze zu senden.
+
+    Schlüssel ist ein SHA-256 über (Modell, System Prompt, normalisierter Absatz). Die Einträge
+    liegen in einem LRU (begrenzt auf max_entries) und werden als eine JSON-Datei im
+    AppData-Verzeichnis gespeichert. Geschrieben wird verzögert in einem Timer-Thread (nicht im
+    Aufrufer, der z.B. auf dem gemeinsamen Event Loop läuft); flush() schreibt sofort.
+    """
+
+    def __init__(self, path=None, max_entries=2000, save_delay=SAVE_DELAY):
+        self.path = path or get_appdata_path(MEMO_FILE_NAME)
+        self.max_entries = max(1, int(max_entries))
+        self.save_delay = save_delay
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "saved_tokens": 0}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Hält Schnappschuss und Schreiben zusammen (Reihenfolge)
+        self._entries = OrderedDict()  # key -> (created, improved_paragraph)
+        self._dirty = False
+        self._timer = None
+        self._load()
+
+    @staticmethod
+    def make_key(model, system_prompt, paragraph):
+        """Erstellt den Schlüssel (SHA-256 Hex) für einen Absatz."""
+        payload = json.dumps([model, system_prompt, normalize_paragraph(paragraph)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def plan(self, model, system_prompt, text, unmask=None):
+        """
+        Teilt den Text in Absätze und sucht die bereits verbesserten heraus.
+
+        Args:
+            model (str): Das Modell
+            system_prompt (str): Der System Prompt (ohne Zusätze wie Maskierungs-Hinweise)
+            text (str): Der zu sendende Text
+            unmask (callable): Optional, liefert den Originalabsatz zu einem maskierten Absatz
+                (Schlüssel und gespeicherte Absätze beziehen sich auf den Originaltext)
+
+        Returns:
+            dict: "segments" (Liste von (absatz, trenner)), "known" (Index -> verbesserter Absatz),
+                  "hits", "total", "saved_tokens" - oder None, wenn kein Absatz bekannt ist
+        """
+        segments = split_paragraphs(text)
+        if len(segments) < 2:
+            return None
+        known = {}
+        saved_tokens = 0
+        total = 0
+        with self._lock:
+            for index, (paragraph, _) in enumerate(segments):
+                if not paragraph.strip():
+                    continue
+                total += 1
+                original = unmask(paragraph) if unmask else paragraph
+                key = self.make_key(model, system_prompt, original)
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                self._entries.move_to_end(key)
+                known[index] = entry[1]
+                saved_tokens += estimate_tokens(original) + estimate_tokens(entry[1])
+            self.stats["requests"] += 1
+            self.stats["hits"] += len(known)
+            self.stats["misses"] += total - len(known)
+            if known:
+                self.stats["saved_tokens"] += saved_tokens
+        if not known:
+            return None
+        return {"segments": segments, "known": known, "hits": len(known), "total": total,
+                "saved_tokens": saved_tokens}
+
+    def remember(self, model, system_prompt, text, improved_text, unmask=None):
+        """
+        Speichert die Absätze einer Antwort, sofern sie sich den gesendeten Absätzen zuordnen lassen.
+
+        Args:
+            text (str): Der gesendete Text
+            improved_text (str): Die Antwort darauf
+            unmask (callable): Wie bei plan(), gilt für gesendete und verbesserte Absätze
+
+        Returns:
+            int: Anzahl gespeicherter Absätze (0, wenn die Absatzzahl nicht übereinstimmt)
+        """
+        originals = [paragraph for paragraph, _ in split_paragraphs(text)]
+        improved = [paragraph for paragraph, _ in split_paragraphs(improved_text)]
+        if not improved_text or len(originals) < 2 or len(originals) != len(improved):
+            return 0
+        created = time.time()
+        stored = 0
+        with self._lock:
+            for original, improved_paragraph in zip(originals, improved):
+                if not original.strip() or not improved_paragraph.strip():
+                    continue
+                if unmask:
+                    original, improved_paragraph = unmask(original), unmask(improved_paragraph)
+                key = self.make_key(model, system_prompt, original)
+                self._entries[key] = (created, improved_paragraph)
+                self._entries.move_to_end(key)
+                stored += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if stored:
+                self._dirty = True
+                self._schedule_save()
+        return stored
+
+    def flush(self):
+        """Schreibt ausstehende Änderungen sofort (z.B. beim Beenden)."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Älteste zuerst, damit die LRU-Reihenfolge beim Laden erhalten bleibt
+                entries = [[key, created, text] for key, (created, text) in self._entries.items()]
+            self._save(entries)
+
+    def clear(self):
+        """Leert den Speicher und löscht die Datei."""
+        with self._write_lock, self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = False
+            self._entries.clear()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        """Gibt die Statistik als dict zurück."""
+        stats = dict(self.stats)
+        stats["entries"] = len(self._entries)
+        return stats
+
+    def format_stats(self):
+        """Formatiert die Statistik für Debug-Logs."""
+        total = self.stats["hits"] + self.stats["misses"]
+        ratio = (self.stats["hits"] / total * 100) if total else 0.0
+        return (f"Absätze aus dem Speicher: {self.stats['hits']}/{total} ({ratio:.0f}%), "
+                f"~{self.stats['saved_tokens']} Tokens gespart, Einträge: {len(self._entries)}")
+
+    # --- Interne Helfer ---
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MEMO_VERSION:
+                return
+            for key, created, improved_paragraph in data.get("entries", []):
+                self._entries[key] = (float(created), str(improved_paragraph))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self._entries.clear()
+            self._log("Absatz-Speicher nicht lesbar, beginne leer", f"Fehler: {e}", level="WARNING")
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _schedule_save(self):
+        """Startet den Schreib-Timer, falls noch keiner läuft (Aufrufer hält self._lock)."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _save(self, entries):
+        """Schreibt einen Schnappschuss der Einträge (Aufrufer hält self._write_lock)."""
+        tmp_path = self.path + ".tmp"
+        data = {"version": MEMO_VERSION, "entries": entries}
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self._log("Absatz-Speicher konnte nicht geschrieben werden", f"Fehler: {e}", level="WARNING")
+
+    def _log(self, message, details=None, level="INFO"):
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log(message, details, level=level)
@@ -0,0 +1,593 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import collections
+import json
+import threading
+import time
+
+from async_runtime import get_async_runtime
+from deadline import DeadlineExceeded
+from stream_filters import clean_text
+from stream_recorder import list_fixtures, load_fixture, replay_chunks, replay_chunks_async
+from gemini_api import (CLIENT_KEEPALIVE_EXPIRY, CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                        improve_text_with_gemini_stream, improve_text_with_gemini,
+                        improve_text_with_gemini_async, improve_text_hedged_async,
+                        improve_long_text_async, prewarm_connection, count_tokens,
+                        call_with_retry, call_with_retry_async,
+                        prepare_context_cache, invalidate_context_caches)
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+METRICS_WINDOW = 50         # Anzahl berücksichtigter Requests für die Latenz-Metriken
+DEFAULT_TIMEOUT = 120.0     # Sekunden, wenn keine Deadline übergeben wird
+CONNECT_TIMEOUT = 10.0
+
+
+class ProviderHTTPError(Exception):
+    """HTTP-Fehler eines Backends (code/response wie bei google.genai.errors.APIError)."""
+
+    def __init__(self, code, message, response=None):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+        self.response = response
+
+
+class _LatencyTracker:
+    """Misst TTFB und Gesamtdauer eines Requests und reicht Chunks weiter."""
+
+    def __init__(self, provider, model, on_chunk_callback):
+        self.provider = provider
+        self.model = model
+        self.on_chunk_callback = on_chunk_callback
+        self.start = time.monotonic()
+        self.ttfb = None
+
+    def on_chunk(self, chunk_text):
+        if self.ttfb is None:
+            self.ttfb = time.monotonic() - self.start
+        if self.on_chunk_callback:
+            self.on_chunk_callback(chunk_text)
+
+    def finish(self, success):
+        self.provider.record_latency(self.model, self.ttfb, time.monotonic() - self.start, success)
+
+
+class Provider:
+    """
+    Basisklasse für Text-Backends.
+
+    Unterklassen implementieren _improve_stream (blockierend), _improve (ohne Streaming) und
+    _improve_async. Die öffentlichen Methoden messen dabei TTFB und Dauer pro Provider.
+    Fehler werden wie in gemini_api behandelt: Rückgabe None, DeadlineExceeded wird nur
+    vom Async-Pfad weitergereicht.
+    """
+
+    name = "base"
+    supports_token_count = False
+
+    def __init__(self):
+        self._metrics = {"requests": 0, "errors": 0}
+        self._ttfbs = collections.deque(maxlen=METRICS_WINDOW)
+        self._durations = collections.deque(maxlen=METRICS_WINDOW)
+        self._metrics_lock = threading.Lock()
+
+    # --- Öffentliche API ---
+
+    def improve_stream(self, text, model, system_prompt, on_chunk_callback, deadline=None):
+        """Verbessert Text mit Streaming (blockierend), Callback pro Chunk."""
+        tracker = _LatencyTracker(self, model, on_chunk_callback)
+        result = self._improve_stream(text, model, system_prompt, tracker.on_chunk, deadline)
+        tracker.finish(bool(result))
+        return result
+
+    def improve(self, text, model, system_prompt):
+        """Verbessert Text ohne Streaming (blockierend)."""
+        tracker = _LatencyTracker(self, model, None)
+        result = self._improve(text, model, system_prompt)
+        tracker.ttfb = time.monotonic() - tracker.start
+        tracker.finish(bool(result))
+        return result
+
+    async def improve_async(self, text, model, system_prompt, on_chunk_callback=None, deadline=None):
+        """Verbessert Text mit Streaming auf dem gemeinsamen Event Loop."""
+        tracker = _LatencyTracker(self, model, on_chunk_callback)
+        try:
+            result = await self._improve_async(text, model, system_prompt, tracker.on_chunk, deadline)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            tracker.finish(False)
+            raise
+        tracker.finish(bool(result))
+        return result
+
+    async def improve_hedged_async(self, text, model, system_prompt, on_chunk_callback=None, deadline=None,
+                                   fallback_model=None, hedge_threshold=0, on_winner=None):
+        """
+        Wie improve_async mit Hedge auf ein Fallback-Modell (sofern der Provider das unterstützt).
+
+        on_winner erhält das Modell, das die Antwort geliefert hat (ohne Aufruf: das Primärmodell).
+        """
+        return await self.improve_async(text, model, system_prompt, on_chunk_callback, deadline)
+
+    async def improve_long_text_async(self, text, model, system_prompt, on_chunk_callback=None,
+                                      max_chunk_tokens=1200, max_concurrency=4, on_segment_callback=None,
+                                      deadline=None, segments=None, known_segments=None):
+        """Langtext-Modus: Segmente parallel über improve_async dieses Providers."""
+        async def improve_segment(segment_text, api_key, segment_model, segment_prompt, callback, segment_deadline):
+            return await self.improve_async(segment_text, segment_model, segment_prompt, callback, segment_deadline)
+
+        return await improve_long_text_async(text, None, model, system_prompt, on_chunk_callback,
+                                             max_chunk_tokens=max_chunk_tokens, max_concurrency=max_concurrency,
+                                             on_segment_callback=on_segment_callback, deadline=deadline,
+                                             improve_fn=improve_segment, segments=segments,
+                                             known_segments=known_segments)
+
+    def count_tokens(self, text, model):
+        """Exakte Token-Anzahl (nur wenn supports_token_count)."""
+        raise NotImplementedError
+
+    def prewarm(self, model, force=False):
+        """Baut die Verbindung im Hintergrund auf (optional)."""
+        return None
+
+    def prepare_context(self, model, system_prompt, invalidate=False):
+        """Legt serverseitigen Kontext für den System Prompt an, z.B. einen Prompt-Cache (optional)."""
+        return None
+
+    def close(self):
+        """Gibt Verbindungen frei."""
+
+    # --- Metriken ---
+
+    def record_latency(self, model, ttfb, duration, success):
+        with self._metrics_lock:
+            self._metrics["requests"] += 1
+            if not success:
+                self._metrics["errors"] += 1
+                return
+            if ttfb is not None:
+                self._ttfbs.append(ttfb)
+            self._durations.append(duration)
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            ttfb_text = f"{ttfb:.3f}s" if ttfb is not None else "-"
+            debug.log_performance(f"Provider {self.name}", duration, f"Modell: {model}, TTFB: {ttfb_text}")
+
+    def get_metrics(self):
+        """Latenz-Metriken dieses Providers über die letzten METRICS_WINDOW Requests."""
+        with self._metrics_lock:
+            ttfbs = sorted(self._ttfbs)
+            durations = list(self._durations)
+            metrics = dict(self._metrics)
+        metrics["provider"] = self.name
+        metrics["ttfb_avg"] = sum(ttfbs) / len(ttfbs) if ttfbs else None
+        metrics["ttfb_p90"] = ttfbs[min(len(ttfbs) - 1, int(round(0.9 * (len(ttfbs) - 1))))] if ttfbs else None
+        metrics["duration_avg"] = sum(durations) / len(durations) if durations else None
+        return metrics
+
+    def format_metrics(self):
+        metrics = self.get_metrics()
+        parts = [f"Provider: {metrics['provider']}", f"Requests: {metrics['requests']}", f"Fehler: {metrics['errors']}"]
+        for key, label in (("ttfb_avg", "TTFB Ø"), ("ttfb_p90", "TTFB p90"), ("duration_avg", "Dauer Ø")):
+            if metrics[key] is not None:
+                parts.append(f"{label}: {metrics[key]:.3f}s")
+        return ", ".join(parts)
+
+    # --- Implementierung ---
+
+    def _improve_stream(self, text, model, system_prompt, on_chunk_callback, deadline):
+        raise NotImplementedError
+
+    def _improve(self, text, model, system_prompt):
+        raise NotImplementedError
+
+    async def _improve_async(self, text, model, system_prompt, on_chunk_callback, deadline):
+        raise NotImplementedError
+
+
+class GeminiProvider(Provider):
+    """Google Gemini über google-genai (Implementierung in gemini_api.py)."""
+
+    name = "gemini"
+    supports_token_count = True
+
+    def __init__(self, api_key):
+        super().__init__()
+        self.api_key = api_key
+
+    def _improve_stream(self, text, model, system_prompt, on_chunk_callback, deadline):
+        return improve_text_with_gemini_stream(text, self.api_key, model, system_prompt, on_chunk_callback, deadline)
+
+    def _improve(self, text, model, system_prompt):
+        return improve_text_with_gemini(text, self.api_key, model, system_prompt)
+
+    async def _improve_async(self, text, model, system_prompt, on_chunk_callback, deadline):
+        return await improve_text_with_gemini_async(text, self.api_key, model, system_prompt, on_chunk_callback,
+                                                    deadline)
+
+    async def improve_hedged_async(self, text, model, system_prompt, on_chunk_callback=None, deadline=None,
+                                   fallback_model=None, hedge_threshold=0, on_winner=None):
+        tracker = _LatencyTracker(self, model, on_chunk_callback)
+        try:
+            result = await improve_text_hedged_async(text, self.api_key, model, system_prompt, tracker.on_chunk,
+                                                     deadline=deadline, fallback_model=fallback_model,
+                                                     hedge_threshold=hedge_threshold, on_winner=on_winner)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            tracker.finish(False)
+            raise
+        tracker.finish(bool(result))
+        return result
+
+    def count_tokens(self, text, model):
+        return count_tokens(text, self.api_key, model)
+
+    def prewarm(self, model, force=False):
+        return prewarm_connection(self.api_key, model, force=force)
+
+    def prepare_context(self, model, system_prompt, invalidate=False):
+        if invalidate:
+            invalidate_context_caches()
+        return prepare_context_cache(self.api_key, model, system_prompt)
+
+    def close(self):
+        invalidate_context_caches()
+
+
+_SSE_DONE = object()
+
+
+def _parse_sse_line(line):
+    """
+    Parst eine Zeile eines OpenAI-kompatiblen SSE-Streams.
+
+    Returns:
+        str: Text-Delta, _SSE_DONE am Stream-Ende oder None (Kommentar, Leerzeile, Rollen-Delta)
+    """
+    line = line.strip()
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return _SSE_DONE
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        return None
+    if payload.get("error"):
+        error = payload["error"]
+        message = error.get("message", error) if isinstance(error, dict) else error
+        code = error.get("code") if isinstance(error, dict) else None
+        raise ProviderHTTPError(code if isinstance(code, int) else 500, message)
+    choices = payload.get("choices") or []
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
+
+
+class OpenAICompatibleProvider(Provider):
+    """
+    Lokaler oder entfernter Server mit OpenAI-kompatiblem /v1/chat/completions (llama.cpp, vLLM, ...).
+
+    Streaming über Server-Sent Events. Sync- und Async-Client halten je einen Keep-Alive-Pool,
+    transiente Fehler laufen über denselben Retry/Circuit Breaker wie bei Gemini.
+    """
+
+    name = "openai_compatible"
+
+    def __init__(self, base_url, api_key=""):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self._client = None
+        self._async_client = None
+        self._async_loop = None
+        self._lock = threading.Lock()
+
+    def _url(self, path):
+        base = self.base_url if self.base_url.endswith("/v1") else f"{self.base_url}/v1"
+        return f"{base}/{path}"
+
+    def _headers(self):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _payload(self, text, model, system_prompt, stream):
+        return {
+            "model": model,
+            "stream": stream,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text},
+            ],
+        }
+
+    @staticmethod
+    def _timeout(deadline):
+        total = deadline.remaining() if deadline is not None else DEFAULT_TIMEOUT
+        return httpx.Timeout(max(total, 0.1), connect=min(CONNECT_TIMEOUT, max(total, 0.1)))
+
+    @staticmethod
+    def _limits():
+        return httpx.Limits(max_keepalive_connections=CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=CLIENT_KEEPALIVE_EXPIRY)
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self._limits())
+            return self._client
+
+    def _get_async_client(self):
+        # Der Async-Client ist an den Event Loop gebunden, auf dem er erstellt wurde
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = httpx.AsyncClient(limits=self._limits())
+            self._async_loop = loop
+        return self._async_client
+
+    @staticmethod
+    def _error_from_response(response, body):
+        try:
+            error = json.loads(body).get("error", body)
+            message = error.get("message", error) if isinstance(error, dict) else error
+        except (ValueError, AttributeError):
+            message = body[:200]
+        return ProviderHTTPError(response.status_code, message, response)
+
+    def _open_stream(self, text, model, system_prompt, deadline):
+        client = self._get_client()
+
+        def attempt():
+            request = client.build_request("POST", self._url("chat/completions"), headers=self._headers(),
+                                           json=self._payload(text, model, system_prompt, True),
+                                           timeout=self._timeout(deadline))
+            response = client.send(request, stream=True)
+            if response.status_code >= 400:
+                try:
+                    body = response.read().decode("utf-8", errors="replace")
+                finally:
+                    response.close()
+                raise self._error_from_response(response, body)
+            return response
+
+        return call_with_retry(model, attempt, deadline)
+
+    async def _open_stream_async(self, text, model, system_prompt, deadline):
+        client = self._get_async_client()
+
+        async def attempt():
+            request = client.build_request("POST", self._url("chat/completions"), headers=self._headers(),
+                                           json=self._payload(text, model, system_prompt, True),
+                                           timeout=self._timeout(deadline))
+            response = await client.send(request, stream=True)
+            if response.status_code >= 400:
+                try:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                finally:
+                    await response.aclose()
+                raise self._error_from_response(response, body)
+            return response
+
+        return await call_with_retry_async(model, attempt, deadline)
+
+    def _improve_stream(self, text, model, system_prompt, on_chunk_callback, deadline):
+        if not HAS_HTTPX or not text or not text.strip():
+            return None
+        debug = get_debug_logger() if get_debug_logger else None
+        parts = []
+        try:
+            response = self._open_stream(text, model, system_prompt, deadline)
+            try:
+                for line in response.iter_lines():
+                    if deadline is not None:
+                        deadline.check()
+                    delta = _parse_sse_line(line)
+                    if delta is _SSE_DONE:
+                        break
+                    if delta:
+                        parts.append(delta)
+                        if on_chunk_callback:
+                            on_chunk_callback(delta)
+            finally:
+                response.close()
+        except DeadlineExceeded as e:
+            if debug:
+                debug.log("Stream wegen Deadline abgebrochen", f"{self.name}: {e}", level="ERROR")
+            return None
+        except Exception as e:
+            if debug:
+                debug.log_exception(f"Fehler bei {self.name} Streaming", e)
+            print(f"Fehler bei {self.name} Streaming: {e}")
+            return None
+        full_text = "".join(parts)
+        return clean_text(full_text, text) if full_text.strip() else None
+
+    def _improve(self, text, model, system_prompt):
+        if not HAS_HTTPX or not text or not text.strip():
+            return None
+        client = self._get_client()
+        try:
+            response = call_with_retry(model, lambda: self._post(client, text, model, system_prompt))
+            full_text = response["choices"][0]["message"]["content"] or ""
+        except Exception as e:
+            debug = get_debug_logger() if get_debug_logger else None
+            if debug:
+                debug.log_exception(f"Fehler bei {self.name}", e)
+            print(f"Fehler bei {self.name}: {e}")
+            return None
+        return clean_text(full_text, text) if full_text.strip() else None
+
+    def _post(self, client, text, model, system_prompt):
+        response = client.post(self._url("chat/completions"), headers=self._headers(),
+                               json=self._payload(text, model, system_prompt, False),
+                               timeout=self._timeout(None))
+        if response.status_code >= 400:
+            raise self._error_from_response(response, response.text)
+        return response.json()
+
+    async def _improve_async(self, text, model, system_prompt, on_chunk_callback, deadline):
+        if not HAS_HTTPX or not text or not text.strip():
+            return None
+        debug = get_debug_logger() if get_debug_logger else None
+        parts = []
+        try:
+            response = await self._open_stream_async(text, model, system_prompt, deadline)
+            try:
+                async for line in response.aiter_lines():
+                    if deadline is not None:
+                        deadline.check()
+                    delta = _parse_sse_line(line)
+                    if delta is _SSE_DONE:
+                        break
+                    if delta:
+                        parts.append(delta)
+                        if on_chunk_callback:
+                            on_chunk_callback(delta)
+            finally:
+                # Schließt den HTTP-Stream auch bei Abbruch (CancelledError)
+                await response.aclose()
+        except (asyncio.CancelledError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"Stream-Fehler nach Ablauf der Frist: {e}")
+            if debug:
+                debug.log_exception(f"Fehler bei {self.name} Async-Streaming", e)
+            print(f"Fehler bei {self.name} Async-Streaming: {e}")
+            return None
+        full_text = "".join(parts)
+        return clean_text(full_text, text) if full_text.strip() else None
+
+    def prewarm(self, model, force=False):
+        """Baut die Verbindung des Async-Clients mit einem GET /v1/models auf."""
+        if not HAS_HTTPX:
+            return None
+
+        async def prewarm_request():
+            start = time.time()
+            try:
+                await self._get_async_client().get(self._url("models"), headers=self._headers(),
+                                                   timeout=CONNECT_TIMEOUT)
+                success = True
+            except Exception:
+                success = False
+            debug = get_debug_logger() if get_debug_logger else None
+            if debug:
+                debug.log_performance(f"Pre-Warm ({self.name})", time.time() - start, f"Erfolgreich: {success}")
+
+        return get_async_runtime().submit(prewarm_request())
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+        async_client, loop = self._async_client, self._async_loop
+        self._async_client = None
+        if async_client is not None and loop is not None and not loop.is_closed():
+            try:
+                asyncio.run_coroutine_threadsafe(async_client.aclose(), loop)
+            except RuntimeError:
+                pass
+
+
+class ReplayProvider(Provider):
+    """
+    Spielt aufgezeichnete Streams (stream_recorder.py) mit Original- oder skaliertem Timing ab.
+
+    Ist der Pfad ein Verzeichnis, werden dessen Fixtures reihum verwendet. Der Eingabetext
+    wird ignoriert; geliefert werden exakt die aufgezeichneten Chunks.
+    """
+
+    name = "replay"
+
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        self.path = path
+        self.speed = float(speed) if speed else 1.0
+        self.fixtures = list_fixtures(path)
+        self._next = 0
+        self._lock = threading.Lock()
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Replay-Provider", f"{len(self.fixtures)} Fixtures aus {path}, Geschwindigkeit: {self.speed:g}x",
+                      level="INFO" if self.fixtures else "WARNING")
+
+    def next_fixture(self):
+        """Lädt das nächste Fixture (reihum) oder None."""
+        with self._lock:
+            if not self.fixtures:
+                return None
+            path = self.fixtures[self._next % len(self.fixtures)]
+            self._next += 1
+        try:
+            return load_fixture(path)
+        except (OSError, ValueError) as e:
+            print(f"Fixture nicht lesbar: {path} ({e})")
+            return None
+
+    def _improve_stream(self, text, model, system_prompt, on_chunk_callback, deadline):
+        fixture = self.next_fixture()
+        if fixture is None:
+            return None
+        parts = []
+        try:
+            for chunk_text in replay_chunks(fixture, self.speed, deadline):
+                parts.append(chunk_text)
+                if on_chunk_callback:
+                    on_chunk_callback(chunk_text)
+        except DeadlineExceeded:
+            return None
+        full_text = "".join(parts)
+        return clean_text(full_text, text) if full_text.strip() else None
+
+    def _improve(self, text, model, system_prompt):
+        return self._improve_stream(text, model, system_prompt, None, None)
+
+    async def _improve_async(self, text, model, system_prompt, on_chunk_callback, deadline):
+        fixture = self.next_fixture()
+        if fixture is None:
+            return None
+        parts = []
+        async for chunk_text in replay_chunks_async(fixture, self.speed, deadline):
+            parts.append(chunk_text)
+            if on_chunk_callback:
+                on_chunk_callback(chunk_text)
+        full_text = "".join(parts)
+        return clean_text(full_text, text) if full_text.strip() else None
+
+
+def create_provider(config):
+    """
+    Erstellt den in den Einstellungen gewählten Provider.
+
+    Args:
+        config (ConfigManager): Die Einstellungen
+
+    Returns:
+        Provider: GeminiProvider, OpenAICompatibleProvider oder ReplayProvider
+    """
+    name = config.get("provider", GeminiProvider.name)
+    if name == ReplayProvider.name:
+        return ReplayProvider(config.get("replay_path", ""), config.get("replay_speed", 1.0))
+    if name == OpenAICompatibleProvider.name:
+        if not HAS_HTTPX:
+            print("FEHLER: 'httpx' nicht gefunden, verwende Gemini.")
+        else:
+            return OpenAICompatibleProvider(config.get("openai_base_url", "http://localhost:8080"),
+                                            config.get("openai_api_key", ""))
+    return GeminiProvider(config.get("gemini_api_key"))
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import get_appdata_path
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+CACHE_DIR_NAME = "response_cache"
+SAVE_DELAY = 1.0  # Sekunden; Dateien schreibt ein Timer-Thread, nicht der Aufrufer (gemeinsamer Event Loop)
+
+
+class ResponseCache:
+    """
+    Inhaltsadressierter Cache für verbesserte Texte.
+
+    Schlüssel ist ein SHA-256 über (Modell, System Prompt, Text). Die Einträge liegen in
+    einem begrenzten LRU im Speicher und zusätzlich als JSON-Dateien im AppData-Verzeichnis.
+    Der Datei-Store hat ein Größenbudget (älteste Einträge werden verdrängt) und eine TTL.
+    Neue Einträge werden verzögert in einem Timer-Thread geschrieben; flush() schreibt sofort.
+    """
+
+    def __init__(self, directory=None, max_memory_entries=200, max_disk_bytes=20 * 1024 * 1024,
+                 ttl_seconds=7 * 24 * 3600, save_delay=SAVE_DELAY):
+        self.directory = directory or get_appdata_path(CACHE_DIR_NAME)
+        self.max_memory_entries = max(1, int(max_memory_entries))
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+        self.ttl_seconds = ttl_seconds
+        self.save_delay = save_delay
+        self.stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Hält Schreiben und clear() auseinander
+        self._memory = OrderedDict()  # key -> (created, text)
+        self._pending = {}            # key -> (created, model, text), noch nicht geschrieben
+        self._timer = None
+        self._disk_index = {}         # key -> (size, mtime)
+        self._disk_bytes = 0
+        self._disk_enabled = self.max_disk_bytes > 0
+
+        if self._disk_enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._scan_disk()
+            except OSError as e:
+                self._log("Cache-Verzeichnis nicht nutzbar, nur Speicher-Cache aktiv", f"Fehler: {e}", level="WARNING")
+                self._disk_enabled = False
+
+    @staticmethod
+    def make_key(model, system_prompt, text):
+        """Erstellt den Cache-Schlüssel (SHA-256 Hex) für eine Anfrage."""
+        payload = json.dumps([model, system_prompt, text], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model, system_prompt, text):
+        """
+        Sucht einen gecachten verbesserten Text.
+
+        Returns:
+            str: Der gecachte Text oder None bei Fehltreffer
+        """
+        key = self.make_key(model, system_prompt, text)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, improved_text = entry
+                if self._is_expired(created, now):
+                    self._remove(key)
+                    self.stats["expired"] += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    self._touch_disk(key)
+                    self._log("Cache-Treffer (Speicher)", self.format_stats())
+                    return improved_text
+
+            if self._disk_enabled and key in self._disk_index:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    created, improved_text = entry
+                    if self._is_expired(created, now):
+                        self._remove(key)
+                        self.stats["expired"] += 1
+                    else:
+                        self._put_memory(key, created, improved_text)
+                        self.stats["hits"] += 1
+                        self.stats["disk_hits"] += 1
+                        self._touch_disk(key)
+                        self._log("Cache-Treffer (Datei)", self.format_stats())
+                        return improved_text
+
+            self.stats["misses"] += 1
+            self._log("Cache-Fehltreffer", self.format_stats(), level="DEBUG")
+            return None
+
+    def put(self, model, system_prompt, text, improved_text):
+        """Speichert einen verbesserten Text im Speicher- und Datei-Cache."""
+        if not improved_text:
+            return
+        key = self.make_key(model, system_prompt, text)
+        created = time.time()
+
+        with self._lock:
+            self._put_memory(key, created, improved_text)
+            if self._disk_enabled:
+                self._pending[key] = (created, model, improved_text)
+                self._schedule_save()
+
+    def flush(self):
+        """Schreibt ausstehende Einträge sofort (z.B. beim Beenden)."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+            for key, (created, model, improved_text) in pending.items():
+                size = self._write_disk(key, created, model, improved_text)
+                if size is not None:
+                    with self._lock:
+                        self._index_disk(key, size)
+
+    def clear(self):
+        """Leert den gesamten Cache (Speicher und Dateien)."""
+        with self._write_lock, self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending.clear()
+            for key in list(self._disk_index):
+                self._delete_disk(key)
+            self._memory.clear()
+            self._disk_index.clear()
+            self._disk_bytes = 0
+        self._log("Cache geleert")
+
+    def get_stats(self):
+        """Gibt die Cache-Statistik als dict zurück."""
+        stats = dict(self.stats)
+        stats["memory_entries"] = len(self._memory)
+        stats["disk_entries"] = len(self._disk_index)
+        stats["disk_bytes"] = self._disk_bytes
+        return stats
+
+    def format_stats(self):
+        """Formatiert die Statistik für Debug-Logs und das Tray-Menü."""
+        total = self.stats["hits"] + self.stats["misses"]
+        ratio = (self.stats["hits"] / total * 100) if total else 0.0
+        return (f"Treffer: {self.stats['hits']}, Fehltreffer: {self.stats['misses']} ({ratio:.0f}%), "
+                f"Verdrängt: {self.stats['evictions']}, Einträge: {len(self._disk_index) or len(self._memory)}, "
+                f"{self._disk_bytes / 1024:.0f} KB")
+
+    # --- Interne Helfer (Aufrufer hält self._lock) ---
+
+    def _is_expired(self, created, now):
+        return self.ttl_seconds and self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def _put_memory(self, key, created, improved_text):
+        self._memory[key] = (created, improved_text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            if not self._disk_enabled:
+                self.stats["evictions"] += 1
+
+    def _remove(self, key):
+        self._memory.pop(key, None)
+        self._pending.pop(key, None)
+        if key in self._disk_index:
+            self._delete_disk(key)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _scan_disk(self):
+        """Baut den Index der vorhandenen Cache-Dateien auf und entfernt abgelaufene."""
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or not entry.name.endswith(".json"):
+                continue
+            key = entry.name[:-5]
+            stat = entry.stat()
+            self._disk_index[key] = (stat.st_size, stat.st_mtime)
+            self._disk_bytes += stat.st_size
+        # Abgelaufene Einträge anhand der Dateizeit vorab entfernen (mtime >= created)
+        for key, (size, mtime) in list(self._disk_index.items()):
+            if self._is_expired(mtime, now):
+                self._delete_disk(key)
+                self.stats["expired"] += 1
+        self._evict_disk()
+
+    def _read_disk(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["created"], data["text"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._delete_disk(key)
+            return None
+
+    def _schedule_save(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _write_disk(self, key, created, model, improved_text):
+        """Schreibt eine Cache-Datei (ohne self._lock) und gibt ihre Größe zurück, None bei Fehler."""
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": created, "model": model, "text": improved_text}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            return os.path.getsize(path)
+        except OSError as e:
+            self._log("Cache-Datei konnte nicht geschrieben werden", f"Fehler: {e}", level="WARNING")
+            return None
+
+    def _index_disk(self, key, size):
+        old = self._disk_index.get(key)
+        if old:
+            self._disk_bytes -= old[0]
+        self._disk_index[key] = (size, time.time())
+        self._disk_bytes += size
+        self._evict_disk()
+
+    def _touch_disk(self, key):
+        """Aktualisiert die Zugriffszeit (LRU-Reihenfolge im Datei-Store)."""
+        if key in self._disk_index:
+            size, _ = self._disk_index[key]
+            now = time.time()
+            self._disk_index[key] = (size, now)
+            try:
+                os.utime(self._path(key), (now, now))
+            except OSError:
+                pass
+
+    def _delete_disk(self, key):
+        size, _ = self._disk_index.pop(key, (0, 0))
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """Verdrängt die am längsten ungenutzten Dateien, bis das Größenbudget eingehalten wird."""
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        for key, _ in sorted(self._disk_index.items(), key=lambda item: item[1][1]):
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            self._delete_disk(key)
+            self._memory.pop(key, None)
+            self.stats["evictions"] += 1
+
+    def _log(self, message, details=None, level="INFO"):
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log(message, details, level=level)
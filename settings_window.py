@@ -5,6 +5,9 @@ from tkinter import ttk, messagebox
 import sys
 import traceback
 
+from config import AVAILABLE_MODELS, AVAILABLE_PROVIDERS
+from timing_profiles import get_timing_profiles
+
 try:
     from pynput import keyboard
     HAS_PYNPUT_SETTINGS = True
@@ -114,6 +117,43 @@ class SettingsWindow(tk.Toplevel):
     def _populate_settings(self, parent):
         """Populates the settings frame with all configuration options."""
         
+        # Backend Settings
+        provider_frame = ttk.Labelframe(parent, text="Backend", padding="15")
+        provider_frame.pack(fill="x", pady=(0, 15), padx=10)
+        
+        provider_row = ttk.Frame(provider_frame)
+        provider_row.pack(fill="x", pady=(0, 10))
+        
+        ttk.Label(provider_row, text="Provider:", font=("", 9)).pack(side="left", padx=(0, 10))
+        self.provider_var = tk.StringVar(value=self.config.get("provider", "gemini"))
+        provider_combo = ttk.Combobox(provider_row, textvariable=self.provider_var, width=30, state="readonly", font=("", 9))
+        provider_combo['values'] = AVAILABLE_PROVIDERS
+        provider_combo.pack(side="left", fill="x", expand=True)
+        
+        base_url_row = ttk.Frame(provider_frame)
+        base_url_row.pack(fill="x", pady=(0, 10))
+        
+        ttk.Label(base_url_row, text="Server-URL:", font=("", 9)).pack(side="left", padx=(0, 10))
+        self.openai_base_url_var = tk.StringVar(value=self.config.get("openai_base_url", "http://localhost:8080"))
+        ttk.Entry(base_url_row, textvariable=self.openai_base_url_var, width=40, font=("Consolas", 9)).pack(side="left", fill="x", expand=True)
+        
+        openai_model_row = ttk.Frame(provider_frame)
+        openai_model_row.pack(fill="x", pady=(0, 10))
+        
+        ttk.Label(openai_model_row, text="Server-Modell:", font=("", 9)).pack(side="left", padx=(0, 10))
+        self.openai_model_var = tk.StringVar(value=self.config.get("openai_model", "local"))
+        ttk.Entry(openai_model_row, textvariable=self.openai_model_var, width=30, font=("Consolas", 9)).pack(side="left", padx=(0, 10))
+        
+        ttk.Label(openai_model_row, text="Server-Key:", font=("", 9)).pack(side="left", padx=(0, 10))
+        self.openai_api_key_var = tk.StringVar(value=self.config.get("openai_api_key", ""))
+        ttk.Entry(openai_model_row, textvariable=self.openai_api_key_var, width=20, show="*", font=("Consolas", 9)).pack(side="left", fill="x", expand=True)
+        
+        help_text_provider = ttk.Label(provider_frame,
+                                       text="'gemini': Google Gemini API. 'openai_compatible': lokaler Server mit /v1/chat/completions "
+                                            "(z.B. llama.cpp oder vLLM); Server-URL, Modell und optionaler Key gelten nur dafür.",
+                                       font=("", 8), foreground="gray", wraplength=600)
+        help_text_provider.pack(anchor="w", pady=(0, 0))
+        
         # Gemini API Settings - verbessertes Layout
         api_frame = ttk.Labelframe(parent, text="Gemini API Einstellungen", padding="15")
         api_frame.pack(fill="x", pady=(0, 15), padx=10)
@@ -151,20 +191,81 @@ class SettingsWindow(tk.Toplevel):
         ttk.Label(model_row, text="Modell:", font=("", 9)).pack(side="left", padx=(0, 10))
         self.model_var = tk.StringVar(value=self.config.get("gemini_model"))
         model_combo = ttk.Combobox(model_row, textvariable=self.model_var, width=52, state="readonly", font=("", 9))
-        model_combo['values'] = (
-            "gemini-3-pro-preview",
-            "gemini-2.5-flash",
-            "gemini-2.5-flash-lite",
-            "gemini-2.5-pro",
-            "gemini-2.0-flash",
-            "gemini-2.0-flash-lite"
-        )
+        model_combo['values'] = AVAILABLE_MODELS
         model_combo.pack(side="left", fill="x", expand=True)
         
         # Help text für Modell
         help_text2 = ttk.Label(api_frame, text="Wählen Sie das Gemini-Modell. Flash ist schneller, Pro ist genauer.", 
                                font=("", 8), foreground="gray")
-        help_text2.pack(anchor="w", pady=(0, 15))
+        help_text2.pack(anchor="w", pady=(0, 10))
+        
+        # Modell-Router
+        self.router_enabled_var = tk.BooleanVar(value=self.config.get("router_enabled", False))
+        router_check = ttk.Checkbutton(
+            api_frame,
+            text="Modell automatisch wählen (Router)",
+            variable=self.router_enabled_var
+        )
+        router_check.pack(anchor="w", pady=(0, 5))
+        
+        slo_row = ttk.Frame(api_frame)
+        slo_row.pack(fill="x", pady=(0, 5))
+        ttk.Label(slo_row, text="Ziel-Latenz (Sekunden):", font=("", 9)).pack(side="left", padx=(0, 10))
+        self.router_slo_var = tk.StringVar(value=str(self.config.get("router_latency_slo", 8.0)))
+        ttk.Entry(slo_row, textvariable=self.router_slo_var, width=8, font=("", 9)).pack(side="left")
+        
+        help_text_router = ttk.Label(api_frame,
+                                     text="Wählt pro Anfrage aus der Modellliste: kurze Texte an Lite-Modelle, lange an Pro-Modelle, "
+                                          "unter Berücksichtigung der gemessenen Latenz und Fehlerrate. Das gewählte Modell oben dient als Vorzug.",
+                                     font=("", 8), foreground="gray", wraplength=600)
+        help_text_router.pack(anchor="w", pady=(0, 15))
+        
+        # Diff-Modus
+        self.edit_mode_var = tk.BooleanVar(value=self.config.get("edit_mode", False))
+        edit_mode_check = ttk.Checkbutton(
+            api_frame,
+            text="Nur Änderungen anfordern (Diff-Modus)",
+            variable=self.edit_mode_var
+        )
+        edit_mode_check.pack(anchor="w", pady=(0, 5))
+        
+        help_text_edit = ttk.Label(api_frame,
+                                   text="Das Modell liefert nur eine Liste von Ersetzungen, die lokal angewendet wird. Spart bei kleinen "
+                                        "Korrekturen Ausgabe-Tokens und Zeit; bei ungültiger Liste wird der vollständige Text angefordert.",
+                                   font=("", 8), foreground="gray", wraplength=600)
+        help_text_edit.pack(anchor="w", pady=(0, 15))
+        
+        # Kontext-Cache
+        self.context_cache_var = tk.BooleanVar(value=self.config.get("context_cache_enabled", True))
+        context_cache_check = ttk.Checkbutton(
+            api_frame,
+            text="System Prompt serverseitig cachen",
+            variable=self.context_cache_var
+        )
+        context_cache_check.pack(anchor="w", pady=(0, 5))
+        
+        help_text_context_cache = ttk.Label(api_frame,
+                                            text="Lange System Prompts werden bei Gemini als Kontext-Cache angelegt und bei "
+                                                 "Änderungen automatisch erneuert. Kurze Prompts profitieren vom impliziten Caching.",
+                                            font=("", 8), foreground="gray", wraplength=600)
+        help_text_context_cache.pack(anchor="w", pady=(0, 15))
+        
+        # Maskierung
+        self.masking_var = tk.BooleanVar(value=self.config.get("masking_enabled", False))
+        masking_check = ttk.Checkbutton(
+            api_frame,
+            text="Links, Code, E-Mail-Adressen und Zahlen maskieren",
+            variable=self.masking_var
+        )
+        masking_check.pack(anchor="w", pady=(0, 5))
+        
+        help_text_masking = ttk.Label(api_frame,
+                                      text="Solche Abschnitte werden vor dem Senden durch kurze Platzhalter ersetzt und danach "
+                                           "lokal wieder eingesetzt. Spart Tokens und verhindert, dass das Modell sie verändert. "
+                                           "Der Text wird erst nach der vollständigen Antwort eingefügt; fehlt ein Platzhalter, "
+                                           "wird ohne Maskierung wiederholt.",
+                                      font=("", 8), foreground="gray", wraplength=600)
+        help_text_masking.pack(anchor="w", pady=(0, 15))
         
         # System Prompt mit besserem Layout
         prompt_row = ttk.Frame(api_frame)
@@ -216,6 +317,23 @@ class SettingsWindow(tk.Toplevel):
                                font=("", 8), foreground="gray", wraplength=600)
         help_text4.pack(anchor="w", pady=(5, 0))
         
+        # Text-Erfassung
+        capture_row = ttk.Frame(hotkey_frame)
+        capture_row.pack(fill="x", pady=(15, 5))
+        
+        ttk.Label(capture_row, text="Text-Erfassung:", font=("", 9)).pack(side="left", padx=(0, 10))
+        self.capture_strategy_var = tk.StringVar(value=self.config.get("capture_strategy", "keystroke"))
+        capture_combo = ttk.Combobox(capture_row, textvariable=self.capture_strategy_var, width=30, state="readonly", font=("", 9))
+        capture_combo['values'] = ("primary", "keystroke")
+        capture_combo.pack(side="left", fill="x", expand=True)
+        
+        help_text_capture = ttk.Label(hotkey_frame,
+                                      text="'keystroke': Immer Ctrl+C senden. 'primary': Unter Linux (X11) wird der markierte Text "
+                                           "direkt gelesen (nur mit clipboard_backend \"tk\"), ohne Ctrl+C und ohne die Zwischenablage zu verändern; gehört die Markierung "
+                                           "nicht zum aktiven Fenster oder ist sie nicht mehr aktuell, wird Ctrl+C verwendet.",
+                                      font=("", 8), foreground="gray", wraplength=600)
+        help_text_capture.pack(anchor="w", pady=(5, 0))
+        
         # Text Insert Settings
         insert_frame = ttk.Labelframe(parent, text="Text-Einfüge Einstellungen", padding="15")
         insert_frame.pack(fill="x", pady=(0, 15), padx=10)
@@ -249,7 +367,36 @@ class SettingsWindow(tk.Toplevel):
         help_text_auto = ttk.Label(insert_frame, 
                                    text="Wenn deaktiviert, wird der verbesserte Text nur in die Zwischenablage kopiert, aber nicht automatisch eingefügt.", 
                                    font=("", 8), foreground="gray", wraplength=600)
-        help_text_auto.pack(anchor="w", pady=(0, 0))
+        help_text_auto.pack(anchor="w", pady=(0, 15))
+        
+        # Einfügen während des Streams
+        self.stream_insert_var = tk.BooleanVar(value=self.config.get("stream_insert_enabled", False))
+        stream_insert_check = ttk.Checkbutton(
+            insert_frame,
+            text="Text schon während der Antwort einfügen",
+            variable=self.stream_insert_var
+        )
+        stream_insert_check.pack(anchor="w", pady=5)
+        
+        help_text_stream_insert = ttk.Label(insert_frame,
+                                            text="Fertige Textteile werden eingefügt, sobald sie ankommen, statt auf die vollständige Antwort "
+                                                 "zu warten. Nur wirksam, wenn der Text automatisch eingefügt wird.",
+                                            font=("", 8), foreground="gray", wraplength=600)
+        help_text_stream_insert.pack(anchor="w", pady=(0, 15))
+        
+        # Gelernte Zeitprofile pro Anwendung
+        profiles_row = ttk.Frame(insert_frame)
+        profiles_row.pack(fill="x", pady=(0, 5))
+        
+        self.timing_profiles_label = ttk.Label(profiles_row, text=self._timing_profiles_text(), font=("", 9))
+        self.timing_profiles_label.pack(side="left", padx=(0, 10))
+        ttk.Button(profiles_row, text="Zeitprofile zurücksetzen", command=self._reset_timing_profiles).pack(side="right")
+        
+        help_text_profiles = ttk.Label(insert_frame,
+                                       text="Wartezeiten für Ctrl+C und Ctrl+V werden pro Anwendung aus gemessenen Latenzen gelernt. "
+                                            "Zurücksetzen verwirft alle Messungen; danach gelten wieder die Standardwerte.",
+                                       font=("", 8), foreground="gray", wraplength=600)
+        help_text_profiles.pack(anchor="w", pady=(0, 0))
         
         # Debug Settings
         debug_frame = ttk.Labelframe(parent, text="Debug Einstellungen", padding="15")
@@ -268,15 +415,37 @@ class SettingsWindow(tk.Toplevel):
                                font=("", 8), foreground="gray", wraplength=600)
         help_text6.pack(anchor="w", pady=(0, 0))
     
+    def _timing_profiles_text(self):
+        apps = get_timing_profiles().apps()
+        return f"Zeitprofile: {len(apps)} Anwendung(en)" + (f" ({', '.join(apps[:5])}{', ...' if len(apps) > 5 else ''})" if apps else "")
+    
+    def _reset_timing_profiles(self):
+        """Verwirft alle gelernten Zeitprofile (sofort, unabhängig von Speichern/Abbrechen)."""
+        if not messagebox.askyesno("Zeitprofile zurücksetzen", "Alle gelernten Wartezeiten verwerfen?", parent=self):
+            return
+        get_timing_profiles().reset()
+        self.timing_profiles_label.config(text=self._timing_profiles_text())
+    
     def save_settings(self):
         """Saves all settings to the config manager."""
         try:
+            # Validate and save Backend
+            provider = self.provider_var.get().strip() or "gemini"
+            base_url = self.openai_base_url_var.get().strip()
+            if provider == "openai_compatible" and not base_url.startswith(("http://", "https://")):
+                messagebox.showerror("Fehler", "Server-URL muss mit http:// oder https:// beginnen.")
+                return
+            
             # Validate and save API Key
             api_key = self.api_key_var.get().strip()
-            if not api_key:
+            if not api_key and provider == "gemini":
                 messagebox.showerror("Fehler", "API Key darf nicht leer sein.")
                 return
             self.config.set("gemini_api_key", api_key)
+            self.config.set("openai_base_url", base_url)
+            self.config.set("openai_model", self.openai_model_var.get().strip() or "local")
+            self.config.set("openai_api_key", self.openai_api_key_var.get().strip())
+            self.config.set("provider", provider)
             
             # Validate and save Model
             model = self.model_var.get().strip()
@@ -285,6 +454,20 @@ class SettingsWindow(tk.Toplevel):
                 return
             self.config.set("gemini_model", model)
             
+            # Validate and save Router settings
+            try:
+                router_slo = float(self.router_slo_var.get().strip().replace(",", "."))
+                if router_slo <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Fehler", "Ziel-Latenz muss eine positive Zahl sein.")
+                return
+            self.config.set("router_enabled", self.router_enabled_var.get())
+            self.config.set("router_latency_slo", router_slo)
+            self.config.set("edit_mode", self.edit_mode_var.get())
+            self.config.set("context_cache_enabled", self.context_cache_var.get())
+            self.config.set("masking_enabled", self.masking_var.get())
+            
             # Save System Prompt
             prompt = self.prompt_text_widget.get("1.0", tk.END).strip()
             if not prompt:
@@ -313,6 +496,12 @@ class SettingsWindow(tk.Toplevel):
             
             self.config.set("hotkey", hotkey)
             
+            capture_strategy = self.capture_strategy_var.get().strip()
+            if capture_strategy not in ("primary", "keystroke"):
+                messagebox.showerror("Fehler", "Ungültige Text-Erfassung.")
+                return
+            self.config.set("capture_strategy", capture_strategy)
+            
             # Save text insert settings
             insert_method = self.insert_method_var.get().strip()
             if insert_method not in ("typed", "clipboard"):
@@ -320,6 +509,7 @@ class SettingsWindow(tk.Toplevel):
                 return
             self.config.set("text_insert_method", insert_method)
             self.config.set("auto_insert_text", self.auto_insert_var.get())
+            self.config.set("stream_insert_enabled", self.stream_insert_var.get())
             
             # Save other settings
             self.config.set("debug_enabled", self.debug_enabled_var.get())
@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming-Nachbearbeitung der Modellausgabe als Kette von Operatoren.
+
+Jeder Operator nimmt Text-Stücke über feed() an und gibt zurück, was bereits feststeht;
+finish() liefert den Rest. Zurückgehalten wird nur, was am Ende noch wegfallen könnte
+(Präambel am Anfang, Zaun/Anführungszeichen/Leerraum am Ende; beginnt die Ausgabe mit einem
+Anführungszeichen, die ganze Ausgabe bis feststeht, ob es sie umschließt). Das Ergebnis ist unabhängig
+davon, wie der Stream in Chunks zerfällt, und entspricht clean_text() auf dem Gesamttext.
+
+Puffer sind Listen, die erst am Ende zusammengefügt werden, damit lange Ausgaben linear
+verarbeitet werden (kein wiederholtes text += chunk).
+"""
+
+import re
+
+QUOTE_CHARS = ('"', "'")
+PREAMBLE_MAX_CHARS = 200  # Längste Präambel, auf die am Anfang gewartet wird
+OVERLAP_MAX_CHARS = 120   # Längste Wiederholung am Anfang einer Fortsetzung, die entfernt wird
+OVERLAP_MIN_CHARS = 3     # Kürzere Übereinstimmungen gelten als Zufall
+RESTART_PROBE_CHARS = 40  # Beginnt die Fortsetzung mit so vielen Zeichen des Anfangs, fing das Modell neu an
+
+_PREAMBLE_RE = re.compile(
+    r"^\s*(?:(?:sure|gerne|klar|natürlich|okay|ok)\b[!,.]*\s*)?"
+    r"(?:(?:hier|here)\s+(?:ist|sind|is|are)\s+|here's\s+|below\s+is\s+|nachfolgend\s+(?:ist\s+)?)?"
+    r"(?:(?:der|die|das|the|your|ihr|dein|deine|ihre|eine?|an?)\s+)?"
+    r"(?:verbesserte|überarbeitete|korrigierte|improved|revised|corrected|polished|rewritten)\s+"
+    r"(?:text|version|fassung)\b[^\n:]{0,60}:[ \t]*(?:\r?\n)*",
+    re.IGNORECASE)
+_PREAMBLE_WORDS = {
+    "sure", "gerne", "klar", "natürlich", "okay", "ok", "hier", "here", "s", "ist", "sind", "is", "are",
+    "below", "nachfolgend", "der", "die", "das", "the", "your", "ihr", "dein", "deine", "ihre", "ein",
+    "eine", "a", "an", "verbesserte", "überarbeitete", "korrigierte", "improved", "revised", "corrected",
+    "polished", "rewritten",
+}
+_PREAMBLE_NOUNS = {"text", "version", "fassung"}
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_FENCE_OPEN_RE = re.compile(r"^\s*```[\w+#.-]*[ \t]*\r?\n")
+_WHITESPACE_RE = re.compile(r"(\s+)")
+_NEWLINE_RE = re.compile(r"\r\n|\r|\n")
+
+
+class StreamOperator:
+    """Basisklasse: reicht Text unverändert durch."""
+
+    def feed(self, text):
+        """Nimmt ein Stück an und gibt den festgeschriebenen Text zurück (ggf. leer)."""
+        return text
+
+    def finish(self):
+        """Gibt den zurückgehaltenen Rest zurück."""
+        return ""
+
+
+class _TailHoldingOperator(StreamOperator):
+    """Hält den Schwanz aus tail_chars (und Leerraum) zurück, bis klar ist, dass er nicht am Ende steht."""
+
+    tail_chars = ""
+
+    def __init__(self):
+        self._tail = ""
+
+    def _split_tail(self, text):
+        text = self._tail + text
+        keep = len(text)
+        while keep > 0 and (text[keep - 1].isspace() or text[keep - 1] in self.tail_chars):
+            keep -= 1
+        self._tail = text[keep:]
+        return text[:keep]
+
+
+class PreambleStripper(StreamOperator):
+    """
+    Entfernt eine einleitende Zeile wie "Hier ist der verbesserte Text:".
+
+    Gewartet wird nur, solange der Anfang noch zu einer solchen Zeile passen kann, höchstens
+    PREAMBLE_MAX_CHARS Zeichen. Beginnt schon der Originaltext so, wird nichts entfernt.
+    """
+
+    def __init__(self, source_text=""):
+        self._buffer = []
+        self._size = 0
+        self._decided = bool(_PREAMBLE_RE.match(source_text or ""))
+
+    def feed(self, text):
+        if self._decided or not text:
+            return text
+        self._buffer.append(text)
+        self._size += len(text)
+        head = "".join(self._buffer)
+        if not self._could_match(head):
+            return self._release(head)
+        if self._size >= PREAMBLE_MAX_CHARS or ("\n" in head.lstrip()) or re.search(r":.", head):
+            return self._release(head, match=True)
+        return ""
+
+    def finish(self):
+        if self._decided:
+            return ""
+        return self._release("".join(self._buffer), match=True)
+
+    def _could_match(self, head):
+        stripped = head.lstrip()
+        if not stripped:
+            return True
+        # Nur vollständige Wörter prüfen (das letzte kann noch wachsen)
+        if not stripped[-1].isspace() and ":" not in stripped:
+            stripped = stripped[:len(stripped) - len(stripped.split()[-1])]
+        for word in _WORD_RE.findall(stripped.lower()):
+            if word in _PREAMBLE_NOUNS:
+                return True
+            if word not in _PREAMBLE_WORDS:
+                return False
+        return True
+
+    def _release(self, head, match=False):
+        self._decided = True
+        self._buffer = []
+        if match:
+            found = _PREAMBLE_RE.match(head)
+            if found:
+                return head[found.end():]
+        return head
+
+
+class FenceStripper(_TailHoldingOperator):
+    """Entfernt einen Markdown-Codezaun (```lang ... ```) um die gesamte Ausgabe."""
+
+    tail_chars = "`"
+
+    def __init__(self, source_text=""):
+        super().__init__()
+        self._lead = []
+        self._started = bool((source_text or "").lstrip().startswith("```"))
+        self._opened = False
+
+    def feed(self, text):
+        if not text:
+            return ""
+        if not self._started:
+            self._lead.append(text)
+            head = "".join(self._lead)
+            stripped = head.lstrip()
+            if not stripped:
+                return ""
+            if stripped.startswith("`"):
+                if "\n" not in stripped and len(stripped) < PREAMBLE_MAX_CHARS:
+                    return ""
+                found = _FENCE_OPEN_RE.match(head)
+                if found:
+                    self._opened = True
+                    head = head[found.end():]
+            self._started = True
+            self._lead = []
+            text = head
+        if not self._opened:
+            return text
+        return self._split_tail(text)
+
+    def finish(self):
+        if not self._started:
+            self._started = True
+            return "".join(self._lead)
+        rest, self._tail = self._tail, ""
+        if self._opened:
+            rest = rest.rstrip()
+            if rest.endswith("```"):
+                rest = rest[:-3]
+        return rest
+
+
+class QuoteStripper(_TailHoldingOperator):
+    """
+    Entfernt Anführungszeichen um die gesamte Ausgabe (auch "'...'") und trimmt die Enden.
+
+    Entfernt wird nur ein Paar, das wirklich beide Enden umschließt, und nur, wenn der
+    Originaltext nicht selbst mit dem Anführungszeichen beginnt. Ob das öffnende Zeichen
+    geschlossen wird, steht erst am Ende fest: Beginnt die Ausgabe mit einem solchen Zeichen,
+    wird sie bis finish() vollständig zurückgehalten (sonst wird normal gestreamt).
+    """
+
+    tail_chars = "".join(QUOTE_CHARS)
+
+    def __init__(self, source_text=""):
+        super().__init__()
+        self.source_text = (source_text or "").strip()
+        self._lead = []
+        self._held = None  # Liste, solange offen ist, ob das öffnende Zeichen umschließt
+        self._started = False
+
+    def feed(self, text):
+        if not text:
+            return ""
+        if self._held is not None:
+            self._held.append(text)
+            return ""
+        if not self._started:
+            self._lead.append(text)
+            head = "".join(self._lead)
+            if not head.strip(" \t\r\n\"'"):
+                return ""
+            self._started = True
+            self._lead = []
+            text = head.lstrip()
+            if any(text.startswith(quote) and not self.source_text.startswith(quote) for quote in QUOTE_CHARS):
+                self._held = [text]
+                return ""
+        return self._split_tail(text)
+
+    def finish(self):
+        if not self._started:
+            # Nur Leerraum/Anführungszeichen
+            self._started = True
+            return self._strip_wrapping("".join(self._lead))
+        if self._held is not None:
+            held, self._held = "".join(self._held), None
+            return self._strip_wrapping(held)
+        rest, self._tail = self._tail, ""
+        return rest.rstrip()
+
+    def _strip_wrapping(self, text):
+        """Entfernt umschließende Paare (außen zuerst), wie bisher auf dem Gesamttext."""
+        text = text.strip()
+        for quote in QUOTE_CHARS:
+            if (len(text) >= 2 and text.startswith(quote) and text.endswith(quote)
+                    and not self.source_text.startswith(quote)):
+                text = text[1:-1].strip()
+        return text
+
+
+class WhitespaceNormalizer(StreamOperator):
+    """
+    Vereinheitlicht Zeilenumbrüche (\\r\\n, \\r -> \\n), entfernt Leerzeichen am Zeilenende,
+    begrenzt aufeinanderfolgende Leerzeilen und trimmt Anfang und Ende.
+
+    Args:
+        max_blank_lines (int): Höchstens so viele Leerzeilen in Folge (None = nicht begrenzen)
+    """
+
+    def __init__(self, max_blank_lines=None):
+        self.max_blank_lines = max_blank_lines
+        self._run = []       # Zurückgehaltener Leerraum
+        self._started = False
+
+    def feed(self, text):
+        if not text:
+            return ""
+        out = []
+        # split() mit Gruppe liefert abwechselnd Text und Leerraum-Läufe
+        for index, part in enumerate(_WHITESPACE_RE.split(text)):
+            if not part:
+                continue
+            if index % 2:
+                self._run.append(part)
+                continue
+            # Text: gesammelten Leerraum davor normalisiert ausgeben (am Anfang verwerfen)
+            if self._run:
+                if self._started:
+                    out.append(self._normalize_run("".join(self._run)))
+                self._run = []
+            self._started = True
+            out.append(part)
+        return "".join(out)
+
+    def finish(self):
+        self._run = []
+        return ""
+
+    def _normalize_run(self, run):
+        lines = _NEWLINE_RE.split(run)
+        if len(lines) == 1:
+            return run
+        newlines = len(lines) - 1
+        if self.max_blank_lines is not None:
+            newlines = min(newlines, self.max_blank_lines + 1)
+        # Einrückung nach dem letzten Umbruch bleibt erhalten
+        return "\n" * newlines + lines[-1]
+
+
+class ContinuationStitcher(StreamOperator):
+    """
+    Hängt die Fortsetzung eines abgebrochenen Streams nahtlos an den bereits erhaltenen Text.
+
+    Wiederholt das Modell das Ende des bisherigen Textes oder beginnt es ganz von vorn, wird der
+    wiederholte Teil verworfen. Der Anfang der Fortsetzung wird nur so lange zurückgehalten, wie
+    er noch zu einer solchen Wiederholung passen kann.
+
+    Args:
+        prefix (str): Der bereits erhaltene (und weitergegebene) Text
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix or ""
+        self.dropped = 0      # Verworfene wiederholte Zeichen
+        self._buffer = []
+        self._skip = 0        # Noch zu verwerfende Zeichen (Neubeginn)
+        self._decided = not self.prefix
+
+    def feed(self, text):
+        if not text:
+            return ""
+        if self._decided:
+            return self._drop(text)
+        self._buffer.append(text)
+        head = "".join(self._buffer)
+        if self._could_repeat(head):
+            return ""
+        return self._release(head)
+
+    def finish(self):
+        if self._decided:
+            return ""
+        return self._release("".join(self._buffer))
+
+    def _could_repeat(self, head):
+        """True, solange head noch Anfang einer längeren Wiederholung sein kann."""
+        probe = min(len(self.prefix), RESTART_PROBE_CHARS)
+        if len(head) < probe and self.prefix.startswith(head):
+            return True
+        for length in range(len(head) + 1, min(len(self.prefix), OVERLAP_MAX_CHARS) + 1):
+            if self.prefix.startswith(head, len(self.prefix) - length):
+                return True
+        return False
+
+    def _overlap(self, head):
+        """Längste Übereinstimmung von Ende des Präfix und Anfang der Fortsetzung (ab Wortgrenze)."""
+        for length in range(min(len(self.prefix), len(head), OVERLAP_MAX_CHARS), OVERLAP_MIN_CHARS - 1, -1):
+            start = len(self.prefix) - length
+            if (self.prefix.endswith(head[:length])
+                    and (start == 0 or not self.prefix[start - 1].isalnum() or not head[0].isalnum())):
+                return length
+        return 0
+
+    def _release(self, head):
+        self._decided = True
+        self._buffer = []
+        probe = min(len(self.prefix), RESTART_PROBE_CHARS)
+        if probe >= OVERLAP_MIN_CHARS and head.startswith(self.prefix[:probe]):
+            # Neubeginn: den bereits erhaltenen Teil überspringen
+            self._skip = len(self.prefix)
+            return self._drop(head)
+        overlap = self._overlap(head)
+        self.dropped += overlap
+        return head[overlap:]
+
+    def _drop(self, text):
+        if not self._skip:
+            return text
+        skipped = min(self._skip, len(text))
+        self._skip -= skipped
+        self.dropped += skipped
+        return text[skipped:]
+
+
+class StreamPipeline:
+    """Verkettet Operatoren; feed()/finish() wie ein einzelner Operator."""
+
+    def __init__(self, operators):
+        self.operators = list(operators)
+        self._parts = []
+
+    def feed(self, chunk):
+        """Gibt den nach allen Operatoren festgeschriebenen Text zurück."""
+        for operator in self.operators:
+            if not chunk:
+                return ""
+            chunk = operator.feed(chunk)
+        if chunk:
+            self._parts.append(chunk)
+        return chunk
+
+    def finish(self):
+        """Leert die Operatoren nacheinander (Rest eines Operators läuft durch die folgenden)."""
+        text = ""
+        for operator in self.operators:
+            text = (operator.feed(text) if text else "") + operator.finish()
+        if text:
+            self._parts.append(text)
+        return text
+
+    def process(self, chunks):
+        """Generator: wendet die Kette auf einen Chunk-Iterator an."""
+        for chunk in chunks:
+            committed = self.feed(chunk)
+            if committed:
+                yield committed
+        rest = self.finish()
+        if rest:
+            yield rest
+
+    @property
+    def text(self):
+        """Der bisher ausgegebene Text."""
+        return "".join(self._parts)
+
+
+def _max_blank_lines(source_text):
+    """Höchstens so viele Leerzeilen in Folge, wie der Originaltext hat (mindestens eine)."""
+    runs = re.findall(r"\n(?:[ \t]*\r?\n)+", (source_text or "").replace("\r\n", "\n"))
+    return max([run.count("\n") - 1 for run in runs] + [1])
+
+
+def default_pipeline(source_text=""):
+    """Standard-Kette: Präambel, Codezaun, Anführungszeichen, Leerraum."""
+    return StreamPipeline([
+        PreambleStripper(source_text),
+        FenceStripper(source_text),
+        QuoteStripper(source_text),
+        WhitespaceNormalizer(max_blank_lines=_max_blank_lines(source_text)),
+    ])
+
+
+def clean_text(text, source_text=""):
+    """Wendet die Standard-Kette auf einen vollständigen Text an."""
+    pipeline = default_pipeline(source_text)
+    return pipeline.feed(text or "") + pipeline.finish()
+
+
+def benchmark(sizes_mb=(1, 2, 4), chunk_chars=40):
+    """
+    Misst die Kette auf MB-großen Ausgaben in kleinen Chunks (wie ein echter Stream).
+
+    Returns:
+        list: (MB, Sekunden, Sekunden pro MB) je Größe; bei linearer Laufzeit bleibt s/MB konstant
+    """
+    import time
+
+    paragraph = ("Dies ist ein Absatz mit etwas Text, der verbessert wurde.  \r\n"
+                 "Er hat mehrere Zeilen und \"Zitate\" in der Mitte.\n\n\n")
+    results = []
+    for size_mb in sizes_mb:
+        body = paragraph * (size_mb * 1024 * 1024 // len(paragraph) + 1)
+        output = "Hier ist der verbesserte Text:\n\n```\n\"" + body + "\"\n```\n"
+        chunks = [output[i:i + chunk_chars] for i in range(0, len(output), chunk_chars)]
+        pipeline = default_pipeline("Original")
+        start = time.perf_counter()
+        for _ in pipeline.process(chunks):
+            pass
+        duration = time.perf_counter() - start
+        results.append((size_mb, duration, duration / size_mb))
+    return results
+
+
+if __name__ == "__main__":
+    for size_mb, duration, per_mb in benchmark():
+        print(f"{size_mb:>3} MB: {duration:.3f}s ({per_mb:.3f}s pro MB)")
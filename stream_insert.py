@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from stream_filters import default_pipeline
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+START_DELAY = 0.1  # Kurze Pause vor dem ersten Einfügen, damit die Anwendung bereit ist
+
+
+class StreamInserter:
+    """
+    Fügt einen Stream ein, während er noch ankommt (Producer-Consumer).
+
+    feed() wird vom API-Task aufgerufen und blockiert nie; ein Einfüge-Thread holt sich den
+    festgeschriebenen Text. Ist das Einfügen langsamer als der Stream (Tippen, Ctrl+V mit
+    Pausen), sammelt sich der Rückstand und wird im nächsten Durchgang als ein Block
+    eingefügt. Die Zahl der Einfüge-Vorgänge richtet sich so nach der Geschwindigkeit des
+    Einfügens, nicht nach der Anzahl der Chunks.
+
+    Gemessen wird die Zeit bis zum ersten sichtbaren Zeichen (ab started_at, z.B. Hotkey).
+    """
+
+    def __init__(self, insert_fn, source_text="", started_at=None, is_current=None, start_delay=START_DELAY,
+                 operators=()):
+        """
+        Args:
+            insert_fn (callable): insert_fn(text) fügt einen Block ein (blockierend)
+            source_text (str): Der Originaltext (für die Nachbearbeitung, siehe stream_filters)
+            started_at (float): time.monotonic() beim Auslösen (Bezug für die Zeit bis zum ersten Zeichen)
+            is_current (callable): Liefert False, sobald nichts mehr eingefügt werden soll
+            start_delay (float): Pause vor dem ersten Einfügen
+            operators (iterable): Zusätzliche Operatoren nach der Standard-Kette (z.B. Platzhalter-Wiederherstellung)
+        """
+        self.insert_fn = insert_fn
+        self.is_current = is_current
+        self.start_delay = start_delay
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.pipeline = default_pipeline(source_text)
+        self.pipeline.operators.extend(operators)
+        self.chunks = 0
+        self.batches = 0
+        self.max_backlog = 0
+        self.first_chunk_at = None
+        self.first_visible_at = None
+        self._pending = []
+        self._pending_chars = 0
+        self._done = False
+        self._cancelled = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk_text):
+        """Nimmt einen Chunk entgegen (nicht blockierend, aus beliebigem Thread)."""
+        with self._cond:
+            if self._done:
+                return
+            self.chunks += 1
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.monotonic()
+            self._push(self.pipeline.feed(chunk_text))
+
+    def finish(self, final_text=None):
+        """
+        Beendet den Stream; der Rest wird noch eingefügt.
+
+        Args:
+            final_text (str): Vollständiger Text, falls keine Chunks kamen (z.B. Diff-Modus)
+        """
+        with self._cond:
+            if self._done:
+                return
+            if self.chunks == 0 and final_text:
+                self._push(self.pipeline.feed(final_text))
+            self._push(self.pipeline.finish())
+            self._done = True
+            self._cond.notify()
+
+    def cancel(self):
+        """Bricht ab: noch nicht eingefügter Text wird verworfen."""
+        with self._cond:
+            self._cancelled = True
+            self._done = True
+            self._pending = []
+            self._pending_chars = 0
+            self._cond.notify()
+
+    def join(self, timeout=None):
+        """Wartet, bis alles eingefügt ist."""
+        self._thread.join(timeout)
+
+    @property
+    def text(self):
+        """Der eingefügte bzw. zum Einfügen festgeschriebene Text."""
+        return self.pipeline.text
+
+    @property
+    def time_to_first_visible(self):
+        """Sekunden von started_at bis zum ersten eingefügten Block (None, solange nichts sichtbar ist)."""
+        if self.first_visible_at is None:
+            return None
+        return self.first_visible_at - self.started_at
+
+    def _push(self, text):
+        if text:
+            self._pending.append(text)
+            self._pending_chars += len(text)
+            self._cond.notify()
+
+    def _run(self):
+        first = True
+        while True:
+            with self._cond:
+                while not self._pending and not self._done:
+                    self._cond.wait()
+                if self._cancelled or not self._pending:
+                    return
+                batch = "".join(self._pending)
+                self.max_backlog = max(self.max_backlog, self._pending_chars)
+                self._pending = []
+                self._pending_chars = 0
+            if self.is_current is not None and not self.is_current():
+                self.cancel()
+                return
+            if first:
+                first = False
+                if self.start_delay:
+                    time.sleep(self.start_delay)
+            try:
+                self.insert_fn(batch)
+            except Exception as e:
+                debug = get_debug_logger() if get_debug_logger else None
+                if debug:
+                    debug.log_exception("Fehler beim Einfügen eines Stream-Blocks", e)
+            self.batches += 1
+            if self.first_visible_at is None:
+                self.first_visible_at = time.monotonic()
+                debug = get_debug_logger() if get_debug_logger else None
+                if debug:
+                    since_chunk = (f", {self.first_visible_at - self.first_chunk_at:.3f}s nach dem ersten Chunk"
+                                   if self.first_chunk_at is not None else "")
+                    debug.log_performance("Zeit bis zum ersten sichtbaren Zeichen", self.time_to_first_visible,
+                                          f"Block: {len(batch)} Zeichen{since_chunk}")
+
+    def summary(self):
+        """Kurzbeschreibung für das Debug-Log."""
+        ttfv = self.time_to_first_visible
+        ttfv_text = f"{ttfv:.3f}s" if ttfv is not None else "-"
+        return (f"{self.chunks} Chunks in {self.batches} Blöcken eingefügt, {len(self.text)} Zeichen, "
+                f"max. Rückstau: {self.max_backlog} Zeichen, erstes sichtbares Zeichen nach {ttfv_text}")
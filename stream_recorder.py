@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+from config import get_appdata_path
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+RECORDING_DIR_NAME = "stream_recordings"
+FIXTURE_VERSION = 1
+
+_file_counter_lock = threading.Lock()
+_file_counter = 0
+
+
+class StreamRecorder:
+    """
+    Zeichnet einen Stream für die spätere Wiedergabe auf.
+
+    Pro Chunk werden Text und Ankunftszeit (Millisekunden seit Request-Start) gespeichert.
+    Das Fixture ist ein kompaktes JSON: {"version", "model", "input_chars", "recorded_at",
+    "chunks": [[offset_ms, text], ...]}.
+    """
+
+    def __init__(self, model, input_chars=0, directory=None):
+        self.model = model
+        self.input_chars = input_chars
+        self.directory = directory or get_appdata_path(RECORDING_DIR_NAME)
+        self.started = time.monotonic()
+        self.chunks = []
+
+    def chunk(self, text):
+        """Merkt sich einen Text-Chunk mit seiner Ankunftszeit."""
+        self.chunks.append([round((time.monotonic() - self.started) * 1000, 1), text])
+
+    def save(self):
+        """
+        Schreibt das Fixture (nur wenn Chunks vorliegen).
+
+        Returns:
+            str: Pfad der Datei oder None
+        """
+        global _file_counter
+        if not self.chunks:
+            return None
+        with _file_counter_lock:
+            _file_counter += 1
+            counter = _file_counter
+        safe_model = "".join(c if c.isalnum() or c in "-." else "_" for c in self.model)
+        filename = f"stream_{time.strftime('%Y%m%d_%H%M%S')}_{counter:03d}_{safe_model}.json"
+        path = os.path.join(self.directory, filename)
+        fixture = {
+            "version": FIXTURE_VERSION,
+            "model": self.model,
+            "input_chars": self.input_chars,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "chunks": self.chunks,
+        }
+        debug = get_debug_logger() if get_debug_logger else None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(fixture, f, ensure_ascii=False, separators=(",", ":"))
+        except OSError as e:
+            if debug:
+                debug.log("Stream-Aufzeichnung nicht speicherbar", f"Fehler: {e}", level="WARNING")
+            return None
+        if debug:
+            debug.log("Stream aufgezeichnet", f"{len(self.chunks)} Chunks, TTFB: {self.chunks[0][0]:.0f}ms, "
+                                              f"Dauer: {self.chunks[-1][0]:.0f}ms, Datei: {path}")
+        return path
+
+
+def load_fixture(path):
+    """Lädt ein Fixture und prüft das Format (ValueError bei ungültiger Datei)."""
+    with open(path, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+    if not isinstance(fixture, dict) or fixture.get("version") != FIXTURE_VERSION:
+        raise ValueError(f"Unbekanntes Fixture-Format: {path}")
+    fixture["chunks"] = [(float(offset), str(text)) for offset, text in fixture.get("chunks", [])]
+    return fixture
+
+
+def list_fixtures(path):
+    """Gibt die Fixture-Dateien zurück (eine Datei oder alle .json eines Verzeichnisses, sortiert)."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+    return [path] if os.path.exists(path) else []
+
+
+def _delays(fixture, speed):
+    """Wartezeiten vor jedem Chunk in Sekunden (Originaltiming geteilt durch speed)."""
+    speed = speed if speed and speed > 0 else 1.0
+    previous = 0.0
+    for offset, text in fixture["chunks"]:
+        yield max(0.0, (offset - previous) / 1000.0 / speed), text
+        previous = offset
+
+
+def replay_chunks(fixture, speed=1.0, deadline=None):
+    """Liefert die Chunks eines Fixtures blockierend im aufgezeichneten (skalierten) Takt."""
+    for delay, text in _delays(fixture, speed):
+        if delay:
+            time.sleep(delay if deadline is None else min(delay, deadline.remaining()))
+        if deadline is not None:
+            deadline.check()
+        yield text
+
+
+async def replay_chunks_async(fixture, speed=1.0, deadline=None):
+    """Async-Gegenstück zu replay_chunks."""
+    for delay, text in _delays(fixture, speed):
+        if delay:
+            await asyncio.sleep(delay if deadline is None else min(delay, deadline.remaining()))
+        if deadline is not None:
+            deadline.check()
+        yield text
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pytest
+
+from clipboard_watcher import ClipboardWatcher, X11ClipboardWatcher
+
+
+class _EarlyChangeWatcher(ClipboardWatcher):
+    """Meldet die Änderung sofort, der Text ist aber erst nach einigen Lesevorgängen da (wie EmptyClipboard)."""
+
+    def __init__(self, reads):
+        self.reads = list(reads)
+
+    def wait_for_change(self, timeout):
+        return True
+
+    def read(self):
+        return self.reads.pop(0) if len(self.reads) > 1 else self.reads[0]
+
+
+def test_capture_rereads_until_text_arrives():
+    assert _EarlyChangeWatcher(["", "", "Neue Auswahl"]).capture(1.0) == "Neue Auswahl"
+
+
+def test_capture_gives_up_after_timeout():
+    assert _EarlyChangeWatcher([""]).capture(0.1) == ""
+
+
+@pytest.mark.skipif(sys.platform == "win32" or not os.environ.get("DISPLAY"),
+                    reason="benötigt ein X-Display (z.B. xvfb-run python -m pytest)")
+def test_x11_watcher_sees_owner_change():
+    tk = pytest.importorskip("tkinter")
+    from clipboard_backend import TkClipboard
+
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        clipboard = TkClipboard(root)
+        try:
+            watcher = X11ClipboardWatcher(clipboard=clipboard)
+        except OSError as e:
+            pytest.skip(f"XFixes nicht verfügbar: {e}")
+        try:
+            watcher.arm()
+            assert not watcher.wait_for_change(0.1)
+            clipboard.copy("Neue Auswahl")
+            assert watcher.capture(1.0) == "Neue Auswahl"
+        finally:
+            watcher.close()
+    finally:
+        root.destroy()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from deadline import AdaptiveTimeout, Deadline, DeadlineExceeded
+
+
+def test_deadline_remaining_and_expiry():
+    deadline = Deadline(0.05)
+    assert 0 < deadline.remaining() <= 0.05
+    assert not deadline.expired()
+    deadline.check()
+    assert deadline.timeout_for(cap=0.01) == 0.01
+    time.sleep(0.06)
+    assert deadline.remaining() == 0.0
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+
+def test_deadline_cancel():
+    deadline = Deadline(60)
+    deadline.cancel()
+    assert deadline.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+
+def test_request_ids_increase():
+    first, second = Deadline(1), Deadline(1)
+    assert second.request_id > first.request_id
+    assert Deadline(1, request_id=42).request_id == 42
+
+
+def test_estimate_uses_defaults_without_samples():
+    timeout = AdaptiveTimeout()
+    assert timeout.estimate("m", 500) == AdaptiveTimeout.DEFAULT_TTFB + 500 / AdaptiveTimeout.DEFAULT_THROUGHPUT
+    assert timeout.estimate("m", 500, 1000) == AdaptiveTimeout.DEFAULT_TTFB + 1000 / AdaptiveTimeout.DEFAULT_THROUGHPUT
+
+
+def test_record_learns_ttfb_and_throughput():
+    timeout = AdaptiveTimeout()
+    timeout.record("m", 1.0, 1000, 3.0)  # 1000 Zeichen in 2s Streaming
+    assert timeout.estimate("m", 1000) == pytest.approx(1.0 + 1000 / 500)
+    timeout.record("m", 2.0, 1000, 4.0)  # Gleitender Mittelwert
+    assert timeout.estimate("m", 0) == pytest.approx(0.7 * 1.0 + 0.3 * 2.0)
+    # Ungültige Messungen werden ignoriert
+    timeout.record("m", None, 1000, 3.0)
+    timeout.record("m", 1.0, 1000, 0)
+    assert timeout.estimate("m", 0) == pytest.approx(1.3)
+
+
+def test_timeout_is_clamped():
+    timeout = AdaptiveTimeout(min_timeout=15, max_timeout=60, safety_factor=3)
+    timeout.record("fast", 0.1, 10000, 1.1)
+    assert timeout.timeout_for("fast", 100) == 15
+    assert timeout.timeout_for("slow", 100000) == 60
+    assert timeout.timeout_for("slow", 500) == pytest.approx(3 * (5.0 + 500 / 100.0))
+
+
+def test_new_deadline_uses_timeout():
+    timeout = AdaptiveTimeout(min_timeout=20, max_timeout=20)
+    assert timeout.new_deadline("m", 100).timeout == 20
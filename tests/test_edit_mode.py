@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from edit_mode import EditListError, apply_edits, parse_edits
+
+
+def test_parse_edits_plain_and_fenced():
+    response = '[{"alt": "Kollege", "neu": "Kollegen"}, {"alt": "das wir", "neu": "dass wir"}]'
+    expected = [("Kollege", "Kollegen"), ("das wir", "dass wir")]
+    assert parse_edits(response) == expected
+    assert parse_edits(f"```json\n{response}\n```") == expected
+    assert parse_edits(f"  ```\n{response}\n```  ") == expected
+
+
+def test_parse_edits_english_keys_and_empty_list():
+    assert parse_edits('[{"old": "a", "new": ""}]') == [("a", "")]
+    assert parse_edits("[]") == []
+
+
+@pytest.mark.parametrize("response", [
+    None,
+    "",
+    "Hier sind die Änderungen",
+    '{"alt": "a", "neu": "b"}',
+    '["a"]',
+    '[{"alt": "", "neu": "b"}]',
+    '[{"alt": "a"}]',
+    '[{"alt": 1, "neu": "b"}]',
+])
+def test_parse_edits_rejects_invalid(response):
+    with pytest.raises(EditListError):
+        parse_edits(response)
+
+
+def test_apply_edits_in_order():
+    text = "Ich habe mit meinem Kollege gesprochen, das wir starten."
+    edits = [("Kollege", "Kollegen"), ("das wir", "dass wir")]
+    assert apply_edits(text, edits) == "Ich habe mit meinem Kollegen gesprochen, dass wir starten."
+
+
+def test_apply_edits_searches_after_previous_edit():
+    # Gleicher Ausschnitt zweimal: die zweite Ersetzung trifft das zweite Vorkommen
+    assert apply_edits("a b a", [("a", "x"), ("a", "y")]) == "x b y"
+    # Ersetzter Text wird nicht erneut getroffen
+    assert apply_edits("ab", [("a", "b"), ("b", "c")]) == "bc"
+
+
+def test_apply_edits_without_edits_returns_original():
+    assert apply_edits("unverändert", []) == "unverändert"
+
+
+def test_apply_edits_missing_or_out_of_order():
+    with pytest.raises(EditListError):
+        apply_edits("Hallo Welt", [("Mond", "Sonne")])
+    with pytest.raises(EditListError):
+        apply_edits("eins zwei", [("zwei", "2"), ("eins", "1")])
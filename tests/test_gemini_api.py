@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import itertools
+import time
+
+import pytest
+
+import gemini_api
+from gemini_api import (CircuitBreaker, CircuitOpenError, _retry_delay, call_with_retry, call_with_retry_async,
+                        classify_error)
+
+
+class ApiError(Exception):
+    """Nachbildung der SDK-Fehler: HTTP-Code in .code, Fehler-JSON in .details."""
+
+    def __init__(self, code, details=None, response=None):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.details = details
+        self.response = response
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeDeadline:
+    def __init__(self, remaining):
+        self._remaining = remaining
+
+    def remaining(self):
+        return self._remaining
+
+    def check(self):
+        pass
+
+
+_models = itertools.count()
+
+
+@pytest.fixture
+def model():
+    """Eigenes Modell pro Test (die Breaker sind global pro Modell)."""
+    return f"test-model-{next(_models)}"
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setitem(gemini_api._transport_config, "base_delay", 0.0)
+    monkeypatch.setitem(gemini_api._transport_config, "max_attempts", 3)
+    monkeypatch.setitem(gemini_api._transport_config, "failure_threshold", 5)
+
+
+def _rate_limit(delay="17s"):
+    return ApiError(429, {"error": {"details": [
+        {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": delay}]}})
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (_rate_limit(), ("rate_limit", 17.0)),
+    (ApiError(429, response=Response({"retry-after": "3"})), ("rate_limit", 3.0)),
+    (ApiError(503), ("overloaded", None)),
+    (ApiError(500), ("server", None)),
+    (ApiError(504), ("server", None)),
+    (ApiError(400), ("client", None)),
+    (ApiError(404), ("client", None)),
+    (ConnectionError("weg"), ("network", None)),
+    (TimeoutError(), ("network", None)),
+    (ValueError("kaputt"), ("unknown", None)),
+    (CircuitOpenError("offen"), ("unknown", None)),
+])
+def test_classify_error(exc, expected):
+    assert classify_error(exc) == expected
+
+
+def test_retry_delay(monkeypatch):
+    monkeypatch.setitem(gemini_api._transport_config, "base_delay", 0.5)
+    assert 0 <= _retry_delay(1, "server", None, None) <= 0.5
+    assert 0 <= _retry_delay(2, "network", None, None) <= 1.0
+    # Server-Hinweis ist die Untergrenze
+    assert _retry_delay(1, "rate_limit", 5.0, None) == 5.0
+    # Kein Retry: letzter Versuch, Client-Fehler, Frist reicht nicht
+    assert _retry_delay(3, "server", None, None) is None
+    assert _retry_delay(1, "client", None, None) is None
+    assert _retry_delay(1, "rate_limit", 5.0, FakeDeadline(2.0)) is None
+
+
+def test_call_with_retry_recovers_from_transient_errors(model):
+    errors = [ApiError(503), ConnectionError("weg")]
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert call_with_retry(model, attempt) == "ok"
+    assert len(calls) == 3
+    assert gemini_api.get_circuit_breaker(model).failures == 0
+
+
+def test_call_with_retry_does_not_retry_client_errors(model):
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        raise ApiError(400)
+
+    with pytest.raises(ApiError):
+        call_with_retry(model, attempt)
+    assert len(calls) == 1
+
+
+def test_call_with_retry_gives_up_after_max_attempts(model):
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        raise ApiError(500)
+
+    with pytest.raises(ApiError):
+        call_with_retry(model, attempt)
+    assert len(calls) == 3
+
+
+def test_call_with_retry_async(model):
+    errors = [ApiError(429)]
+
+    async def attempt():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(call_with_retry_async(model, attempt)) == "ok"
+
+
+def test_breaker_opens_and_rejects_requests(model, monkeypatch):
+    monkeypatch.setitem(gemini_api._transport_config, "failure_threshold", 2)
+    calls = []
+
+    def attempt():
+        calls.append(1)
+        raise ApiError(503)
+
+    with pytest.raises(ApiError):
+        call_with_retry(model, attempt)
+    assert gemini_api.get_circuit_breaker(model).state == "open"
+    assert len(calls) == 2  # Offener Breaker beendet die Retries
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(model, attempt)
+    assert len(calls) == 2
+
+
+def test_breaker_half_open_probe():
+    breaker = CircuitBreaker("probe", failure_threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    breaker.before_request()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    breaker.before_request()  # Genau ein Probe-Request
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    # Fehlgeschlagene Probe öffnet erneut, erfolgreiche schließt
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_release_probe_keeps_half_open():
+    breaker = CircuitBreaker("release", failure_threshold=1, cooldown=0.0)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.release_probe()
+    assert breaker.state == "half_open"
+    breaker.before_request()  # Slot ist wieder frei
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from model_router import TIER_FLASH, TIER_LITE, TIER_PRO, ModelRouter, model_tier
+
+
+POOL = ("gemini-2.5-flash", "gemini-2.5-flash-lite", "gemini-2.5-pro")
+SHORT = "x" * 40
+MEDIUM = "x" * 2000
+LONG = "x" * 8000
+
+
+class FixedLatency:
+    """Erwartete Dauer pro Modell (wie AdaptiveTimeout.estimate)."""
+
+    def __init__(self, **seconds):
+        self.seconds = seconds
+
+    def estimate(self, model, input_chars):
+        return self.seconds.get(model.replace("gemini-2.5-", "").replace("-", "_"), 1.0)
+
+
+def _router(**seconds):
+    return ModelRouter(FixedLatency(**seconds), candidates=POOL, latency_slo=8.0)
+
+
+@pytest.mark.parametrize("model, tier", [
+    ("gemini-2.5-flash-lite", TIER_LITE),
+    ("gemini-2.5-pro", TIER_PRO),
+    ("gemini-3-pro-preview", TIER_PRO),
+    ("gemini-2.5-flash", TIER_FLASH),
+    ("llama3.1:8b", TIER_FLASH),
+])
+def test_model_tier(model, tier):
+    assert model_tier(model) == tier
+
+
+@pytest.mark.parametrize("text, expected", [
+    (SHORT, "gemini-2.5-flash-lite"),
+    (MEDIUM, "gemini-2.5-flash"),
+    (LONG, "gemini-2.5-pro"),
+])
+def test_length_picks_tier(text, expected):
+    assert _router().choose(text, "", "gemini-2.5-flash")[0] == expected
+
+
+def test_slow_model_falls_back_to_nearest_tier():
+    router = _router(pro=20.0)
+    assert router.choose(LONG, "", "gemini-2.5-flash")[0] == "gemini-2.5-flash"
+
+
+def test_failing_model_is_avoided():
+    router = _router()
+    for success in (False, False, True):
+        router.record("gemini-2.5-flash-lite", success)
+    assert router.error_rate("gemini-2.5-flash-lite") == pytest.approx(2 / 3)
+    assert router.choose(SHORT, "", "gemini-2.5-flash")[0] == "gemini-2.5-flash"
+
+
+def test_error_rate_needs_min_samples():
+    router = _router()
+    router.record("gemini-2.5-flash-lite", False)
+    assert router.error_rate("gemini-2.5-flash-lite") == 0.0
+
+
+def test_fastest_model_when_no_model_meets_slo():
+    router = _router(flash=12.0, flash_lite=15.0, pro=30.0)
+    model, reason = router.choose(LONG, "", "gemini-2.5-flash")
+    assert model == "gemini-2.5-flash"
+    assert "SLO" in reason
+
+
+def test_default_model_preferred_within_tier():
+    router = ModelRouter(FixedLatency(), candidates=("gemini-2.5-flash", "gemini-2.0-flash"), latency_slo=8.0)
+    assert router.choose(MEDIUM, "", "gemini-2.0-flash")[0] == "gemini-2.0-flash"
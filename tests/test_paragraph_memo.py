@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from paragraph_memo import ParagraphMemo
+
+
+TEXT = "erster absatz\n\nzweiter absatz\n\ndritter absatz"
+IMPROVED = "Erster Absatz.\n\nZweiter Absatz.\n\nDritter Absatz."
+
+
+@pytest.fixture
+def memo(tmp_path):
+    return ParagraphMemo(path=str(tmp_path / "paragraph_memo.json"), save_delay=60)
+
+
+def test_plan_without_entries(memo):
+    assert memo.plan("m", "p", TEXT) is None
+
+
+def test_remember_and_plan(memo):
+    assert memo.remember("m", "p", TEXT, IMPROVED) == 3
+    edited = "erster absatz\n\nganz neuer absatz\n\ndritter absatz"
+    plan = memo.plan("m", "p", edited)
+    assert plan["known"] == {0: "Erster Absatz.", 2: "Dritter Absatz."}
+    assert (plan["hits"], plan["total"]) == (2, 3)
+    assert plan["segments"][1] == ("ganz neuer absatz", "\n\n")
+    assert plan["saved_tokens"] > 0
+
+
+def test_key_includes_model_and_prompt(memo):
+    memo.remember("m", "p", TEXT, IMPROVED)
+    assert memo.plan("m2", "p", TEXT) is None
+    assert memo.plan("m", "p2", TEXT) is None
+
+
+def test_whitespace_changes_hit_the_same_entry(memo):
+    memo.remember("m", "p", TEXT, IMPROVED)
+    plan = memo.plan("m", "p", "erster   absatz\n\nzweiter\nabsatz\n\nneu")
+    assert plan["known"] == {0: "Erster Absatz.", 1: "Zweiter Absatz."}
+
+
+def test_remember_rejects_mismatched_paragraphs(memo):
+    assert memo.remember("m", "p", TEXT, "Alles in einem Absatz.") == 0
+    assert memo.remember("m", "p", "nur ein absatz", "Nur ein Absatz.") == 0
+    assert memo.remember("m", "p", TEXT, "") == 0
+
+
+def test_unmask_maps_to_original_paragraphs(memo):
+    restore = {"[[1]]": "https://example.com"}.get
+
+    def unmask(paragraph):
+        return restore(paragraph, paragraph)
+
+    memo.remember("m", "p", "[[1]]\n\nzweiter absatz", "[[1]]\n\nZweiter Absatz.", unmask=unmask)
+    plan = memo.plan("m", "p", "https://example.com\n\nanderer absatz")
+    assert plan["known"] == {0: "https://example.com"}
+
+
+def test_lru_limit(tmp_path):
+    memo = ParagraphMemo(path=str(tmp_path / "paragraph_memo.json"), max_entries=2, save_delay=60)
+    memo.remember("m", "p", TEXT, IMPROVED)
+    assert memo.get_stats()["entries"] == 2
+    assert memo.plan("m", "p", "erster absatz\n\nneu") is None
+
+
+def test_flush_persists_entries(memo, tmp_path):
+    memo.remember("m", "p", TEXT, IMPROVED)
+    assert not (tmp_path / "paragraph_memo.json").exists()
+    memo.flush()
+    reloaded = ParagraphMemo(path=str(tmp_path / "paragraph_memo.json"))
+    assert reloaded.plan("m", "p", TEXT)["hits"] == 3
+    memo.clear()
+    assert not (tmp_path / "paragraph_memo.json").exists()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import itertools
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import gemini_api
+from providers import OpenAICompatibleProvider, ProviderHTTPError, _SSE_DONE, _parse_sse_line
+
+
+def _event(content=None, role=None):
+    delta = {}
+    if role:
+        delta["role"] = role
+    if content is not None:
+        delta["content"] = content
+    return "data: " + json.dumps({"choices": [{"index": 0, "delta": delta}]})
+
+
+SSE_BODY = "\n\n".join([
+    ": keep-alive",
+    _event(role="assistant"),
+    _event("Hallo"),
+    _event(", Welt"),
+    _event("!"),
+    "data: [DONE]",
+    _event("nach dem Ende"),
+]) + "\n\n"
+
+
+@pytest.mark.parametrize("line, expected", [
+    (_event("Hallo"), "Hallo"),
+    ("data:" + json.dumps({"choices": [{"delta": {"content": "x"}}]}), "x"),
+    (_event(role="assistant"), None),
+    ("data: " + json.dumps({"choices": []}), None),
+    (": kommentar", None),
+    ("", None),
+    ("event: ping", None),
+    ("data: {kaputt", None),
+])
+def test_parse_sse_line(line, expected):
+    assert _parse_sse_line(line) == expected
+
+
+def test_parse_sse_done():
+    assert _parse_sse_line("data: [DONE]") is _SSE_DONE
+    assert _parse_sse_line("  data:[DONE]  ") is _SSE_DONE
+
+
+def test_parse_sse_error_event():
+    with pytest.raises(ProviderHTTPError) as info:
+        _parse_sse_line('data: {"error": {"message": "Modell nicht geladen", "code": 503}}')
+    assert info.value.code == 503
+    with pytest.raises(ProviderHTTPError) as info:
+        _parse_sse_line('data: {"error": "kaputt"}')
+    assert info.value.code == 500
+
+
+_models = itertools.count()
+
+
+@pytest.fixture
+def model():
+    return f"local-model-{next(_models)}"
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setitem(gemini_api._transport_config, "base_delay", 0.0)
+
+
+def _provider(handler):
+    provider = OpenAICompatibleProvider("http://localhost:8080")
+    transport = httpx.MockTransport(handler)
+    provider._client = httpx.Client(transport=transport)
+    provider._get_async_client = lambda: httpx.AsyncClient(transport=transport)
+    return provider
+
+
+def _sse_handler(requests):
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, text=SSE_BODY, headers={"Content-Type": "text/event-stream"})
+    return handler
+
+
+def test_stream_collects_deltas_until_done(model):
+    requests = []
+    chunks = []
+    result = _provider(_sse_handler(requests)).improve_stream("hallo welt", model, "Verbessere.", chunks.append)
+    assert result == "Hallo, Welt!"
+    assert chunks == ["Hallo", ", Welt", "!"]
+    assert str(requests[0].url) == "http://localhost:8080/v1/chat/completions"
+    payload = json.loads(requests[0].content)
+    assert payload["stream"] is True
+    assert payload["messages"] == [{"role": "system", "content": "Verbessere."},
+                                   {"role": "user", "content": "hallo welt"}]
+
+
+def test_async_stream(model):
+    chunks = []
+    provider = _provider(_sse_handler([]))
+    result = asyncio.run(provider.improve_async("hallo welt", model, "Verbessere.", chunks.append))
+    assert result == "Hallo, Welt!"
+    assert chunks == ["Hallo", ", Welt", "!"]
+
+
+def test_stream_retries_server_errors(model):
+    responses = [httpx.Response(503, json={"error": {"message": "überlastet"}})]
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if responses:
+            return responses.pop(0)
+        return httpx.Response(200, text=SSE_BODY)
+
+    assert _provider(handler).improve_stream("hallo welt", model, "Verbessere.", None) == "Hallo, Welt!"
+    assert len(requests) == 2
+
+
+def test_stream_client_error_returns_none(model):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(404, json={"error": {"message": "Modell unbekannt"}})
+
+    assert _provider(handler).improve_stream("hallo welt", model, "Verbessere.", None) is None
+    assert len(requests) == 1
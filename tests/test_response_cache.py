@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+from response_cache import ResponseCache
+
+
+def _cache(tmp_path, **kwargs):
+    kwargs.setdefault("save_delay", 60)  # Geschrieben wird in den Tests nur per flush()
+    return ResponseCache(directory=str(tmp_path / "cache"), **kwargs)
+
+
+def test_put_and_get(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("m", "p", "text") is None
+    cache.put("m", "p", "text", "Text")
+    assert cache.get("m", "p", "text") == "Text"
+    # Modell, Prompt und Text gehören zum Schlüssel
+    assert cache.get("m2", "p", "text") is None
+    assert cache.get("m", "p2", "text") is None
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_disk_write_is_deferred_until_flush(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("m", "p", "text", "Text")
+    assert os.listdir(tmp_path / "cache") == []
+    cache.flush()
+    assert len(os.listdir(tmp_path / "cache")) == 1
+    assert _cache(tmp_path).get("m", "p", "text") == "Text"
+
+
+def test_timer_writes_pending_entries(tmp_path):
+    cache = _cache(tmp_path, save_delay=0.05)
+    cache.put("m", "p", "text", "Text")
+    deadline = time.monotonic() + 2
+    while not os.listdir(tmp_path / "cache") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(os.listdir(tmp_path / "cache")) == 1
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=0.05)
+    cache.put("m", "p", "text", "Text")
+    cache.flush()
+    time.sleep(0.1)
+    assert cache.get("m", "p", "text") is None
+    assert cache.get_stats()["expired"] == 1
+    assert os.listdir(tmp_path / "cache") == []
+
+
+def test_memory_lru(tmp_path):
+    cache = _cache(tmp_path, max_memory_entries=2, max_disk_bytes=0)
+    cache.put("m", "p", "a", "A")
+    cache.put("m", "p", "b", "B")
+    assert cache.get("m", "p", "a") == "A"
+    cache.put("m", "p", "c", "C")
+    assert cache.get("m", "p", "b") is None
+    assert cache.get("m", "p", "a") == "A"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_disk_budget_evicts_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, max_memory_entries=1, max_disk_bytes=180)
+    for name in ("a", "b", "c"):
+        cache.put("m", "p", name, name.upper() * 20)
+        cache.flush()
+        time.sleep(0.01)
+    stats = cache.get_stats()
+    assert stats["disk_bytes"] <= 180
+    assert stats["evictions"] >= 1
+    assert cache.get("m", "p", "a") is None
+    assert cache.get("m", "p", "c") == "C" * 20
+
+
+def test_clear_drops_pending_writes(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("m", "p", "text", "Text")
+    cache.clear()
+    cache.flush()
+    assert os.listdir(tmp_path / "cache") == []
+    assert cache.get("m", "p", "text") is None
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+import pytest
+
+from stream_filters import ContinuationStitcher, clean_text, default_pipeline
+
+
+def _stream(text, source_text, seed):
+    """Füttert die Standard-Kette in zufälligen Chunks und gibt den Gesamttext zurück."""
+    rng = random.Random(seed)
+    pipeline = default_pipeline(source_text)
+    parts = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 5)
+        parts.append(pipeline.feed(text[position:position + size]))
+        position += size
+    parts.append(pipeline.finish())
+    return "".join(parts)
+
+
+CASES = [
+    # (Ausgabe, Originaltext, erwartet)
+    ("Hier ist der verbesserte Text:\n\nHallo Welt.", "hallo welt", "Hallo Welt."),
+    ("Sure! Here is the improved text:\n\"Hi\"", "hi", "Hi"),
+    ("Hier ist der verbesserte Text: gut", "Hier ist der verbesserte Text: gut", "Hier ist der verbesserte Text: gut"),
+    ("```\nHallo\n```", "hallo", "Hallo"),
+    ("```text\nHallo\n```\n", "hallo", "Hallo"),
+    ("\"Hallo Welt\"", "hallo welt", "Hallo Welt"),
+    ("\"'x y'\"", "x y", "x y"),
+    ("  \"abc\"  ", "abc", "abc"),
+    ("\"abc\"", "\"abc\"", "\"abc\""),
+    ("Text mit \"Zitat\"", "text mit zitat", "Text mit \"Zitat\""),
+    ("A  \r\nB\n\n\n\nC  ", "A\nB\n\nC", "A\nB\n\nC"),
+]
+
+
+@pytest.mark.parametrize("output, source_text, expected", CASES)
+def test_clean_text(output, source_text, expected):
+    assert clean_text(output, source_text) == expected
+
+
+@pytest.mark.parametrize("output, source_text, expected", CASES)
+def test_streaming_matches_clean_text(output, source_text, expected):
+    for seed in range(20):
+        assert _stream(output, source_text, seed) == expected
+
+
+def test_unbalanced_leading_quote_is_kept():
+    # Regression: das öffnende Anführungszeichen wurde ohne schließendes entfernt
+    text = "\"Hallo\", sagte sie."
+    assert clean_text(text, "hallo sagte sie") == text
+    for seed in range(20):
+        assert _stream(text, "hallo sagte sie", seed) == text
+
+
+def test_quote_only_output():
+    assert clean_text("\"", "x") == "\""
+    assert clean_text("\"\"", "x") == ""
+
+
+PREFIX = "Das ist der erste Teil des Textes, der schon eingefügt wurde. Und dann"
+
+
+def _stitch(prefix, text, seed):
+    """Füttert die Fortsetzung in zufälligen Chunks; gibt (Text, verworfene Zeichen) zurück."""
+    rng = random.Random(seed)
+    stitcher = ContinuationStitcher(prefix)
+    parts = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 5)
+        parts.append(stitcher.feed(text[position:position + size]))
+        position += size
+    parts.append(stitcher.finish())
+    return "".join(parts), stitcher.dropped
+
+
+@pytest.mark.parametrize("continuation, expected, dropped", [
+    # Wiederholtes Ende ab Wortgrenze wird verworfen
+    ("Und dann kam der Rest.", " kam der Rest.", 8),
+    ("dann kam", " kam", 4),
+    # Neubeginn: der bereits erhaltene Teil wird übersprungen
+    (PREFIX + " kam der Rest.", " kam der Rest.", len(PREFIX)),
+    # Nahtlose Fortsetzung bleibt unverändert
+    (" kam der Rest.", " kam der Rest.", 0),
+    # Übereinstimmung mitten im Wort ist keine Wiederholung
+    ("ann kam", "ann kam", 0),
+])
+def test_continuation_stitcher(continuation, expected, dropped):
+    for seed in range(20):
+        assert _stitch(PREFIX, continuation, seed) == (expected, dropped)
+
+
+def test_continuation_stitcher_without_prefix():
+    assert _stitch("", "abc", 0) == ("abc", 0)
+    assert _stitch(PREFIX, "", 0) == ("", 0)
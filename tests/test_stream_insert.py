@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from stream_insert import StreamInserter
+
+
+def _insert(chunks, source_text):
+    inserted = []
+    inserter = StreamInserter(inserted.append, source_text=source_text, start_delay=0)
+    for chunk in chunks:
+        inserter.feed(chunk)
+    inserter.finish()
+    inserter.join(timeout=5)
+    return "".join(inserted)
+
+
+def test_wrapping_quotes_are_removed():
+    assert _insert(['"Hallo', ' Welt', '"'], "hallo welt") == "Hallo Welt"
+
+
+def test_unbalanced_leading_quote_is_kept():
+    # Regression: beim Einfügen während des Streams fehlte das öffnende Anführungszeichen
+    assert _insert(['"Hallo"', ', sagte', ' sie.'], "hallo sagte sie") == '"Hallo", sagte sie.'
+
+
+def test_final_text_without_chunks():
+    assert _insert([], "x") == ""
+    inserted = []
+    inserter = StreamInserter(inserted.append, source_text="x", start_delay=0)
+    inserter.finish("Fertiger Text")
+    inserter.join(timeout=5)
+    assert "".join(inserted) == "Fertiger Text"
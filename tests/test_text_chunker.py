@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from text_chunker import CHARS_PER_TOKEN, estimate_tokens, split_paragraphs, split_text
+
+
+TEXT = ("Erster Satz hier. Zweiter Satz folgt! Dritter?\n\n"
+        "Neuer Absatz mit Text.\n  \n\n"
+        "Letzter Absatz.")
+
+
+def _join(parts):
+    return "".join(part + separator for part, separator in parts)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("x" * 40) == 11
+
+
+def test_split_paragraphs_keeps_separators():
+    assert split_paragraphs(TEXT) == [
+        ("Erster Satz hier. Zweiter Satz folgt! Dritter?", "\n\n"),
+        ("Neuer Absatz mit Text.", "\n  \n\n"),
+        ("Letzter Absatz.", ""),
+    ]
+    assert split_paragraphs("") == []
+    # Leerzeilen am Anfang und Ende trennen keine Absätze
+    assert split_paragraphs("\n\nA\n\n") == [("\n\nA\n\n", "")]
+
+
+def test_short_text_is_one_segment():
+    assert split_text(TEXT, 100) == [(TEXT, "")]
+    assert split_text("", 10) == []
+
+
+@pytest.mark.parametrize("max_tokens", [3, 5, 8, 20])
+def test_split_text_round_trip_and_budget(max_tokens):
+    segments = split_text(TEXT, max_tokens)
+    assert _join(segments) == TEXT
+    for segment, _ in segments:
+        assert estimate_tokens(segment) <= max_tokens
+
+
+def test_split_text_prefers_paragraph_and_sentence_boundaries():
+    assert split_text(TEXT, 20) == [
+        ("Erster Satz hier. Zweiter Satz folgt! Dritter?\n\nNeuer Absatz mit Text.", "\n  \n\n"),
+        ("Letzter Absatz.", ""),
+    ]
+    assert split_text(TEXT, 8)[:3] == [
+        ("Erster Satz hier.", " "),
+        ("Zweiter Satz folgt!", " "),
+        ("Dritter?", "\n\n"),
+    ]
+
+
+def test_split_text_hard_splits_long_words():
+    text = "x" * 50
+    segments = split_text(text, 4)
+    assert _join(segments) == text
+    assert all(len(segment) <= 4 * CHARS_PER_TOKEN for segment, _ in segments)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+import pytest
+
+from text_masking import mask_text
+
+
+TEXTS = [
+    "Siehe https://example.com/pfad?x=1 und schreib an max.mustermann@example.org bitte.",
+    "Code:\n```\nprint('hi')\n```\nDanke",
+    "Nummer DE89 3704 0044 0532 0130 00 heute",
+    "Zweimal https://example.com/abc und https://example.com/abc",
+    "Traceback (most recent call last):\n  File \"a.py\", line 1, in <module>\nValueError: kaputt\nHilfe?",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_mask_restore_round_trip(text):
+    masked = mask_text(text)
+    assert masked
+    assert masked.text != text
+    assert masked.restore(masked.text) == text
+    assert masked.missing(masked.text) == []
+
+
+def test_masked_spans_are_replaced_by_placeholders():
+    masked = mask_text(TEXTS[0])
+    assert masked.text == "Siehe [[1]] und schreib an [[2]] bitte."
+    assert masked.kinds == {"url": 1, "email": 1}
+
+
+def test_identical_spans_share_a_placeholder():
+    masked = mask_text(TEXTS[3])
+    assert masked.text == "Zweimal [[1]] und [[1]]"
+    assert masked.placeholders == {1: "https://example.com/abc"}
+
+
+@pytest.mark.parametrize("text", ["kurz www.a.b", "Schon [[1]] drin https://example.com/abc", ""])
+def test_nothing_masked(text):
+    masked = mask_text(text)
+    assert not masked
+    assert masked.text == text
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_restorer_handles_split_placeholders(text):
+    masked = mask_text(text)
+    for seed in range(20):
+        rng = random.Random(seed)
+        restorer = masked.restorer()
+        parts = []
+        position = 0
+        while position < len(masked.text):
+            size = rng.randint(1, 4)
+            parts.append(restorer.feed(masked.text[position:position + size]))
+            position += size
+        parts.append(restorer.finish())
+        assert "".join(parts) == text
+
+
+def test_restore_keeps_unknown_and_unfinished_placeholders():
+    masked = mask_text(TEXTS[0])
+    assert masked.restore("[[1]] [[7]] [[2") == "https://example.com/pfad?x=1 [[7]] [[2"
+    assert masked.restore("[[ 2 ]]") == "max.mustermann@example.org"
+
+
+def test_missing_placeholders():
+    masked = mask_text(TEXTS[0])
+    assert masked.missing("Siehe [[2]].") == [1]
+    assert masked.missing("") == [1, 2]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from timing_profiles import KEY_WAIT_MAX, KEY_WAITS, TimingProfiles
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    return TimingProfiles(path=str(tmp_path / "timing_profiles.json"), save_delay=60)
+
+
+def _record(profiles, app, seconds, count=5):
+    for _ in range(count):
+        profiles.record(app, "clipboard_ready", seconds)
+
+
+def test_defaults_without_samples(profiles):
+    _record(profiles, "code", 0.01, count=2)
+    for name, default in KEY_WAITS.items():
+        assert profiles.key_wait("code", name) == default
+        assert profiles.key_wait(None, name) == default
+
+
+def test_fast_app_never_gets_shorter_key_waits(profiles):
+    _record(profiles, "code", 0.002)
+    for name, default in KEY_WAITS.items():
+        assert profiles.key_wait("code", name) == default
+
+
+def test_slow_app_gets_longer_key_waits(profiles):
+    _record(profiles, "soffice", 0.08)
+    assert profiles.key_wait("soffice", "app_ready") == pytest.approx(0.16)
+    _record(profiles, "soffice", 1.0)
+    assert profiles.key_wait("soffice", "after_backspace") == KEY_WAIT_MAX
+
+
+def test_samples_are_written_on_flush(profiles, tmp_path):
+    _record(profiles, "code", 0.05)
+    assert not (tmp_path / "timing_profiles.json").exists()
+    profiles.flush()
+    with open(tmp_path / "timing_profiles.json", encoding="utf-8") as f:
+        assert json.load(f)["apps"]["code"]["clipboard_ready"] == [0.05] * 5
+    profiles.reset()
+    assert not (tmp_path / "timing_profiles.json").exists()
+    assert profiles.apps() == []
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from token_estimator import TokenEstimator
+
+
+@pytest.fixture
+def estimator(tmp_path):
+    return TokenEstimator(path=str(tmp_path / "token_calibration.json"))
+
+
+def test_estimate_uses_default_ratio(estimator):
+    assert estimator.estimate("") == 0
+    assert estimator.estimate("x" * 40, "gemini-2.5-flash") == 11
+
+
+def test_calibrate_learns_ratio_and_caches_counts(estimator, tmp_path):
+    calls = []
+
+    def count(text):
+        calls.append(text)
+        return len(text) // 2
+
+    text = "x" * 400
+    assert estimator.calibrate("m", text, count) == 200
+    assert estimator.calibrate("m", text, count) == 200
+    assert len(calls) == 1
+    assert estimator.chars_per_token("m") == 2.0
+    assert estimator.estimate(text, "m") == 201
+
+    # Gespeichert und beim nächsten Start wieder geladen
+    with open(tmp_path / "token_calibration.json", encoding="utf-8") as f:
+        assert json.load(f)["m"]["samples"] == 1
+    assert TokenEstimator(path=str(tmp_path / "token_calibration.json")).chars_per_token("m") == 2.0
+
+
+def test_calibrate_ignores_failing_count(estimator):
+    def count(text):
+        raise RuntimeError("offline")
+
+    assert estimator.calibrate("m", "x" * 400, count) is None
+    assert estimator.chars_per_token("m") == 4.0
+
+
+def test_needs_calibration(estimator):
+    assert not estimator.needs_calibration("m", "kurz")
+    assert estimator.needs_calibration("m", "x" * 400)
+
+
+def test_plan_request_fits(estimator):
+    plan = estimator.plan_request("Hallo Welt", "Verbessere.", "gemini-2.5-flash", split_threshold=2000)
+    assert plan["model"] == "gemini-2.5-flash"
+    assert plan["fits"] and not plan["split"]
+
+
+def test_plan_request_splits_above_threshold(estimator):
+    plan = estimator.plan_request("x" * 10000, "Verbessere.", "gemini-2.5-flash", split_threshold=2000)
+    assert plan["split"]
+
+
+def test_plan_request_falls_back_to_larger_output_window(estimator):
+    # ~10000 Text-Tokens ergeben ~11500 Ausgabe-Tokens: zu viel für gemini-2.0-flash (8192)
+    plan = estimator.plan_request("x" * 40000, "Verbessere.", "gemini-2.0-flash")
+    assert plan["model"] == "gemini-2.5-flash"
+    assert plan["fits"] and not plan["split"]
+
+
+def test_plan_request_does_not_fit_anywhere(estimator):
+    plan = estimator.plan_request("x" * 400000, "Verbessere.", "gemini-2.5-flash")
+    assert not plan["fits"]
+    plan = estimator.plan_request("x" * 400000, "Verbessere.", "gemini-2.5-flash", split_threshold=2000)
+    assert plan["split"]
+
+
+def test_plan_request_keeps_model_without_candidates(estimator):
+    # Andere Backends: kein Wechsel auf ein Gemini-Modell
+    plan = estimator.plan_request("x" * 40000, "Verbessere.", "llama3.1:8b", candidates=["llama3.1:8b"])
+    assert plan["model"] == "llama3.1:8b"
+    assert not plan["fits"]
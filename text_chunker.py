@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+# Grobe Schätzung: ~4 Zeichen pro Token (für lateinische Schrift ausreichend genau)
+CHARS_PER_TOKEN = 4.0
+
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n\s*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])[\"'»«”“)\]]*\s+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def estimate_tokens(text):
+    """Schätzt die Anzahl Tokens eines Textes (lokal, ohne API-Aufruf)."""
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _split_keep_separators(text, pattern):
+    """
+    Teilt Text an einem Regex und behält die Trenner.
+
+    Returns:
+        list: Liste von (teil, trenner_danach) Tupeln; "".join(t + s) == text
+    """
+    parts = []
+    pos = 0
+    for match in pattern.finditer(text):
+        if match.start() == 0 or match.end() == len(text):
+            continue
+        parts.append((text[pos:match.start()], match.group(0)))
+        pos = match.end()
+    parts.append((text[pos:], ""))
+    return parts
+
+
+def split_paragraphs(text):
+    """
+    Teilt Text an Leerzeilen in Absätze.
+
+    Returns:
+        list: Liste von (absatz, trenner_danach) Tupeln; "".join(a + t) == text
+    """
+    if not text:
+        return []
+    return _split_keep_separators(text, _PARAGRAPH_RE)
+
+
+def _hard_split(text, max_chars):
+    """Teilt einen überlangen Satz an Leerzeichen (notfalls mitten im Wort)."""
+    parts = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            parts.append((text[:max_chars], ""))
+            text = text[max_chars:]
+        else:
+            parts.append((text[:cut], " "))
+            text = text[cut + 1:]
+    parts.append((text, ""))
+    return parts
+
+
+def _units(text, max_tokens):
+    """Zerlegt Text in Einheiten (Absätze, sonst Sätze, sonst Wortgruppen) unter dem Token-Budget."""
+    max_chars = max(1, int(max_tokens * CHARS_PER_TOKEN))
+    units = []
+    for paragraph, para_sep in _split_keep_separators(text, _PARAGRAPH_RE):
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append((paragraph, para_sep))
+            continue
+        sentences = _split_keep_separators(paragraph, _SENTENCE_RE)
+        for i, (sentence, sent_sep) in enumerate(sentences):
+            if i == len(sentences) - 1:
+                sent_sep = para_sep
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append((sentence, sent_sep))
+            else:
+                pieces = _hard_split(sentence, max_chars)
+                pieces[-1] = (pieces[-1][0], sent_sep)
+                units.extend(pieces)
+    return units
+
+
+def split_text(text, max_tokens):
+    """
+    Teilt Text an Absatz- bzw. Satzgrenzen in Segmente unter dem Token-Budget.
+
+    Args:
+        text (str): Der zu teilende Text
+        max_tokens (int): Maximale (geschätzte) Tokens pro Segment
+
+    Returns:
+        list: Liste von (segment, trenner_danach) Tupeln. Die Trenner sind die originalen
+              Leerzeichen/Zeilenumbrüche, sodass "".join(seg + sep) den Originaltext ergibt.
+    """
+    if not text:
+        return []
+    if estimate_tokens(text) <= max_tokens:
+        return [(text, "")]
+
+    segments = []
+    current = []
+    current_tokens = 0
+    for unit, sep in _units(text, max_tokens):
+        unit_tokens = estimate_tokens(unit + sep)
+        if current and current_tokens + unit_tokens > max_tokens:
+            last_unit, last_sep = current[-1]
+            body = "".join(u + s for u, s in current[:-1]) + last_unit
+            segments.append((body, last_sep))
+            current = []
+            current_tokens = 0
+        current.append((unit, sep))
+        current_tokens += unit_tokens
+    if current:
+        last_unit, last_sep = current[-1]
+        body = "".join(u + s for u, s in current[:-1]) + last_unit
+        segments.append((body, last_sep))
+    return segments
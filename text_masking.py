@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Lokale Maskierung von Abschnitten, die das Modell nicht ändern soll.
+
+URLs, Codeblöcke, Stacktraces, E-Mail-Adressen, lange Zahlen und Signaturen werden vor dem
+Senden durch kurze Platzhalter wie [[1]] ersetzt und nach der Antwort lokal wiederhergestellt.
+Das spart Eingabe- und Ausgabe-Tokens und verhindert, dass das Modell solche Stellen verändert.
+Die Wiederherstellung ist ein Stream-Operator (siehe stream_filters) und funktioniert auch
+beim Einfügen während des Streams.
+"""
+
+import re
+
+from stream_filters import StreamOperator
+from text_chunker import estimate_tokens
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+MASK_INSTRUCTION = (
+    "Der Text enthält Platzhalter wie [[1]] für Links, Code, Adressen und Zahlen. "
+    "Übernimm jeden Platzhalter unverändert und genau einmal an der passenden Stelle."
+)
+MIN_SAVED_CHARS = 6  # Kürzere Abschnitte bleiben im Text (Platzhalter lohnt sich nicht)
+
+# Reihenfolge = Priorität: überlappende Treffer späterer Muster werden verworfen
+_PATTERNS = (
+    ("code", re.compile(r"```.*?```", re.DOTALL)),
+    ("stacktrace", re.compile(
+        r"^Traceback \(most recent call last\):[ \t]*\r?\n(?:[ \t]+.*(?:\r?\n|$))+(?:^[\w.]+(?::.*)?$)?"
+        r"|(?:^[ \t]+at [\w$.<>/]+\(.*\)[ \t]*(?:\r?\n|$)){2,}",
+        re.MULTILINE)),
+    ("signature", re.compile(r"^--[ \t]?\r?\n(?:.*(?:\r?\n|$)){1,8}\Z", re.MULTILINE)),
+    ("inline_code", re.compile(r"`[^`\r\n]+`")),
+    ("url", re.compile(r"\b(?:https?://|ftp://|www\.)[^\s<>\"'`]+[^\s<>\"'`.,;:!?)\]}]")),
+    ("email", re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")),
+    ("iban", re.compile(r"\b[A-Z]{2}\d{2}(?: ?[A-Z\d]{4}){3,7}(?: ?[A-Z\d]{1,3})?\b")),
+    ("number", re.compile(r"(?<![\w.,/-])\+?\d[\d .,/-]{4,}\d(?![\w])")),
+)
+_PLACEHOLDER_RE = re.compile(r"\[\[\s*(\d+)\s*\]\]")
+_PARTIAL_PLACEHOLDER_RE = re.compile(r"\[(?:\[\s*\d*\s*\]?)?$")
+
+
+def _placeholder(number):
+    return f"[[{number}]]"
+
+
+class MaskedText:
+    """
+    Ergebnis von mask_text().
+
+    Attributes:
+        text (str): Der zu sendende Text mit Platzhaltern
+        original (str): Der Originaltext
+        placeholders (dict): Nummer -> Originalabschnitt
+        kinds (dict): Art ("url", "code", ...) -> Anzahl maskierter Abschnitte
+    """
+
+    def __init__(self, text, original, placeholders, kinds):
+        self.text = text
+        self.original = original
+        self.placeholders = placeholders
+        self.kinds = kinds
+
+    def __bool__(self):
+        return bool(self.placeholders)
+
+    def restorer(self):
+        """Neuer Stream-Operator, der die Platzhalter dieses Textes ersetzt."""
+        return PlaceholderRestorer(self.placeholders)
+
+    def restore(self, text):
+        """Ersetzt die Platzhalter in einem vollständigen Text."""
+        restorer = self.restorer()
+        return restorer.feed(text or "") + restorer.finish()
+
+    def missing(self, text):
+        """Platzhalter, die in der Antwort fehlen (sortiert)."""
+        found = {int(number) for number in _PLACEHOLDER_RE.findall(text or "")}
+        return sorted(set(self.placeholders) - found)
+
+    def summary(self, estimate_seconds=None):
+        """
+        Kurzbeschreibung der Einsparung für das Debug-Log.
+
+        Args:
+            estimate_seconds (callable): estimate_seconds(chars) -> erwartete Dauer (z.B. AdaptiveTimeout)
+        """
+        saved_chars = len(self.original) - len(self.text)
+        saved_tokens = estimate_tokens(self.original) - estimate_tokens(self.text)
+        kinds = ", ".join(f"{kind}: {count}" for kind, count in sorted(self.kinds.items()))
+        details = (f"{len(self.placeholders)} Platzhalter ({kinds}), {len(self.original)} -> {len(self.text)} "
+                   f"Zeichen, ~{saved_tokens} Tokens je Ein- und Ausgabe gespart")
+        if estimate_seconds is not None:
+            saved_seconds = estimate_seconds(len(self.original)) - estimate_seconds(len(self.text))
+            details += f", erwartete Latenz ~{saved_seconds:.2f}s kürzer"
+        return details if saved_chars > 0 else details + " (keine Einsparung)"
+
+
+class PlaceholderRestorer(StreamOperator):
+    """
+    Ersetzt Platzhalter wie [[1]] durch die Originalabschnitte.
+
+    Ein angefangener Platzhalter am Ende eines Chunks ("[[1") wird zurückgehalten, bis er
+    vollständig ist. Unbekannte Nummern bleiben unverändert stehen.
+    """
+
+    def __init__(self, placeholders):
+        self.placeholders = placeholders
+        self._tail = ""
+
+    def feed(self, text):
+        text = self._tail + text
+        partial = _PARTIAL_PLACEHOLDER_RE.search(text)
+        if partial:
+            self._tail = text[partial.start():]
+            text = text[:partial.start()]
+        else:
+            self._tail = ""
+        return _PLACEHOLDER_RE.sub(self._replace, text)
+
+    def finish(self):
+        rest, self._tail = self._tail, ""
+        return rest
+
+    def _replace(self, match):
+        return self.placeholders.get(int(match.group(1)), match.group(0))
+
+
+def _find_spans(text):
+    """Nicht überlappende (start, end, art) Abschnitte, nach Position sortiert."""
+    spans = []
+    taken = []
+    for kind, pattern in _PATTERNS:
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            end = start + len(match.group(0).rstrip())  # Umbrüche am Ende bleiben im Text
+            if end - start < MIN_SAVED_CHARS + len("[[0]]"):
+                continue
+            if any(start < other_end and other_start < end for other_start, other_end in taken):
+                continue
+            taken.append((start, end))
+            spans.append((start, end, kind))
+    spans.sort()
+    return spans
+
+
+def mask_text(text):
+    """
+    Ersetzt unveränderliche Abschnitte durch Platzhalter.
+
+    Enthält der Text selbst schon etwas wie [[1]], wird nichts maskiert (keine Verwechslung
+    bei der Wiederherstellung). Gleiche Abschnitte erhalten denselben Platzhalter.
+
+    Returns:
+        MaskedText: Ergebnis (falsy, wenn nichts maskiert wurde)
+    """
+    text = text or ""
+    if _PLACEHOLDER_RE.search(text):
+        return MaskedText(text, text, {}, {})
+
+    parts = []
+    placeholders = {}
+    numbers = {}
+    kinds = {}
+    position = 0
+    for start, end, kind in _find_spans(text):
+        span = text[start:end]
+        number = numbers.get(span)
+        if number is None:
+            number = len(numbers) + 1
+            numbers[span] = number
+            placeholders[number] = span
+            kinds[kind] = kinds.get(kind, 0) + 1
+        parts.append(text[position:start])
+        parts.append(_placeholder(number))
+        position = end
+    if not placeholders:
+        return MaskedText(text, text, {}, {})
+    parts.append(text[position:])
+    return MaskedText("".join(parts), text, placeholders, kinds)
+
+
+def build_masked_prompt(system_prompt):
+    """Ergänzt den System Prompt um die Anweisung, Platzhalter unverändert zu übernehmen."""
+    return f"{system_prompt}\n\n{MASK_INSTRUCTION}"
+
+
+def log_missing(masked, response_text):
+    """Warnt, wenn die Antwort nicht alle Platzhalter enthält (die Abschnitte fehlen dann im Ergebnis)."""
+    missing = masked.missing(response_text)
+    if missing:
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Maskierung: Platzhalter fehlen in der Antwort",
+                      ", ".join(_placeholder(number) for number in missing), level="WARNING")
+    return missing
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Zeitprofile pro Zielanwendung.
+
+Browser, Electron-Editoren, Terminals und Office reagieren sehr unterschiedlich schnell auf
+simuliertes Ctrl+C und Ctrl+V. Statt fester Wartezeiten für alle werden pro Anwendung
+(Prozessname unter Windows, WM_CLASS unter X11) gemessen:
+
+- clipboard_ready: Ctrl+C gesendet -> Zwischenablage neu belegt
+- paste_ready: Ctrl+V gesendet -> Anwendung holt den Inhalt ab (nur X11 mit Tk-Zwischenablage)
+
+Aus den letzten Messungen (90. Perzentil mal Sicherheitsfaktor, begrenzt) ergeben sich die
+Wartezeiten. Die Pausen nach einzelnen simulierten Tasten (Backspace, vor dem Einfügen bzw.
+Tippen) werden bei langsamer Reaktion auf Ctrl+C verlängert, nie verkürzt. Ohne genügend
+Messungen gelten die bisherigen festen Werte. Die Profile liegen als JSON-Datei neben der
+Einstellungsdatei und werden verzögert (bzw. beim Beenden mit flush()) geschrieben.
+"""
+
+import ctypes
+import json
+import os
+import sys
+import threading
+import time
+
+from config import get_appdata_path
+
+try:
+    from Xlib import X
+    from Xlib import display as xdisplay
+    HAS_XLIB = True  # Kommt unter Linux mit pynput mit
+except ImportError:
+    HAS_XLIB = False
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+PROFILE_FILE_NAME = "timing_profiles.json"
+PROFILE_VERSION = 1
+
+MAX_SAMPLES = 20        # Letzte Messungen pro Anwendung und Messgröße
+MIN_SAMPLES = 3         # Darunter gelten die Standardwerte
+SAFETY_FACTOR = 2.0     # Abstand zur gemessenen Latenz (90. Perzentil)
+
+# Standardwerte (bisherige feste Zeiten) und erlaubte Bereiche der gelernten Werte
+DEFAULT_CAPTURE_TIMEOUT = 1.1
+CAPTURE_TIMEOUT_RANGE = (0.3, 2.5)
+DEFAULT_PASTE_WAIT = 0.05
+PASTE_WAIT_RANGE = (0.02, 0.5)
+KEY_WAITS = {
+    "app_ready": 0.1,         # Vor dem Einfügen/Tippen: Anwendung hat Hotkey bzw. Backspace verarbeitet
+    "after_backspace": 0.03,  # Nach dem Löschen der Auswahl
+}
+KEY_WAIT_MAX = 0.3  # Gelernte Tastenpausen liegen zwischen dem Standardwert und diesem Wert
+
+SAVE_DELAY = 5.0  # Sekunden; Messungen kurz hintereinander ergeben einen Schreibvorgang
+
+METRICS = ("clipboard_ready", "paste_ready")
+
+
+# --- Vordergrund-Anwendung ---
+
+_x11_display = None
+
+
+def _windows_foreground_app():
+    user32 = ctypes.WinDLL("user32")
+    kernel32 = ctypes.WinDLL("kernel32")
+    user32.GetForegroundWindow.restype = ctypes.c_void_p
+    user32.GetWindowThreadProcessId.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_ulong)]
+    kernel32.OpenProcess.restype = ctypes.c_void_p
+    kernel32.QueryFullProcessImageNameW.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_wchar_p,
+                                                    ctypes.POINTER(ctypes.c_ulong)]
+    kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+
+    hwnd = user32.GetForegroundWindow()
+    if not hwnd:
+        return None
+    pid = ctypes.c_ulong()
+    user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+    handle = kernel32.OpenProcess(0x1000, False, pid.value)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return None
+    try:
+        buffer = ctypes.create_unicode_buffer(1024)
+        size = ctypes.c_ulong(len(buffer))
+        if not kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+            return None
+        return os.path.basename(buffer.value).lower()
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _x11_foreground_app():
+    global _x11_display
+    if _x11_display is None:
+        _x11_display = xdisplay.Display()
+    root = _x11_display.screen().root
+    active = root.get_full_property(_x11_display.intern_atom("_NET_ACTIVE_WINDOW"), X.AnyPropertyType)
+    if not active or not active.value or not active.value[0]:
+        return None
+    window = _x11_display.create_resource_object("window", active.value[0])
+    wm_class = window.get_wm_class()
+    return wm_class[1].lower() if wm_class else None
+
+
+def get_foreground_app():
+    """
+    Ermittelt die Anwendung im Vordergrund.
+
+    Returns:
+        str: Prozessname (Windows, z.B. "chrome.exe") bzw. WM_CLASS (X11, z.B. "code"),
+             None wenn nicht ermittelbar (dann gelten die Standardwerte)
+    """
+    try:
+        if sys.platform == "win32":
+            return _windows_foreground_app()
+        if HAS_XLIB and os.environ.get("DISPLAY"):
+            return _x11_foreground_app()
+    except Exception as e:
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log("Vordergrund-Anwendung nicht ermittelbar", f"Fehler: {e}", level="WARNING")
+    return None
+
+
+# --- Profile ---
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TimingProfiles:
+    """
+    Lernt pro Anwendung die Latenzen von Ctrl+C und Ctrl+V und leitet Wartezeiten daraus ab.
+
+    Thread-sicher (Messungen kommen aus dem Tk-Thread und den Einfüge-Threads).
+    """
+
+    def __init__(self, path=None, max_samples=MAX_SAMPLES, save_delay=SAVE_DELAY):
+        self.path = path or get_appdata_path(PROFILE_FILE_NAME)
+        self.max_samples = max_samples
+        self.save_delay = save_delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Hält Schnappschuss und Schreiben zusammen (Reihenfolge)
+        self._apps = {}  # Anwendung -> {Messgröße: [Sekunden, ...]}
+        self._dirty = False
+        self._timer = None
+        self._load()
+
+    def record(self, app, metric, seconds):
+        """
+        Speichert eine Messung.
+
+        Args:
+            app (str): Die Anwendung (None = nicht ermittelbar, wird ignoriert)
+            metric (str): "clipboard_ready" oder "paste_ready"
+            seconds (float): Gemessene Latenz
+        """
+        if not app or metric not in METRICS:
+            return
+        with self._lock:
+            samples = self._apps.setdefault(app, {}).setdefault(metric, [])
+            samples.append(round(seconds, 4))
+            del samples[:-self.max_samples]
+            self._dirty = True
+            self._schedule_save()
+
+    def capture_timeout(self, app):
+        """Maximale Wartezeit auf die neue Auswahl nach Ctrl+C."""
+        return self._tuned(app, "clipboard_ready", DEFAULT_CAPTURE_TIMEOUT, CAPTURE_TIMEOUT_RANGE)
+
+    def paste_wait(self, app, observable=False):
+        """
+        Wartezeit nach Ctrl+V.
+
+        Args:
+            observable (bool): Das Abholen wird gemeldet und beendet das Warten; dann ist der
+                Wert nur eine Obergrenze und darf großzügiger sein
+        """
+        wait = self._tuned(app, "paste_ready", DEFAULT_PASTE_WAIT, PASTE_WAIT_RANGE)
+        if observable:
+            wait = min(PASTE_WAIT_RANGE[1], max(wait, DEFAULT_PASTE_WAIT) * SAFETY_FACTOR)
+        return wait
+
+    def key_wait(self, app, name):
+        """
+        Pause nach einer simulierten Taste, bis die Anwendung sie verarbeitet hat.
+
+        Maß ist die Reaktionszeit auf Ctrl+C (clipboard_ready). Sie belegt nicht, dass Backspace
+        schneller verarbeitet wird, daher ist der bisherige feste Wert die Untergrenze: langsame
+        Anwendungen bekommen längere Pausen, schnelle nie kürzere als bisher.
+
+        Args:
+            name (str): Schlüssel aus KEY_WAITS ("app_ready" oder "after_backspace")
+        """
+        default = KEY_WAITS[name]
+        return self._tuned(app, "clipboard_ready", default, (default, KEY_WAIT_MAX))
+
+    def _tuned(self, app, metric, default, bounds):
+        with self._lock:
+            samples = list(self._apps.get(app, {}).get(metric, ())) if app else []
+        if len(samples) < MIN_SAMPLES:
+            return default
+        low, high = bounds
+        return min(high, max(low, _percentile(samples, 0.9) * SAFETY_FACTOR))
+
+    def flush(self):
+        """Schreibt ausstehende Messungen sofort (z.B. beim Beenden)."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                apps = {app: {metric: list(samples) for metric, samples in metrics.items()}
+                        for app, metrics in self._apps.items()}
+            self._save(apps)
+
+    def reset(self):
+        """Verwirft alle Profile und löscht die Datei."""
+        with self._write_lock, self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._dirty = False
+            self._apps.clear()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def apps(self):
+        """Namen der Anwendungen mit Profil."""
+        with self._lock:
+            return sorted(self._apps)
+
+    def format_profile(self, app):
+        """Formatiert Messungen und Wartezeiten einer Anwendung für Debug-Logs."""
+        with self._lock:
+            counts = {metric: len(self._apps.get(app, {}).get(metric, ())) for metric in METRICS} if app else {}
+        return (f"Anwendung: {app or '-'}, Messungen: "
+                + ", ".join(f"{metric} {counts.get(metric, 0)}" for metric in METRICS)
+                + f", Capture-Timeout: {self.capture_timeout(app):.2f}s, Pause nach Ctrl+V: {self.paste_wait(app):.3f}s"
+                + f", Pause nach Tasten: {self.key_wait(app, 'app_ready'):.3f}s")
+
+    # --- Interne Helfer ---
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != PROFILE_VERSION:
+                return
+            for app, metrics in data.get("apps", {}).items():
+                self._apps[str(app)] = {metric: [float(value) for value in metrics.get(metric, [])][-self.max_samples:]
+                                        for metric in METRICS if metrics.get(metric)}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self._apps.clear()
+            debug = get_debug_logger() if get_debug_logger else None
+            if debug:
+                debug.log("Zeitprofile nicht lesbar, beginne leer", f"Fehler: {e}", level="WARNING")
+
+    def _schedule_save(self):
+        """Startet den Schreib-Timer, falls noch keiner läuft (Aufrufer hält self._lock)."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _save(self, apps):
+        """Schreibt einen Schnappschuss der Profile (Aufrufer hält self._write_lock)."""
+        tmp_path = self.path + ".tmp"
+        data = {"version": PROFILE_VERSION, "updated": time.time(), "apps": apps}
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            debug = get_debug_logger() if get_debug_logger else None
+            if debug:
+                debug.log("Zeitprofile konnten nicht geschrieben werden", f"Fehler: {e}", level="WARNING")
+
+
+timing_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def get_timing_profiles():
+    """Gibt die globalen Zeitprofile zurück (von main und dem Einstellungsfenster gemeinsam genutzt)."""
+    global timing_profiles
+    with _profiles_lock:
+        if timing_profiles is None:
+            timing_profiles = TimingProfiles()
+        return timing_profiles
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import AVAILABLE_MODELS, get_appdata_path
+from model_router import model_tier
+from text_chunker import CHARS_PER_TOKEN
+
+# Debug Logger Import
+try:
+    from debug_logger import get_debug_logger
+except ImportError:
+    get_debug_logger = None
+
+
+CALIBRATION_FILE_NAME = "token_calibration.json"
+
+# Kontextgrenzen (Eingabe-Tokens, Ausgabe-Tokens) pro Modell
+MODEL_TOKEN_LIMITS = {
+    "gemini-3-pro-preview": (1048576, 65536),
+    "gemini-2.5-pro": (1048576, 65536),
+    "gemini-2.5-flash": (1048576, 65536),
+    "gemini-2.5-flash-lite": (1048576, 65536),
+    "gemini-2.0-flash": (1048576, 8192),
+    "gemini-2.0-flash-lite": (1048576, 8192),
+}
+DEFAULT_TOKEN_LIMITS = (32768, 8192)  # Vorsichtige Annahme für unbekannte Modelle
+
+OUTPUT_RATIO = 1.15           # Überarbeitung ist etwa so lang wie die Eingabe, plus Reserve
+PROMPT_OVERHEAD_TOKENS = 8    # Trenner und Rollen-Markup um System Prompt und Text
+MIN_CALIBRATION_CHARS = 200   # Kurze Texte verfälschen das Verhältnis (fester Overhead)
+CALIBRATION_SAMPLES = 20      # Danach wird nicht mehr kalibriert
+COUNT_CACHE_SIZE = 256        # Gecachte count_tokens Ergebnisse
+SMOOTHING = 0.3               # Gewicht neuer Messwerte
+
+
+def get_token_limits(model):
+    """Gibt (max. Eingabe-Tokens, max. Ausgabe-Tokens) für ein Modell zurück."""
+    return MODEL_TOKEN_LIMITS.get(model, DEFAULT_TOKEN_LIMITS)
+
+
+class TokenEstimator:
+    """
+    Schnelle lokale Token-Schätzung, kalibriert gegen count_tokens des SDK.
+
+    Die Schätzung selbst ist nur len(text) / Zeichen-pro-Token und damit O(1). Das
+    Verhältnis wird pro Modell aus echten count_tokens Ergebnissen gelernt (gleitender
+    Mittelwert), im AppData-Verzeichnis gespeichert und beim nächsten Start wiederverwendet.
+    count_tokens Ergebnisse werden nach Text-Hash gecacht, sodass kein Text doppelt gezählt wird.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or get_appdata_path(CALIBRATION_FILE_NAME)
+        self._ratios = {}             # model -> {"chars_per_token": float, "samples": int}
+        self._counts = OrderedDict()  # sha256(model, text) -> tokens
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Lädt gespeicherte Kalibrierungswerte."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                for model, entry in data.items():
+                    if float(entry.get("chars_per_token", 0)) > 0:
+                        self._ratios[model] = {"chars_per_token": float(entry["chars_per_token"]),
+                                               "samples": int(entry.get("samples", 0))}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self._log("Token-Kalibrierung nicht lesbar", f"Fehler: {e}", level="WARNING")
+
+    def save(self):
+        """Speichert die Kalibrierungswerte."""
+        with self._lock:
+            data = {model: dict(entry) for model, entry in self._ratios.items()}
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            self._log("Token-Kalibrierung nicht speicherbar", f"Fehler: {e}", level="WARNING")
+
+    def chars_per_token(self, model):
+        """Gelerntes Verhältnis Zeichen pro Token (Standard: CHARS_PER_TOKEN)."""
+        entry = self._ratios.get(model)
+        return entry["chars_per_token"] if entry else CHARS_PER_TOKEN
+
+    def estimate(self, text, model=None):
+        """Schätzt die Tokens eines Textes (lokal, ohne API-Aufruf)."""
+        if not text:
+            return 0
+        return int(len(text) / self.chars_per_token(model)) + 1
+
+    def needs_calibration(self, model, text):
+        """True, wenn sich ein count_tokens Aufruf für dieses Modell noch lohnt."""
+        if not text or len(text) < MIN_CALIBRATION_CHARS:
+            return False
+        entry = self._ratios.get(model)
+        return entry is None or entry["samples"] < CALIBRATION_SAMPLES
+
+    def calibrate(self, model, text, count_fn):
+        """
+        Zählt die Tokens eines Textes exakt und passt das Verhältnis für das Modell an.
+
+        Args:
+            model (str): Das Modell
+            text (str): Der gezählte Text
+            count_fn (callable): count_fn(text) -> int, z.B. gemini_api.count_tokens
+
+        Returns:
+            int: Exakte Token-Anzahl (oder None bei Fehler)
+        """
+        key = hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+
+        start = time.time()
+        try:
+            tokens = count_fn(text)
+        except Exception as e:
+            self._log("count_tokens fehlgeschlagen", f"Modell: {model}, Fehler: {e}", level="WARNING")
+            return None
+        if not tokens:
+            return None
+
+        ratio = len(text) / tokens
+        with self._lock:
+            self._counts[key] = tokens
+            while len(self._counts) > COUNT_CACHE_SIZE:
+                self._counts.popitem(last=False)
+            entry = self._ratios.get(model)
+            if entry is None:
+                estimated = int(len(text) / CHARS_PER_TOKEN) + 1
+                self._ratios[model] = {"chars_per_token": ratio, "samples": 1}
+            else:
+                estimated = int(len(text) / entry["chars_per_token"]) + 1
+                entry["chars_per_token"] = (1 - SMOOTHING) * entry["chars_per_token"] + SMOOTHING * ratio
+                entry["samples"] += 1
+            new_ratio = self._ratios[model]["chars_per_token"]
+        self.save()
+        self._log("Token-Schätzer kalibriert",
+                  f"Modell: {model}, exakt: {tokens}, geschätzt: {estimated}, "
+                  f"Zeichen/Token: {new_ratio:.2f}, count_tokens: {time.time() - start:.3f}s")
+        return tokens
+
+    def calibrate_in_background(self, model, text, count_fn):
+        """Startet calibrate() in einem Daemon-Thread (höchstens ein Lauf pro Modell)."""
+        with self._lock:
+            if model in self._pending:
+                return
+            self._pending.add(model)
+
+        def calibrate_thread():
+            try:
+                self.calibrate(model, text, count_fn)
+            finally:
+                with self._lock:
+                    self._pending.discard(model)
+
+        threading.Thread(target=calibrate_thread, daemon=True).start()
+
+    def plan_request(self, text, system_prompt, model, split_threshold=None, candidates=None):
+        """
+        Entscheidet vor dem Senden über Modell und Verarbeitungsart.
+
+        Args:
+            text (str): Der zu verbessernde Text
+            system_prompt (str): Der System Prompt
+            model (str): Das gewünschte Modell
+            split_threshold (int): Ab so vielen Text-Tokens wird segmentiert (None = nie)
+            candidates (list): Ausweichmodelle, falls die Ausgabe nicht ins Kontextfenster passt
+
+        Returns:
+            dict: model, input_tokens, output_tokens, output_chars, split, fits, reason
+        """
+        text_tokens = self.estimate(text, model)
+        input_tokens = self.estimate(system_prompt, model) + text_tokens + PROMPT_OVERHEAD_TOKENS
+        output_tokens = int(text_tokens * OUTPUT_RATIO) + 1
+        plan = {
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "output_chars": int(output_tokens * self.chars_per_token(model)),
+            "split": split_threshold is not None and text_tokens > split_threshold,
+            "fits": True,
+            "reason": "passt",
+        }
+
+        def fits(name):
+            max_input, max_output = get_token_limits(name)
+            return input_tokens <= max_input and output_tokens <= max_output
+
+        if plan["split"]:
+            plan["reason"] = f"~{text_tokens} Tokens > Schwelle {split_threshold}, segmentiert"
+        elif not fits(model):
+            # Ausweichmodell bevorzugt aus derselben Leistungsklasse
+            ranked = sorted(candidates or AVAILABLE_MODELS, key=lambda m: abs(model_tier(m) - model_tier(model)))
+            fallback = next((m for m in ranked if fits(m)), None)
+            if fallback:
+                plan["model"] = fallback
+                plan["reason"] = f"Ausgabe ~{output_tokens} Tokens passt nicht in {model}, verwende {fallback}"
+            elif split_threshold is not None:
+                plan["split"] = True
+                plan["reason"] = f"Ausgabe ~{output_tokens} Tokens passt in kein Modell, segmentiert"
+            else:
+                plan["fits"] = False
+                plan["reason"] = (f"Eingabe ~{input_tokens} / Ausgabe ~{output_tokens} Tokens "
+                                  f"überschreiten die Grenzen aller Modelle")
+
+        self._log("Token-Schätzung",
+                  f"Eingabe: ~{input_tokens}, Ausgabe: ~{output_tokens} Tokens, "
+                  f"Modell: {plan['model']}, {plan['reason']}", level="DEBUG")
+        return plan
+
+    def _log(self, message, details=None, level="INFO"):
+        debug = get_debug_logger() if get_debug_logger else None
+        if debug:
+            debug.log(message, details, level=level)
+
+
+def benchmark(iterations=10000, text_chars=2000):
+    """
+    Mikrobenchmark für estimate() und plan_request() mit einer typischen Markierung.
+
+    Returns:
+        dict: Mikrosekunden pro Aufruf für "estimate" und "plan_request"
+    """
+    import timeit
+
+    estimator = TokenEstimator(path=os.devnull)
+    text = ("Dies ist ein typischer Absatz mit etwas Text, der verbessert werden soll. " * 40)[:text_chars]
+    prompt = "Verbessere den folgenden Text. Antworte nur mit dem verbesserten Text."
+    model = AVAILABLE_MODELS[0]
+    estimate_time = timeit.timeit(lambda: estimator.estimate(text, model), number=iterations)
+    plan_time = timeit.timeit(lambda: estimator.plan_request(text, prompt, model, split_threshold=2000),
+                              number=iterations)
+    return {
+        "estimate": estimate_time / iterations * 1e6,
+        "plan_request": plan_time / iterations * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    results = benchmark()
+    print(f"estimate():     {results['estimate']:.2f} µs pro Aufruf")
+    print(f"plan_request(): {results['plan_request']:.2f} µs pro Aufruf")